@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Benchmark: Compositing                                                    *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Compare the per frame time of composing the altimeter's layer stack (QNH
+# window, faceplate and three needles on the background color) with MoviePy's
+# CompositeVideoClip and with the fixed point compositor. Both paths render
+# the needles with the same needle objects, so only compositing is compared.
+# The clips of the needles for MoviePy are built here as the gauges did.
+# The largest and the mean difference of the frames are printed to make sure
+# both paths produce the same picture. Remaining differences are limited to
+# the semi transparent outer edge of the faceplate which MoviePy darkens by
+# applying the mask of the nested composition twice.
+
+# usage: python benchmarks/composite.py [--size WIDTHxHEIGHT] [--frames N]
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/04/28
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+import getopt
+import numpy                        as np
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Gauge modules
+from gauges                         import Needle
+
+# Own libraries
+from lib.AssetCache                 import AssetCache
+from lib.calculations.gui_conv      import splitXY
+from lib.Compositor                 import Compositor, premultiply
+
+# Foreign libraries
+import moviepy.editor               as mpy
+
+
+VIDEO = (1280, 720)
+BACKGROUND = (0, 0, 255)
+PREFIX = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "gauges", "altitude", "ft_")
+
+# Needle images and angular speeds in deg/s.
+NEEDLES = (
+    ("needle10000.png", 0.36),
+    ("needle1000.png", 3.6),
+    ("needle100.png", 36.0)
+)
+
+
+def angleFunction(speed):
+    return lambda t: 15.0 + speed * t
+
+
+def paste(dst, roi, xy):
+    """
+    Copy roi into dst at position xy. Parts outside of dst are cut off.
+    """
+
+    x, y = xy
+    h, w = roi.shape[:2]
+    H, W = dst.shape[:2]
+
+    # Overlap of both arrays in coordinates of dst.
+    dx0 = max(x, 0)
+    dy0 = max(y, 0)
+    dx1 = min(x + w, W)
+    dy1 = min(y + h, H)
+
+    if dx0 >= dx1 or dy0 >= dy1:
+        return
+
+    dst[dy0:dy1, dx0:dx1] = roi[dy0 - y:dy1 - y, dx0 - x:dx1 - x]
+
+
+def needleClip(needle, angle, duration):
+    """
+    Create a clip of the size of the gauge showing needle at the angles
+    returned by the function angle(t).
+    """
+
+    w, h = needle._Size
+    last = {'t': None, 'frame': None}
+
+    # Color and mask are requested separately by MoviePy for the same
+    # time. Render only once for both.
+    def frame(t):
+        if last['t'] != t:
+            f = np.zeros((h, w, 4), dtype=np.uint8)
+            roi, xy = needle.render(angle(t))
+            paste(f, roi, xy)
+            last['t'] = t
+            last['frame'] = f
+        return last['frame']
+
+    # MoviePy expects straight alpha.
+    def color(t):
+        f = frame(t)
+        alpha = np.maximum(f[:, :, 3:4], 1).astype(float)
+        return np.minimum(f[:, :, :3] * 255.0 / alpha, 255).astype(np.uint8)
+
+    mask = mpy.VideoClip(lambda t: frame(t)[:, :, 3] / 255.0, ismask=True,
+                         duration=duration)
+    clip = mpy.VideoClip(color, duration=duration)
+    return clip.set_mask(mask)
+
+
+def moviepyClip(layers, needles, position, duration):
+    """
+    Composition as done by the gauges before the compositor.
+    """
+
+    gauge = [mpy.ImageClip(l).set_duration(duration).set_position("center")
+             for l in layers]
+    gauge += [needleClip(n, a, duration).set_position("center")
+              for n, a in needles]
+
+    return mpy.CompositeVideoClip([
+        mpy.ColorClip(size=VIDEO, col=BACKGROUND, duration=duration),
+        mpy.CompositeVideoClip(gauge).set_position(position)
+    ])
+
+
+def compositorClip(layers, needles, position, duration):
+    """
+    Composition with the fixed point compositor.
+    """
+
+    x, y = position
+    compositor = Compositor(VIDEO, BACKGROUND)
+    for layer in layers:
+        compositor.addStatic(premultiply(layer), (x, y))
+
+    def make_frame(t):
+        rois = []
+        for needle, angle in needles:
+            roi, (nx, ny) = needle.render(angle(t))
+            rois.append((roi, (x + nx, y + ny)))
+        return compositor.frame(rois)
+
+    return mpy.VideoClip(make_frame, duration=duration)
+
+
+def timeFrames(clip, times):
+    """
+    Render frames at times. Returns the frames and the seconds per frame.
+    """
+
+    start = time.time()
+    frames = [clip.get_frame(t) for t in times]
+    return frames, (time.time() - start) / len(times)
+
+
+def usage():
+
+    print("usage: composite.py [--size WIDTHxHEIGHT] [--frames N]")
+    sys.exit(2)
+
+
+def main():
+
+    size = (400, 400)
+    count = 240
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "", ["size=", "frames="])
+    except getopt.GetoptError:
+        usage()
+
+    for opt, arg in opts:
+        if opt == "--size":
+            size = splitXY(arg)
+        elif opt == "--frames":
+            count = int(arg)
+
+    assets = AssetCache(None)
+    layers = [assets.load(PREFIX + "qnh.png", size),
+              assets.load(PREFIX + "faceplate.png", size)]
+    needles = [(Needle.RasterNeedle(assets.load(PREFIX + name, size), size),
+                angleFunction(speed)) for name, speed in NEEDLES]
+
+    position = (100, VIDEO[1] - size[1] - 20)
+    duration = count / 24.0
+    times = [i / 24.0 for i in range(count)]
+
+    # Render needles once so both paths find them in the needle caches.
+    for needle, angle in needles:
+        for t in times:
+            needle.render(angle(t))
+
+    old, tOld = timeFrames(moviepyClip(layers, needles, position, duration),
+                           times)
+    new, tNew = timeFrames(compositorClip(layers, needles, position, duration),
+                           times)
+
+    diff = [np.abs(a.astype(int) - b.astype(int)) for a, b in zip(old, new)]
+
+    print("Altimeter %dx%d in %dx%d, %d frames" %
+          (size[0], size[1], VIDEO[0], VIDEO[1], count))
+    print("  CompositeVideoClip:  %7.2f ms/frame" % (tOld * 1000))
+    print("  Compositor:          %7.2f ms/frame" % (tNew * 1000))
+    print("  Speedup:             %7.1fx" % (tOld / tNew))
+    print("  Difference:          max %d, mean %.4f" %
+          (max(d.max() for d in diff), np.mean([d.mean() for d in diff])))
+
+
+if __name__ == "__main__":
+    main()
+
+
+# EOF
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Benchmark: Synthetic Flights                                              *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Generator of synthetic flights written as GPX files like those recorded by
+# SkyDemon (GPX 1.0 with <speed>). A simple point mass is flown along a
+# maneuver profile which sets the wanted speed, climb rate and turn rate over
+# time:
+
+#     cruise      Straight and level with slow heading and speed changes.
+#     pattern     Traffic circuits: take off, climb, four turns, descent and
+#                 touch and go, repeated.
+#     aerobatic   Steep turns, pull ups and dives in quick succession.
+#     mixed       Take off, climb, cruise with some turns, descent, landing.
+
+# Trackpoints are written every 1/rate seconds with small GPS noise. A share
+# of them (duplicates) is followed by a second trackpoint with the same
+# timestamp to exercise the handling of duplicate timestamps. Flights are
+# reproducible for the same seed.
+
+# usage: python benchmarks/flightgen.py [--duration SEC] [--rate HZ]
+#                                       [--duplicates SHARE]
+#                                       [--maneuver PROFILE] [--seed N]
+#                                       OUTPUTFILE
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/02
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+from datetime                       import datetime, timedelta
+from math                           import cos, degrees, radians, sin
+import getopt
+import random
+import sys
+
+
+START = datetime(2017, 4, 1, 10, 0, 0)
+HOME = (50.0, 8.0, 100.0)           # Latitude, longitude, elevation in m
+EARTH_RADIUS = 6371000.0            # m
+GPS_NOISE = (0.000005, 1.5, 0.2)    # Degrees, m and m/s (one sigma)
+
+MANEUVERS = ("cruise", "pattern", "aerobatic", "mixed")
+
+
+# -----------------------------------------------------------------------------
+# - Maneuver profiles                                                         -
+# -----------------------------------------------------------------------------
+
+# Each profile returns (speed in m/s, climb rate in m/s, turn rate in deg/s)
+# wanted at second t of a flight lasting duration seconds.
+
+
+def cruise(t, duration):
+    return (55.0 + 3.0 * sin(t / 90.0), 0.2 * sin(t / 40.0),
+            0.5 * sin(t / 120.0))
+
+
+def pattern(t, duration):
+
+    # One circuit takes 360 sec. Legs: take off and climb, crosswind,
+    # downwind, base, final with descent, ground roll.
+    p = t % 360.0
+
+    if p < 20.0:
+        return (15.0 + 1.2 * p, 0.0, 0.0)
+    elif p < 80.0:
+        return (38.0, 3.5, 0.0)
+    elif p < 110.0:
+        return (40.0, 1.0, 3.0)
+    elif p < 200.0:
+        return (45.0, 0.0, 0.0)
+    elif p < 230.0:
+        return (38.0, -2.0, 3.0)
+    elif p < 260.0:
+        return (35.0, -2.5, 3.0)
+    elif p < 340.0:
+        return (33.0, -2.8, 0.0)
+    return (20.0, 0.0, 0.0)
+
+
+def aerobatic(t, duration):
+
+    # Figures of 24 sec: steep turn left, pull up, steep turn right, dive.
+    p = (t % 96.0) // 24.0
+
+    if p == 0:
+        return (60.0, 0.0, -15.0)
+    elif p == 1:
+        return (45.0, 25.0, 0.0)
+    elif p == 2:
+        return (55.0, 0.0, 15.0)
+    return (75.0, -25.0, 0.0)
+
+
+def mixed(t, duration):
+
+    climb = min(600.0, duration * 0.2)
+    descent = min(600.0, duration * 0.2)
+
+    if t < 20.0:
+        return (15.0 + 1.2 * t, 0.0, 0.0)
+    elif t < climb:
+        return (38.0, 3.0, 0.0)
+    elif t > duration - 20.0:
+        return (max(5.0, 30.0 - (t - duration + 20.0)), 0.0, 0.0)
+    elif t > duration - descent:
+        return (35.0, -3.0, 0.0)
+
+    turn = 3.0 if (t // 300.0) % 4 == 1 and t % 300.0 < 60.0 else 0.0
+    return (55.0, 0.0, turn)
+
+
+PROFILES = {
+    "cruise"    :   cruise,
+    "pattern"   :   pattern,
+    "aerobatic" :   aerobatic,
+    "mixed"     :   mixed
+}
+
+
+# -----------------------------------------------------------------------------
+# - Generator                                                                 -
+# -----------------------------------------------------------------------------
+
+
+def generate(duration=600, rate=1.0, duplicates=0.0, maneuver="mixed",
+    seed=0):
+    """
+    Fly a synthetic flight. Returns list of trackpoints as tuples (time,
+    latitude, longitude, elevation in m, speed in m/s).
+    """
+
+    if maneuver not in PROFILES:
+        raise ValueError("Unknown maneuver '%s'!" % maneuver)
+
+    profile = PROFILES[maneuver]
+    rnd = random.Random(seed)
+    step = 1.0 / rate
+
+    lat, lon, alt = HOME
+    heading = 0.0
+    noise = GPS_NOISE
+
+    points = []
+    t = 0.0
+    while t <= duration:
+        speed, climb, turn = profile(t, duration)
+
+        time = START + timedelta(seconds=t)
+        point = (time,
+                 lat + rnd.gauss(0, noise[0]),
+                 lon + rnd.gauss(0, noise[0]),
+                 alt + rnd.gauss(0, noise[1]),
+                 max(0.0, speed + rnd.gauss(0, noise[2])))
+        points.append(point)
+
+        # Second fix of the same second as written by some recorders.
+        if rnd.random() < duplicates:
+            points.append((time,) + tuple(v + rnd.gauss(0, n) for v, n in
+                zip(point[1:], (noise[0], noise[0], noise[1], noise[2]))))
+
+        # Move point mass on to the next trackpoint.
+        heading = (heading + turn * step) % 360.0
+        distance = speed * step
+        lat += degrees(distance * cos(radians(heading)) / EARTH_RADIUS)
+        lon += degrees(distance * sin(radians(heading)) /
+                       (EARTH_RADIUS * cos(radians(lat))))
+        alt = max(HOME[2], alt + climb * step)
+
+        t += step
+
+    return points
+
+
+def writeGPX(points, path):
+    """
+    Write trackpoints as returned by generate() to a GPX file.
+    """
+
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<gpx version="1.0" creator="videoGauge flightgen" '
+                'xmlns="http://www.topografix.com/GPX/1/0">\n')
+        f.write('<trk><name>Synthetic flight</name><trkseg>\n')
+
+        for time, lat, lon, ele, speed in points:
+            f.write('<trkpt lat="%.7f" lon="%.7f"><ele>%.1f</ele>'
+                    '<time>%s</time><speed>%.2f</speed></trkpt>\n' %
+                    (lat, lon, ele, time.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+                     speed))
+
+        f.write('</trkseg></trk>\n</gpx>\n')
+
+
+def usage():
+
+    print("usage: flightgen.py [--duration SEC] [--rate HZ] "
+          "[--duplicates SHARE] [--maneuver %s] [--seed N] OUTPUTFILE" %
+          "|".join(MANEUVERS))
+    sys.exit(2)
+
+
+def main():
+
+    options = {"duration": 600, "rate": 1.0, "duplicates": 0.0,
+               "maneuver": "mixed", "seed": 0}
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "", ["duration=", "rate=",
+            "duplicates=", "maneuver=", "seed="])
+    except getopt.GetoptError:
+        usage()
+
+    for opt, arg in opts:
+        if opt == "--maneuver":
+            options['maneuver'] = arg
+        elif opt == "--seed":
+            options['seed'] = int(arg)
+        else:
+            options[opt[2:]] = float(arg)
+
+    if len(args) != 1:
+        usage()
+
+    points = generate(**options)
+    writeGPX(points, args[0])
+
+    print("%d trackpoints written to %s" % (len(points), args[0]))
+
+
+if __name__ == "__main__":
+    main()
+
+
+# EOF
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Benchmark: Navigation                                                     *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Compare the per point time of the navigational calculations done point by
+# point through the scalar API (getBearing(), getDistance(), findFix()) and
+# on whole arrays. The points are random legs of up to 200 km around the
+# globe. The largest difference to the scalar results is printed to make
+# sure the array versions calculate the same.
+
+# usage: python benchmarks/navigation.py [--points N] [--repeat N]
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/09
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+import getopt
+import numpy                        as np
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Own libraries
+from lib.calculations               import navigation   as nav
+
+
+def best(func, repeat):
+    """
+    Returns the shortest time of repeat runs of func and its result.
+    """
+
+    times = []
+    for i in range(repeat):
+        start = time.time()
+        result = func()
+        times.append(time.time() - start)
+
+    return min(times), result
+
+
+def usage():
+
+    print("usage: navigation.py [--points N] [--repeat N]")
+    sys.exit(2)
+
+
+def main():
+
+    points = 100000
+    repeat = 3
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "", ["points=", "repeat="])
+    except getopt.GetoptError:
+        usage()
+
+    for opt, arg in opts:
+        if opt == "--points":
+            points = int(arg)
+        elif opt == "--repeat":
+            repeat = int(arg)
+
+    rng = np.random.RandomState(1)
+    lat1 = rng.uniform(-80, 80, points)
+    lon1 = rng.uniform(-180, 180, points)
+    brg = rng.uniform(0, 2 * np.pi, points)
+    dist = rng.uniform(0, 200000, points)
+    lat2, lon2 = nav.findFixes(lat1, lon1, brg, dist)
+
+    rows = zip(lat1.tolist(), lon1.tolist(), lat2.tolist(), lon2.tolist())
+    fixes = zip(lat1.tolist(), lon1.tolist(), brg.tolist(), dist.tolist())
+
+    cases = [
+        ("bearing",
+         lambda: [nav.getBearing(r[:2], r[2:]) for r in rows],
+         lambda: nav.bearings(lat1, lon1, lat2, lon2)),
+        ("distance",
+         lambda: [nav.getDistance(r[:2], r[2:]) for r in rows],
+         lambda: nav.distances(lat1, lon1, lat2, lon2)),
+        ("fix",
+         lambda: [nav.findFix(f[:2], f[2], f[3])[0] for f in fixes],
+         lambda: nav.findFixes(lat1, lon1, brg, dist)[0])
+    ]
+
+    print("%d points, per point times\n" % points)
+    print("%-10s %12s %12s %9s %12s" % ("Function", "scalar API", "array",
+        "Speedup", "Max diff"))
+
+    for name, scalar, array in cases:
+        tScalar, reference = best(scalar, repeat)
+        tArray, result = best(array, repeat)
+
+        diff = np.abs(np.asarray(reference) - result)
+        if name == "bearing":
+            diff = np.minimum(diff, 360 - diff)
+
+        print("%-10s %10.3f us %10.3f us %8.0fx %12.3g" % (name,
+            tScalar / points * 1e6, tArray / points * 1e6, tScalar / tArray,
+            diff.max()))
+
+    # Along track distance of a track against the summed legs.
+    legs = zip(lat1[:-1].tolist(), lon1[:-1].tolist(), lat1[1:].tolist(),
+               lon1[1:].tolist())
+    tScalar, reference = best(lambda: np.cumsum([nav.getDistance(r[:2],
+        r[2:]) for r in legs]), repeat)
+    tArray, result = best(lambda: nav.trackDistances(lat1, lon1), repeat)
+    print("%-10s %10.3f us %10.3f us %8.0fx %12.3g" % ("track",
+        tScalar / points * 1e6, tArray / points * 1e6, tScalar / tArray,
+        np.abs(reference / result[1:] - 1).max()))
+
+
+if __name__ == "__main__":
+    main()
+
+
+# EOF
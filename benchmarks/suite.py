@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Benchmark: Suite                                                          *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Time the stages of a render for synthetic flights of several sizes. For
+# each size a flight is generated with flightgen and these stages are timed:
+
+#     ingest      Parsing the GPX file into the waypoint class, per trackpoint.
+#     calculator  WP.calculator(), per trackpoint.
+#     prepare     Construction of each gauge including _prepare().
+#     build       make() of each gauge.
+#     render      Rendering a fixed number of frames spread over the clip
+#                 without encoding, per frame.
+#     encode      Rendering and encoding the first seconds of the clip end to
+#                 end, per frame.
+
+# Each stage is run several times and the fastest run is kept. Results are
+# written as JSON. If a baseline file exists, results are compared with it
+# and stages slower than the baseline by more than the tolerance are
+# reported as regressions (exit code 1). --update-baseline stores the
+# results as new baseline. Baselines only make sense on the machine they
+# were recorded on.
+
+# usage: python benchmarks/suite.py [--sizes SEC[,...]] [--rate HZ]
+#                                   [--duplicates SHARE] [--maneuver PROFILE]
+#                                   [--gauges NAME[,...]] [--frames N]
+#                                   [--encode-seconds SEC] [--repeat N]
+#                                   [--output FILE] [--baseline FILE]
+#                                   [--update-baseline] [--tolerance SHARE]
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/02
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+import getopt
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+
+# Gauge modules
+import gauges
+
+# Own libraries
+import flightgen
+from lib.calculations.gui_conv      import scaleXY
+from lib.Metrics                    import METRICS
+from videoGauge                     import VideoGauge
+
+# Foreign libraries
+import moviepy
+import numpy                        as np
+
+
+DEFAULT_BASELINE = os.path.join(BENCHMARKS, "baseline.json")
+
+# Gauge classes and units benchmarked by name.
+GAUGES = {
+    "airspeed"  :   (gauges.Airspeed.Airspeed, "mph"),
+    "altitude"  :   (gauges.Altitude.Altitude, "ft")
+}
+
+
+def best(func, repeat):
+    """
+    Run func repeat times. Returns the shortest time in seconds and the
+    result of the last run.
+    """
+
+    times = []
+    for i in range(repeat):
+        start = time.time()
+        result = func()
+        times.append(time.time() - start)
+
+    return min(times), result
+
+
+class Quiet(object):
+    """
+    Context discarding everything printed to stdout.
+    """
+
+    def __enter__(self):
+        self._Stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+
+    def __exit__(self, *args):
+        sys.stdout.close()
+        sys.stdout = self._Stdout
+        return False
+
+
+def ingest(gpxfile, outputfolder, repeat):
+    """
+    Read gpxfile like videoGauge does. Returns the fastest parse and
+    calculation times and the application of the last run.
+    """
+
+    argv = ["-g", gpxfile, "-o", outputfolder, "-q",
+            "--airspeed", "mph", "--altitude", "ft"]
+
+    parse = []
+    calc = []
+    for i in range(repeat):
+        with Quiet():
+            app = VideoGauge(argv, run=False)
+            METRICS.reset()
+            app._readGPX()
+
+        stages = dict((k[0], v) for k, v in METRICS.snapshot()['stages'])
+        parse.append(stages['parse'][1])
+        calc.append(stages['calculation'][1])
+
+    return min(parse), min(calc), app
+
+
+def gauge(app, name, frames, encodeSeconds, outputfolder, repeat):
+    """
+    Time the stages of gauge name. Returns a list of tuples (stage, seconds,
+    items).
+    """
+
+    cls, unit = GAUGES[name]
+    params = app.params[name]
+    scale = app.VIDEOSETTINGS['scale']
+
+    def construct():
+        g = cls(wpInst=app._wp.getView(), unit=unit, digSpeed=False,
+                autorun=False, settings=app.VIDEOSETTINGS)
+        g.setSize(*scaleXY(params['size'], scale))
+        g.setPosition(*scaleXY(params['position'], scale))
+        return g
+
+    tPrepare, g = best(construct, repeat)
+    tBuild, clip = best(g.make, repeat)
+
+    times = np.linspace(0, clip.duration, frames, endpoint=False)
+    tRender, _ = best(lambda: [clip.get_frame(t) for t in times], repeat)
+
+    sub = clip.subclip(0, min(encodeSeconds, clip.duration))
+    count = int(sub.duration * app.VIDEOSETTINGS['framerate'])
+    path = os.path.join(outputfolder, name + app.VIDEOSETTINGS['filetype'])
+    tEncode, _ = best(lambda: g.save(sub, path, force=True), repeat)
+
+    return [("prepare", tPrepare, 1), ("build", tBuild, 1),
+            ("render", tRender, frames), ("encode", tEncode, count)]
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print results next to baseline. Returns list of names of regressions.
+    """
+
+    old = dict((r['name'], r) for r in baseline['results'])
+    regressions = []
+
+    print("\n%-32s %12s %12s %8s" % ("Benchmark", "Baseline", "Current",
+                                     "Ratio"))
+    for r in results:
+        b = old.get(r['name'])
+        if b is None:
+            print("%-32s %12s %12.6f %8s" % (r['name'], "-", r['value'], "new"))
+            continue
+
+        ratio = r['value'] / b['value'] if b['value'] > 0 else float("inf")
+        flag = ""
+        if ratio > 1.0 + tolerance:
+            flag = "  SLOWER"
+            regressions.append(r['name'])
+        elif ratio < 1.0 - tolerance:
+            flag = "  faster"
+
+        print("%-32s %12.6f %12.6f %7.2fx%s" % (r['name'], b['value'],
+            r['value'], ratio, flag))
+
+    return regressions
+
+
+def usage():
+
+    print("usage: suite.py [--sizes SEC[,...]] [--rate HZ] "
+          "[--duplicates SHARE] [--maneuver PROFILE] [--gauges NAME[,...]] "
+          "[--frames N] [--encode-seconds SEC] [--repeat N] "
+          "[--output FILE] [--baseline FILE] [--update-baseline] "
+          "[--tolerance SHARE]")
+    sys.exit(2)
+
+
+def main():
+
+    options = {
+        "sizes"         :   [60, 600, 3600],
+        "rate"          :   1.0,
+        "duplicates"    :   0.02,
+        "maneuver"      :   "mixed",
+        "gauges"        :   sorted(GAUGES),
+        "frames"        :   48,
+        "encodeSeconds" :   10.0,
+        "repeat"        :   3,
+        "output"        :   None,
+        "baseline"      :   DEFAULT_BASELINE,
+        "updateBaseline":   False,
+        "tolerance"     :   0.2
+    }
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "", ["sizes=", "rate=",
+            "duplicates=", "maneuver=", "gauges=", "frames=",
+            "encode-seconds=", "repeat=", "output=", "baseline=",
+            "update-baseline", "tolerance="])
+    except getopt.GetoptError:
+        usage()
+
+    for opt, arg in opts:
+        if opt == "--sizes":
+            options['sizes'] = [int(s) for s in arg.split(",")]
+        elif opt == "--rate":
+            options['rate'] = float(arg)
+        elif opt == "--duplicates":
+            options['duplicates'] = float(arg)
+        elif opt == "--maneuver":
+            options['maneuver'] = arg
+        elif opt == "--gauges":
+            options['gauges'] = arg.split(",")
+        elif opt == "--frames":
+            options['frames'] = int(arg)
+        elif opt == "--encode-seconds":
+            options['encodeSeconds'] = float(arg)
+        elif opt == "--repeat":
+            options['repeat'] = int(arg)
+        elif opt == "--output":
+            options['output'] = arg
+        elif opt == "--baseline":
+            options['baseline'] = arg
+        elif opt == "--update-baseline":
+            options['updateBaseline'] = True
+        elif opt == "--tolerance":
+            options['tolerance'] = float(arg)
+
+    for name in options['gauges']:
+        if name not in GAUGES:
+            print("Unknown gauge '%s'! Known: %s" % (name,
+                ", ".join(sorted(GAUGES))))
+            sys.exit(2)
+
+    tmp = tempfile.mkdtemp(prefix="videogauge_bench_")
+    results = []
+
+    def add(name, seconds, items):
+        results.append({"name": name, "seconds": seconds, "items": items,
+                        "value": seconds / items})
+        print("%-32s %10.3f sec %10.6f sec/item" % (name, seconds,
+            seconds / items))
+
+    try:
+        for size in options['sizes']:
+            gpxfile = os.path.join(tmp, "flight_%d.gpx" % size)
+            points = flightgen.generate(size, options['rate'],
+                options['duplicates'], options['maneuver'])
+            flightgen.writeGPX(points, gpxfile)
+
+            prefix = "%ds" % size
+            tParse, tCalc, app = ingest(gpxfile, tmp, options['repeat'])
+            add(prefix + "/ingest", tParse, len(points))
+            add(prefix + "/calculator", tCalc, len(points))
+
+            for name in options['gauges']:
+                for stage, seconds, items in gauge(app, name,
+                    options['frames'], options['encodeSeconds'], tmp,
+                    options['repeat']):
+                    add("%s/%s/%s" % (prefix, name, stage), seconds, items)
+
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "meta"  :   {
+            "date"      :   time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python"    :   platform.python_version(),
+            "platform"  :   platform.platform(),
+            "numpy"     :   np.__version__,
+            "moviepy"   :   moviepy.__version__,
+            "options"   :   dict((k, v) for k, v in options.items()
+                                 if k not in ("output", "baseline"))
+        },
+        "results"   :   results
+    }
+
+    if options['output']:
+        with open(options['output'], "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    regressions = []
+    if os.path.isfile(options['baseline']) and not options['updateBaseline']:
+        with open(options['baseline'], "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, options['tolerance'])
+
+    if options['updateBaseline']:
+        with open(options['baseline'], "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print("Baseline written to %s" % options['baseline'])
+
+    if regressions:
+        print("\n%d regressions: %s" % (len(regressions),
+            ", ".join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# EOF
@@ -23,7 +23,7 @@
 
 # Creator:  Florian Meissner
 #           n1990b@gmx.de
-# Version:  1.0
+# Version:  1.1
 # Date:     2017/04/07
 
 
@@ -37,6 +37,8 @@
 # 0.3:  - Implemented waypoint class as data source.
 # 1.0:  - Stable version
 #       - Moved save() method to BaseGauge.
+# 1.1:  - Compose with the compositor of the base class.
+#       - Digital speed rendered per frame instead of text clips.
 
 
 ###############################################################################
@@ -44,6 +46,7 @@
 
 # Gauge modules
 import BaseGauge
+import Needle
 
 # Own library modules
 from lib.calculations       import av_conv
@@ -51,7 +54,6 @@ from lib.myMisc             import lookahead
 
 # Foreign libraries
 from math                   import sqrt
-import moviepy.editor       as mpy
 
 
 class Airspeed(BaseGauge.AbstractBaseGauge):
@@ -115,76 +117,22 @@ class Airspeed(BaseGauge.AbstractBaseGauge):
         Create final video clip.
         """
 
-        # Create needles
-        self._rotate_needle(self._Speeds)
-        needleClip = self._concate_needles()
-
-        # Create faceplate
-        faceplateClip = self._create_faceplate_clip()
-
-        # Create background.
-        bgClip = self._create_background()
-
-        # Create gauge clip without background at first because otherwise needle
-        # will be moved out of center of faceplate.
-        gaugeclip = [
-            faceplateClip \
-                .resize(self._Size) \
-                .set_position('center'),
-            needleClip \
-                .resize((self._Size[0]*1.5, self._Size[1]*1.5)) \
-                .set_position('center')
-        ]
-        gaugeclip = mpy.CompositeVideoClip(gaugeclip)
-
-        # Get clips in order. First clip will be played at the bottom, last at the top.
-        composition = [
-            bgClip,
-            gaugeclip.set_position(self._Position)
-        ]
-
-        # Create digital speed display.
-        if self._DigSpeed:
-            self.__show_speed()
-            composition.append(self._SpeedClip)
-
-        # Compose clips and export.
-        final_video = mpy.CompositeVideoClip(composition)
-        return final_video
-
-
-    # -------------------------------------------------------------------------
-    # - Digital speeds                                                        -
-    # -------------------------------------------------------------------------
+        needles = [(self._needle(), self._angle_function(self._Speeds))]
 
-
-    def __show_speed(self):
-        """
-        In verbose mode show speeds digitally below airspeed indicator.
-        """
-
-        # Only shw speeds in verbose mode.
+        # Create digital speed display in the upper left corner of the video.
         if self._DigSpeed:
+            x, y = self._gauge_position()
+            needles.append((Needle.TextDisplay(self._Size, xy=(-x, -y)),
+                            self._value_function(self._Speeds, 'speed')))
+
+        # Faceplate and needle composed on the background color.
+        final_video = self._compose(
+            [self._load_asset(self._FaceplateImage)],
+            needles
+        )
+
+        return self._trim_to_window(final_video)
 
-            # Iterate threw track points and grap speed and length.
-            speedClips = []
-            for trkPt in self._Speeds:
-                speed = "%2.1f" % trkPt['speed']
-                length = trkPt['duration']
-
-                # Create TextClip for each track point.
-                speedClips.append(mpy.TextClip( txt             =   speed,
-                                                color           =   "white",
-                                                bg_color        =   "transparent",
-                                                fontsize        =   30,
-                                                print_cmd       =   False,
-                                                tempfilename    =   "text" + speed + ".png",
-                                                remove_temp     =   True
-                                              ).set_duration(length)
-                                 )
-
-            # Merge track point text clips.
-            self._SpeedClip = mpy.concatenate_videoclips(speedClips)
 
 # EOF
 
@@ -21,7 +21,7 @@
 
 # Creator:  Florian Meissner
 #           n1990b@gmx.de
-# Version:  0.1
+# Version:  0.2
 # Date:     2017/04/07
 
 
@@ -29,6 +29,7 @@
 # ===============
 
 # 0.1:  - Initial Beta
+# 0.2:  - Compose with the compositor of the base class.
 
 
 ###############################################################################
@@ -59,9 +60,6 @@ class Altitude(BaseGauge.AbstractBaseGauge):
         self._Altitudes =   []          # List with altitudes from track point
                                         # list. Populated by self.__convert().
         self._WpInst    =   wpInst      # Instance of waypoint class.
-        self._Needle10000 = []
-        self._Needle1000 = []
-        self._Needle100 = []
 
         # Base class constructor
         super(self.__class__, self).__init__()
@@ -183,50 +181,21 @@ class Altitude(BaseGauge.AbstractBaseGauge):
                 }
             )
 
-        self._rotate_needle(tenthousend, "_Needle10000", "BaseNeedle10000")
-        self._rotate_needle(thousend, "_Needle1000", "BaseNeedle1000")
-        self._rotate_needle(hundret, "_Needle100", "BaseNeedle100")
-
-        needleClip10000 = self._concate_needles("_Needle10000")
-        needleClip1000 = self._concate_needles("_Needle1000")
-        needleClip100 = self._concate_needles("_Needle100")
-
-        # Create faceplate
-        faceplateClip = self._create_faceplate_clip()
-
-        # QNH clip
-        qnhClip = self._create_faceplate_clip("_QnhImage")
-
-        # Create background.
-        bgClip = self._create_background()
-
-        # Create gauge clip without background at first because otherwise needle
-        # will be moved out of center of faceplate.
-        gaugeclip = [
-            qnhClip \
-                .resize(self._Size) \
-                .set_position('center'),
-            faceplateClip \
-                .resize(self._Size) \
-                .set_position('center'),
-            needleClip10000 \
-                .resize((self._Size[0]*1.5, self._Size[1]*1.5)) \
-                .set_position('center'),
-            needleClip1000 \
-                .resize((self._Size[0]*1.5, self._Size[1]*1.5)) \
-                .set_position('center'),
-            needleClip100 \
-                .resize((self._Size[0]*1.5, self._Size[1]*1.5)) \
-                .set_position('center')
-        ]
-        gaugeclip = mpy.CompositeVideoClip(gaugeclip)
-
-        # Get clips in order. First clip will be played at the bottom, last at
-        # the top.
-        composition = [
-            bgClip,
-            gaugeclip.set_position(self._Position)
-        ]
+        # QNH window, faceplate and needles composed on the background color.
+        final_video = self._compose(
+            [
+                self._load_asset(self._QnhImage),
+                self._load_asset(self._FaceplateImage)
+            ],
+            [
+                (self._needle("BaseNeedle10000"),
+                    self._angle_function(tenthousend)),
+                (self._needle("BaseNeedle1000"),
+                    self._angle_function(thousend)),
+                (self._needle("BaseNeedle100"),
+                    self._angle_function(hundret))
+            ]
+        )
 
         # Create digital speed display.
         """
@@ -235,9 +204,7 @@ class Altitude(BaseGauge.AbstractBaseGauge):
             composition.append(self._SpeedClip)
         """
 
-        # Compose clips and export.
-        final_video = mpy.CompositeVideoClip(composition)
-        return final_video
+        return self._trim_to_window(final_video)
 
 
     # -------------------------------------------------------------------------
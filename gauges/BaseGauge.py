@@ -16,7 +16,6 @@
 # TODO
 # ====
 
-# - Add smooth needle rotation
 # - Adapt for gauges with multiple needles
 
 
@@ -25,7 +24,7 @@
 
 # Creator:  Florian Meissner
 #           n1990b@gmx.de
-# Version:  1.0
+# Version:  1.1
 # Date:     2017/04/07
 
 
@@ -36,23 +35,60 @@
 # 0.2:  - Make class abstract
 # 1.0:  - Stable version
 #       - Added save() method
+# 1.1:  - Cut clips to time window of waypoint class.
+#       - Time lapse and contact sheet for preview renders.
+#       - Added saveMulti() to encode several resolutions in one pass.
+#       - Load images through asset cache in the size of the gauge.
+#       - Optional procedural needles.
+#       - Rotate needle images about a declared pivot with affine transforms
+#         instead of MoviePy's rotate().
+#       - Compose gauges with the fixed point compositor instead of MoviePy.
+#       - Render frames in several processes if requested.
+#       - Cache calibration tables per process.
+#       - Labelled progress bars for gauges rendered side by side.
+#       - Timing of stages and frames and cache statistics.
+#       - Profiling scopes for frames.
+#       - Render in segments which can be resumed.
+#       - Keep needles of the composition for render plans.
+#       - Size caches to a memory budget and look up track points in time
+#         order.
 
 
 ###############################################################################
 
 
+# Gauge modules
+import Needle
+
 # Own libraries
 from lib.calculations   import av_conv, gui_conv, interpolation, triangulation
+from lib.calculations.time_conv import sec2hms
 from lib.Exceptions     import *
+from lib.FrameRing      import frameTimes, renderFrames
+from lib.AssetCache     import ASSETS
+from lib.Checkpoint     import Checkpoint, digest
+from lib.Compositor     import Compositor, premultiply
+from lib.MemoryBudget   import budgetCaches
+from lib.Metrics        import METRICS, cpuTime
+from lib.Profiler       import PROFILER
 from lib.myMisc         import basePath
+from lib.MultiEncoder   import MultiEncoder
 
 # Foreign libraries
-from PIL                import Image
+from PIL                import Image, ImageDraw
+from time               import time
 import abc
 import importlib
 import logging          as log
 import moviepy.editor   as mpy
+import numpy            as np
 import os
+import tqdm
+
+
+# Calibration tables of the gauge scripts with their sorted known values.
+# Shared by all gauges of a process.
+CALIBRATIONS = {}
 
 
 class AbstractBaseGauge(object):
@@ -67,10 +103,13 @@ class AbstractBaseGauge(object):
 
         # Defaults
         self._Position = "center"
+        self._NeedleCache = {}
 
         # Initializer methods
         self.__parse_unit()
-        self._prepare()
+        with METRICS.stage("prepare", self._name()), \
+            PROFILER.scope("prepare"):
+            self._prepare()
 
         # Initializers
         self._BgColor = (0, 0, 255)
@@ -82,19 +121,6 @@ class AbstractBaseGauge(object):
     # -------------------------------------------------------------------------
 
 
-    def _create_background(self):
-        """
-        Get clip showing background color over the hole duration of the video.
-        """
-
-        clip = mpy.ColorClip(
-            size=(gui_conv.splitXY(self._Settings['format'])),
-            col=self._BgColor,
-            duration=self._WpInst.getDuration()
-        )
-        return clip
-
-
     def setBackground(self, r, g, b):
         """
         Set color for background. Overwrites default.
@@ -108,9 +134,60 @@ class AbstractBaseGauge(object):
     # -------------------------------------------------------------------------
 
 
-    def save(self, clip, path, settings=None, force=False):
+    def _gauge_position(self):
         """
-        Save compiled video to disk.
+        Get position of the upper left corner of the gauge within the video.
+        """
+
+        if self._Position == "center":
+            w, h = gui_conv.splitXY(self._Settings['format'])
+            return ((w - self._Size[0]) // 2, (h - self._Size[1]) // 2)
+
+        return self._Position
+
+
+    def _compose(self, layers, needles):
+        """
+        Create clip of the gauge on the background color. layers is a list of
+        static images (RGBA arrays in the size of the gauge) from bottom to
+        top. needles is a list of tuples (needle, angle function) drawn on
+        top of them.
+        """
+
+        x, y = self._gauge_position()
+        self._ComposedNeedles = needles
+        size = gui_conv.splitXY(self._Settings['format'])
+
+        compositor = Compositor(size, self._BgColor)
+        for layer in layers:
+            compositor.addStatic(premultiply(layer), (x, y))
+
+        if self._Settings.get('memory_budget'):
+            budgetCaches(
+                self._Settings['memory_budget'],
+                size,
+                [n for n, a in needles if isinstance(n, Needle.RasterNeedle)],
+                ASSETS,
+                outputs=len(self._Settings.get('formats') or [size]),
+                workers=self._Settings.get('render_workers', 1)
+            )
+
+        def make_frame(t):
+            rois = []
+            with PROFILER.scope("needles"):
+                for needle, angle in needles:
+                    roi, (nx, ny) = needle.render(angle(t))
+                    rois.append((roi, (x + nx, y + ny)))
+            with PROFILER.scope("composite"):
+                return compositor.frame(rois)
+
+        return mpy.VideoClip(make_frame, duration=self._WpInst.getDuration())
+
+
+    def _chkOutputFile(self, path, force=False):
+        """
+        Make sure that path can be written. Existing files are removed after
+        the user agreed to or if force is set.
         """
 
         if os.path.isdir(path):
@@ -135,9 +212,44 @@ class AbstractBaseGauge(object):
             else:
                 raise IOError("Aborted by user...")
 
+
+    def _timelapse(self, clip, stride, fps):
+        """
+        Speed up clip so that each frame shows the next 'stride' seconds of
+        the track. Only every n-th point in time of the clip will be
+        rendered.
+        """
+
+        speed = float(stride) * fps
+        return clip \
+            .fl_time(lambda t: t * speed) \
+            .set_duration(clip.duration / speed)
+
+
+    def save(self, clip, path, settings=None, force=False):
+        """
+        Save compiled video to disk.
+        """
+
         if settings is None:
             settings = self._Settings
 
+        # Frames of several render processes are fed to our own encoder. So
+        # are the frames of gauges rendered side by side to label their
+        # progress bars, the frames to be timed and segmented renders.
+        if settings.get('render_workers', 1) > 1 or \
+            settings.get('progress_label') or METRICS.isOpen() or \
+            settings.get('segment_length'):
+            self.saveMulti(clip, [(path, tuple(clip.size))], settings, force)
+            return
+
+        self._chkOutputFile(path, force)
+
+        # Preview renders show the track in time lapse.
+        if settings.get('stride'):
+            clip = self._timelapse(clip, settings['stride'],
+                settings['framerate'])
+
         clip.write_videofile(path,
                              fps=settings['framerate'],
                              codec=settings['codec'],
@@ -146,19 +258,227 @@ class AbstractBaseGauge(object):
                              preset=settings['ffmpeg_preset'])
 
 
+    def saveMulti(self, clip, outputs, settings=None, force=False):
+        """
+        Save compiled video in several resolutions at once. outputs expects a
+        list of tuples (path, (width, height)). Each frame is rendered only
+        once in the resolution of the clip and downscaled for smaller outputs.
+        """
+
+        for path, size in outputs:
+            self._chkOutputFile(path, force)
+
+        if settings is None:
+            settings = self._Settings
+
+        if settings.get('stride'):
+            clip = self._timelapse(clip, settings['stride'],
+                settings['framerate'])
+
+        times = frameTimes(clip.duration, settings['framerate'])
+
+        if settings.get('segment_length'):
+            self._saveSegments(clip, times, outputs, settings)
+        else:
+            self._encodeFrames(clip, times, outputs, settings)
+
+        for needle in self._NeedleCache.values():
+            if isinstance(needle, Needle.RasterNeedle):
+                METRICS.count("needle_hits", needle.hits)
+                METRICS.count("needle_misses", needle.misses)
+
+
+    def _saveSegments(self, clip, times, outputs, settings):
+        """
+        Render frames at times in segments of settings['segment_length']
+        seconds, each encoded into files of its own, and join them into the
+        outputs. Segments finished by an earlier render of the same video are
+        kept if settings['resume'] is set.
+        """
+
+        length = int(round(settings['segment_length'] * settings['framerate']))
+        count = max(1, (len(times) + length - 1) // length)
+
+        # Everything the frames depend on.
+        window = None
+        if self._WpInst.hasWindow():
+            window = (self._WpInst.getWindowOffset(),
+                      self._WpInst.getWindowLength())
+
+        ignored = ('progress_label', 'progress_position', 'ffmpeg_threads',
+                   'render_workers', 'gauge_jobs', 'resume')
+        key = digest(
+            settings.get('input_digest'),
+            self._name(), self._Unit, self._Size, self._Position,
+            self._BgColor, window, clip.size, len(times), outputs,
+            dict((k, v) for k, v in settings.items() if k not in ignored)
+        )
+
+        checkpoint = Checkpoint([path for path, size in outputs], key, count,
+            resume=settings.get('resume', False))
+
+        for index in checkpoint.missing():
+            parts = zip(checkpoint.partFiles(index),
+                        [size for path, size in outputs])
+            for path, size in parts:
+                if os.path.isfile(path):
+                    os.remove(path)
+
+            log.info("Rendering segment %d of %d." % (index + 1, count))
+            self._encodeFrames(clip, times[index * length:(index + 1) * length],
+                parts, dict(settings, progress_label="%s %d/%d" %
+                (settings.get('progress_label') or self._name(), index + 1,
+                count)))
+
+            checkpoint.finish(index)
+
+        checkpoint.join()
+
+
+    def _encodeFrames(self, clip, times, outputs, settings):
+        """
+        Render frames of clip at times and encode them into outputs.
+        """
+
+        workers = settings.get('render_workers', 1)
+
+        encoder = MultiEncoder(outputs, clip.size, settings)
+        try:
+            if workers > 1:
+                # Frames are views into shared memory which is reused once
+                # the encoders took them over.
+                frames = renderFrames(clip, times, workers)
+            else:
+                frames = (clip.get_frame(t).astype("uint8") for t in times)
+            self._encode(frames, len(times), encoder, settings,
+                sync=workers > 1)
+        finally:
+            wall = time()
+            cpu = cpuTime()
+            encoder.close()
+            METRICS.add("encode", time() - wall, cpuTime() - cpu,
+                self._name())
+
+
+    def _encode(self, frames, total, encoder, settings, sync=False):
+        """
+        Pass frames to encoder. The time waiting for a frame is counted as
+        rendering, the time to hand it over as encoding. With several render
+        processes the frames are rendered meanwhile, so only the waiting time
+        is seen here. If sync is set, the encoders are waited for after each
+        frame.
+        """
+
+        gauge = self._name()
+        frames = iter(self._progress(frames, total, settings))
+        start = time()
+        done = 0
+
+        while True:
+            wall = time()
+            cpu = cpuTime()
+            try:
+                with PROFILER.scope("render"):
+                    frame = next(frames)
+            except StopIteration:
+                break
+
+            rendered = time()
+            renderedCpu = cpuTime()
+            with PROFILER.scope("encode"):
+                encoder.write_frame(frame)
+                if sync:
+                    encoder.sync()
+
+            METRICS.add("render", rendered - wall, renderedCpu - cpu, gauge, 1)
+            METRICS.add("encode", time() - rendered, cpuTime() - renderedCpu,
+                gauge, 1)
+
+            done += 1
+            METRICS.progress(gauge, done, total, start)
+
+
+    def _name(self):
+        """
+        Return name of the gauge used in reports.
+        """
+
+        return self.__class__.__name__.lower()
+
+
+    def _progress(self, frames, total, settings):
+        """
+        Wrap iterator frames into a progress bar. Gauges rendered side by side
+        get a labelled bar on their own line.
+        """
+
+        return tqdm.tqdm(frames, total=total,
+                         desc=settings.get('progress_label'),
+                         position=settings.get('progress_position'))
+
+
+    def _trim_to_window(self, clip):
+        """
+        Cut the composed clip to the time window set in the waypoint class.
+        The clip is expected to start with the first waypoint inside the
+        window.
+        """
+
+        if not self._WpInst.hasWindow():
+            return clip
+
+        start = self._WpInst.getWindowOffset()
+        end = start + self._WpInst.getWindowLength()
+        return clip.subclip(start, min(end, clip.duration))
+
+
+    def saveContactSheet(self, clip, path, settings=None, force=False):
+        """
+        Save a single image showing frames of the clip side by side. A frame
+        is taken every 'stride' seconds and labelled with its time.
+        """
+
+        self._chkOutputFile(path, force)
+
+        if settings is None:
+            settings = self._Settings
+
+        stride = float(settings.get('stride') or 1)
+        columns = settings.get('sheet_columns', 8)
+
+        times = []
+        t = 0.0
+        while t < clip.duration:
+            times.append(t)
+            t += stride
+
+        width, height = clip.size
+        rows = (len(times) + columns - 1) // columns
+        sheet = Image.new("RGB", (width * columns, height * rows))
+        draw = ImageDraw.Draw(sheet)
+
+        for i, t in enumerate(times):
+            x = (i % columns) * width
+            y = (i // columns) * height
+            sheet.paste(Image.fromarray(clip.get_frame(t)), (x, y))
+            draw.text((x + 2, y + 2), sec2hms(t), fill=(255, 255, 255))
+
+        sheet.save(path)
+        log.info("Contact sheet with %d frames written to '%s'." %
+            (len(times), path))
+
+
     # -------------------------------------------------------------------------
     # - Faceplate                                                             -
     # -------------------------------------------------------------------------
 
 
-    def _create_faceplate_clip(self, var="_FaceplateImage"):
+    def _load_asset(self, path):
         """
-        Create clip with stanting image of faceplate.
+        Get image at path as RGBA array resampled to the size of the gauge.
         """
 
-        clip = mpy.ImageClip(getattr(self, var))
-        clip = clip.set_duration(self._WpInst.getDuration())
-        return clip
+        return ASSETS.load(path, self._Size)
 
 
     def setFaceplate(self, path=None, filename='faceplate.png', \
@@ -176,8 +496,7 @@ class AbstractBaseGauge(object):
         setattr(self, var, pathComplete)
 
         # Get image size.
-        with Image.open(pathComplete) as im:
-            self._Size = im.size
+        self._Size = ASSETS.getSize(pathComplete)
 
 
     # -------------------------------------------------------------------------
@@ -249,40 +568,21 @@ class AbstractBaseGauge(object):
     # - Needle                                                                -
     # -------------------------------------------------------------------------
 
-    def __animateNeedleRotation(self, aFrom, aTo, dur, needleImg):
-        """
-        Animate rotation of the needle over a given timeframe. This method
-        should only be called from s_rotate_needle(). It wrties the rusulting
-        animation directly to self.Needles.
-        """
-
-        # Get base needle instance and set duration for animation.
-        #~ baseNeedle = self.BaseNeedle.set_duration(dur)
-        baseNeedle = getattr(self, needleImg).set_duration(dur)
-
-        # Calculate rotation angle. (Way to go)
-        # Calculation is valid for 1 sec. So divide by duration of animation.
-        # Using starting point first in the subtraction results in negative
-        # delta values if needle should show rise.
-        delta = (aFrom - aTo) / dur
-
-        # Invert starting angle because of rotation direction.
-        aFrom = aFrom * -1
-
-        # Rotate needle
-        return baseNeedle.rotate(lambda t: aFrom+t*delta)
-
-
     def _calibration(self, value, calFunc='calibration'):
         """
         Calibate scale of faceplate.
         """
 
-        calibration = self._Gauge_script.calibration()
+        # Get calibration table and list of known values.
+        script = self._Gauge_script.__name__
+        if script not in CALIBRATIONS:
+            METRICS.count("calibration_misses")
+            calibration = self._Gauge_script.calibration()
+            CALIBRATIONS[script] = (calibration, sorted(calibration.keys()))
+        else:
+            METRICS.count("calibration_hits")
 
-        # Get list of known values.
-        knownValues = list(calibration.keys())
-        knownValues.sort()
+        calibration, knownValues = CALIBRATIONS[script]
 
         # Check if value is out of scale.
         if value > max(knownValues):
@@ -318,31 +618,104 @@ class AbstractBaseGauge(object):
             return angle
 
 
-    def _concate_needles(self, needleList="_Needles"):
+    def _angle_function(self, values):
         """
-        Create video containing all needle positions after another with
-        respective length.
+        Return function angle(t) interpolating the needle angle linearly
+        between 'angleFrom' and 'angleTo' of each track point.
         """
 
-        return mpy.concatenate_videoclips(getattr(self, needleList), \
-            method="compose", bg_color=None)
+        values = [v for v in values if v['duration'] > 0]
 
+        durations = np.array([v['duration'] for v in values], dtype=float)
+        angleFrom = np.array([v['angleFrom'] for v in values], dtype=float)
+        angleTo = np.array([v['angleTo'] for v in values], dtype=float)
 
-    def _rotate_needle(self, values, needleList="_Needles", needleImg="BaseNeedle"):
+        starts = np.concatenate(([0.0], np.cumsum(durations)[:-1]))
+        slopes = (angleTo - angleFrom) / durations
+        index = self._track_index(starts)
+
+        def angle(t):
+            i = index(t)
+            return angleFrom[i] + (t - starts[i]) * slopes[i]
+
+        return angle
+
+
+    def _value_function(self, values, field):
         """
-        Rotate needle image by given angle of track point.
-        This function does the preamptive work for the rotation.
+        Return function value(t) returning field of the track point shown at
+        t, e.g. for digital displays.
         """
 
-        for v in values:
-            if v['duration'] > 0:
-                rotImg = self.__animateNeedleRotation(
-                    v['angleFrom'],
-                    v['angleTo'],
-                    v['duration'],
-                    needleImg
-                )
-                getattr(self, needleList).append(rotImg)
+        values = [v for v in values if v['duration'] > 0]
+
+        durations = np.array([v['duration'] for v in values], dtype=float)
+        data = [v[field] for v in values]
+
+        starts = np.concatenate(([0.0], np.cumsum(durations)[:-1]))
+        index = self._track_index(starts)
+
+        def value(t):
+            return data[index(t)]
+
+        return value
+
+
+    def _track_index(self, starts):
+        """
+        Return function index(t) of the track point shown at t given the
+        sorted start times of the track points. Frames are rendered in time
+        order, so the track point of the last call or the next one is checked
+        before searching.
+        """
+
+        bounds = starts.tolist() + [float("inf")]
+        last = len(starts) - 1
+        cursor = [0]
+
+        def index(t):
+            i = cursor[0]
+            if not bounds[i] <= t < bounds[i + 1]:
+                if bounds[i + 1] <= t < bounds[min(i + 2, last + 1)]:
+                    i += 1
+                else:
+                    i = np.searchsorted(starts, t, side="right") - 1
+                    i = min(max(i, 0), last)
+                cursor[0] = i
+            return i
+
+        return index
+
+
+    def _needle(self, needleImg="BaseNeedle"):
+        """
+        Get needle object rendering needleImg. Shapes and pivots are taken
+        from needles() of the gauge script if it defines one. Procedural
+        needles are used if vector needles are enabled in the video settings
+        and the gauge script describes the needle. Otherwise the needle image
+        is rotated about its pivot. Needles are created once per image.
+        """
+
+        if needleImg in self._NeedleCache:
+            return self._NeedleCache[needleImg]
+
+        shape = {}
+        if hasattr(self._Gauge_script, "needles"):
+            shape = self._Gauge_script.needles().get(needleImg, {})
+
+        vector = self._Settings and self._Settings.get('vector_needles')
+
+        if vector and 'shapes' in shape:
+            needle = Needle.VectorNeedle(shape, self._Size)
+        else:
+            needle = Needle.RasterNeedle(
+                self._load_asset(getattr(self, needleImg)),
+                self._Size,
+                shape.get('pivot', (0.5, 0.5))
+            )
+
+        self._NeedleCache[needleImg] = needle
+        return needle
 
 
     def setNeedle(self, path=None, filename="needle.png", var="BaseNeedle"):
@@ -354,7 +727,7 @@ class AbstractBaseGauge(object):
         if path is None:
             path = self._PathPrefix
 
-        setattr(self, var, mpy.ImageClip(path+filename))
+        setattr(self, var, path+filename)
 
 
 #EOF
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Needles                                                                   *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Needles of gauges rendered frame by frame. A needle renders itself for a
+# given angle into a small RGBA region of interest (ROI) with premultiplied
+# alpha together with the position of the ROI within the gauge. Only this
+# region has to be processed per frame instead of an image of the size of
+# the hole gauge.
+
+# Angles are given in degrees clockwise from 12 o'clock as returned by the
+# calibration tables. Needles rotate about a pivot declared as fraction of the
+# gauge size, so pivots off the center of the gauge (e.g. VSI shaft covers)
+# work as well.
+
+# Digital displays follow the same interface and render a value as text.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.2
+# Date:     2017/04/27
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+#       - Procedural needles drawn from shapes of the gauge scripts.
+# 0.2:  - Raster needles rotated about their pivot with affine transforms of
+#         their bounding box only.
+#       - Render premultiplied ROIs for the compositor.
+#       - Statistics of the angle cache.
+#       - Angle caches sized at runtime.
+#       - Digital displays rendered per frame instead of text clips.
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.Exceptions     import *
+
+# Foreign libraries
+from collections        import OrderedDict
+from math               import ceil, cos, floor, radians, sin, sqrt
+from PIL                import Image, ImageDraw, ImageFont
+import abc
+import numpy            as np
+
+
+class AbstractNeedle(object):
+
+    __metaclass__ = abc.ABCMeta
+
+    def __init__(self, size):
+
+        self._Size = (int(size[0]), int(size[1]))    # Size of the gauge
+
+
+    @abc.abstractmethod
+    def render(self, angle):
+        """
+        Render needle for angle. Returns a tuple (roi, (x, y)) with roi being
+        an RGBA array with premultiplied alpha and (x, y) the position of its
+        upper left corner within the gauge.
+        """
+
+        raise AbstractImplementationRequired("render()")
+
+
+class VectorNeedle(AbstractNeedle):
+
+    SUPERSAMPLING = 4       # Subpixels per pixel and axis for antialiasing
+
+    def __init__(self, shape, size):
+        """
+        shape expects a dict as returned by needles() of a gauge script:
+
+        'pivot'     Center of rotation as fraction of the gauge size.
+        'shapes'    List of tuples (type, color, geometry) drawn in the given
+                    order. type is either 'polygon' with geometry being a
+                    list of points or 'circle' with geometry (x, y, radius).
+                    Coordinates are fractions of the gauge size relative to
+                    the pivot with the needle pointing up (0 deg).
+        """
+
+        super(VectorNeedle, self).__init__(size)
+
+        w, h = self._Size
+        px, py = shape.get('pivot', (0.5, 0.5))
+        self._Pivot = (px * w, py * h)
+
+        # Convert geometry into pixels relative to pivot.
+        self._Shapes = []
+        for kind, color, geometry in shape['shapes']:
+            if kind == "polygon":
+                geometry = [(x * w, y * h) for x, y in geometry]
+            elif kind == "circle":
+                x, y, r = geometry
+                geometry = (x * w, y * h, r * w)
+            else:
+                raise ValueError("Unknown needle shape '%s'!" % kind)
+            self._Shapes.append((kind, tuple(color) + (255,), geometry))
+
+
+    def render(self, angle):
+
+        a = radians(angle)
+        ca = cos(a)
+        sa = sin(a)
+        px, py = self._Pivot
+
+        # Rotate geometry clockwise around pivot.
+        rotated = []
+        xs = []
+        ys = []
+        for kind, color, geometry in self._Shapes:
+            if kind == "polygon":
+                pts = [(px + x * ca - y * sa, py + x * sa + y * ca)
+                       for x, y in geometry]
+                xs += [p[0] for p in pts]
+                ys += [p[1] for p in pts]
+            else:
+                x, y, r = geometry
+                cx = px + x * ca - y * sa
+                cy = py + x * sa + y * ca
+                pts = (cx, cy, r)
+                xs += [cx - r, cx + r]
+                ys += [cy - r, cy + r]
+            rotated.append((kind, color, pts))
+
+        # Bounding box of the needle in whole pixels.
+        x0 = int(floor(min(xs)))
+        y0 = int(floor(min(ys)))
+        x1 = int(ceil(max(xs))) + 1
+        y1 = int(ceil(max(ys))) + 1
+
+        # Draw supersampled and reduce to get antialiased edges.
+        ss = self.SUPERSAMPLING
+        im = Image.new("RGBA", ((x1 - x0) * ss, (y1 - y0) * ss), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(im)
+
+        for kind, color, pts in rotated:
+            if kind == "polygon":
+                draw.polygon([((x - x0) * ss, (y - y0) * ss) for x, y in pts],
+                             fill=color)
+            else:
+                cx, cy, r = pts
+                draw.ellipse([(cx - r - x0) * ss, (cy - r - y0) * ss,
+                              (cx + r - x0) * ss, (cy + r - y0) * ss],
+                             fill=color)
+
+        im = im.convert("RGBa").resize((x1 - x0, y1 - y0), Image.BOX)
+        return premultipliedArray(im), (x0, y0)
+
+
+class RasterNeedle(AbstractNeedle):
+
+    ANGLE_STEP = 0.1        # Angles are rounded to this step in degrees.
+    CACHE_SIZE = 512        # Rendered angles kept per needle by default.
+
+    def __init__(self, image, size, pivot=(0.5, 0.5)):
+        """
+        image expects an RGBA array of the needle in the size of the gauge
+        showing the needle at 0 deg. pivot is the center of rotation as
+        fraction of the gauge size.
+        """
+
+        super(RasterNeedle, self).__init__(size)
+
+        w, h = self._Size
+        self._Pivot = (pivot[0] * w, pivot[1] * h)
+        self._Cache = OrderedDict()     # Quantized angle -> (roi, (x, y))
+        self.cacheSize = self.CACHE_SIZE
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+        # Cut needle to the bounding box of its visible pixels. Only this
+        # part is transformed per angle. It is kept premultiplied so
+        # transparent pixels do not bleed into the edges when resampled.
+        alpha = np.asarray(image)[:, :, 3]
+        rows = np.flatnonzero(alpha.any(axis=1))
+        cols = np.flatnonzero(alpha.any(axis=0))
+
+        if len(rows) == 0:
+            self._Sprite = None
+            return
+
+        x0, x1 = cols[0], cols[-1] + 1
+        y0, y1 = rows[0], rows[-1] + 1
+
+        sprite = Image.fromarray(np.ascontiguousarray(image[y0:y1, x0:x1]))
+        self._Sprite = sprite.convert("RGBa")
+
+        # Corners of the sprite relative to the pivot.
+        px, py = self._Pivot
+        self._Offset = (x0 - px, y0 - py)
+        self._Corners = [(x0 - px, y0 - py), (x1 - px, y0 - py),
+                         (x1 - px, y1 - py), (x0 - px, y1 - py)]
+
+
+    def _affine(self, angle):
+        """
+        Return the destination box (x0, y0, x1, y1) of the rotated needle
+        within the gauge and the coefficients of the affine transform mapping
+        pixels of that box back onto the sprite.
+        """
+
+        a = radians(angle)
+        ca = cos(a)
+        sa = sin(a)
+        px, py = self._Pivot
+
+        # Rotate corners clockwise around pivot to get the destination box.
+        xs = [px + x * ca - y * sa for x, y in self._Corners]
+        ys = [py + x * sa + y * ca for x, y in self._Corners]
+        x0 = int(floor(min(xs)))
+        y0 = int(floor(min(ys)))
+        x1 = int(ceil(max(xs)))
+        y1 = int(ceil(max(ys)))
+
+        # Inverse rotation from box coordinates into sprite coordinates.
+        ox, oy = self._Offset
+        dx = x0 - px
+        dy = y0 - py
+        coeffs = (ca, sa, ca * dx + sa * dy - ox,
+                  -sa, ca, -sa * dx + ca * dy - oy)
+
+        return (x0, y0, x1, y1), coeffs
+
+
+    def render(self, angle):
+
+        if self._Sprite is None:
+            return np.zeros((0, 0, 4), dtype=np.uint8), (0, 0)
+
+        key = int(round((angle % 360.0) / self.ANGLE_STEP))
+
+        if key in self._Cache:
+            self.hits += 1
+            roi = self._Cache.pop(key)
+        else:
+            self.misses += 1
+            (x0, y0, x1, y1), coeffs = self._affine(key * self.ANGLE_STEP)
+            im = self._Sprite.transform((x1 - x0, y1 - y0), Image.AFFINE,
+                                        coeffs, Image.BILINEAR)
+            roi = (premultipliedArray(im), (x0, y0))
+
+            while len(self._Cache) >= self.cacheSize:
+                self._Cache.popitem(last=False)
+
+        self._Cache[key] = roi
+        return roi
+
+
+    def setCacheSize(self, entries):
+        """
+        Set the number of rendered angles kept. At least one angle is kept
+        and no more than there are quantized angles.
+        """
+
+        self.cacheSize = min(max(1, int(entries)),
+                             int(round(360.0 / self.ANGLE_STEP)))
+
+        while len(self._Cache) > self.cacheSize:
+            self._Cache.popitem(last=False)
+
+
+    def entryBytes(self):
+        """
+        Return the largest size in bytes of a rendered angle. The bounding
+        box of the rotated sprite is largest at 45 deg.
+        """
+
+        if self._Sprite is None:
+            return 0
+
+        w, h = self._Sprite.size
+        side = int(ceil((w + h) / sqrt(2))) + 2
+        return side * side * 4
+
+
+    def stats(self):
+        """
+        Return dict with cache statistics.
+        """
+
+        return {
+            "hits"      :   self.hits,
+            "misses"    :   self.misses,
+            "entries"   :   len(self._Cache),
+            "bytes"     :   sum(roi.nbytes for roi, xy in self._Cache.values())
+        }
+
+
+class TextDisplay(AbstractNeedle):
+
+    CACHE_SIZE = 256        # Rendered texts kept.
+    FONT = "DejaVuSans.ttf"
+
+    def __init__(self, size, fmt="%2.1f", color=(255, 255, 255), xy=(0, 0),
+        fontsize=30):
+        """
+        Digital display showing values formatted with fmt. xy is the upper
+        left corner in pixels relative to the gauge, fontsize the text height
+        in pixels. Falls back to PIL's bitmap font if FONT is not installed.
+        """
+
+        super(TextDisplay, self).__init__(size)
+
+        self._Format = fmt
+        self._Color = tuple(color) + (255,)
+        self._Position = (int(xy[0]), int(xy[1]))
+        self._Cache = OrderedDict()     # Text -> roi
+
+        try:
+            self._Font = ImageFont.truetype(self.FONT, fontsize)
+        except IOError:
+            self._Font = ImageFont.load_default()
+
+
+    def render(self, value):
+
+        text = self._Format % value
+
+        if text in self._Cache:
+            roi = self._Cache.pop(text)
+        else:
+            im = Image.new("RGBA", self._Font.getsize(text), (0, 0, 0, 0))
+            ImageDraw.Draw(im).text((0, 0), text, font=self._Font,
+                                    fill=self._Color)
+            roi = premultipliedArray(im.convert("RGBa"))
+
+            if len(self._Cache) >= self.CACHE_SIZE:
+                self._Cache.popitem(last=False)
+
+        self._Cache[text] = roi
+        return roi, self._Position
+
+
+def premultipliedArray(im):
+    """
+    Return the data of PIL image im in mode 'RGBa' as array. PIL does not
+    export this mode to numpy directly.
+    """
+
+    w, h = im.size
+    return np.frombuffer(im.tobytes(), dtype=np.uint8).reshape((h, w, 4))
+
+
+# EOF
@@ -22,7 +22,7 @@
 
 # Creator:  Florian Meissner
 #           n1990b@gmx.de
-# Version:  0.1
+# Version:  0.2
 # Date:     2017/03/10
 
 
@@ -30,6 +30,7 @@
 # ===============
 
 # 0.1:  Initial Beta
+# 0.2:  Added procedural needles.
 
 
 ###################################################################################################
@@ -88,3 +89,29 @@ def calibration():
          250 :  346.98
     }
     return cal
+
+
+def needles():
+    """
+    Needles of the gauge. The pivot is the center of rotation of the needle image and given as
+    fraction of the gauge size. Shapes are used instead of the needle images if vector needles
+    are enabled. They are drawn in order and are given as fractions of the gauge size relative
+    to the pivot with the needle pointing up (0 deg).
+    """
+
+    return {
+        "BaseNeedle" : {
+            "pivot"  : (0.5, 0.5),
+            "shapes" : [
+                ("polygon", (0, 0, 0),       [(-0.018, 0.0), (0.018, 0.0), (0.018, 0.12),
+                                              (-0.018, 0.12)]),
+                ("polygon", (255, 255, 255), [(-0.02, 0.0), (-0.012, -0.3), (0.0, -0.34),
+                                              (0.012, -0.3), (0.02, 0.0)]),
+                ("circle",  (0, 0, 0),       (0.0, 0.0, 0.03)),
+                ("circle",  (0, 0, 0),       (0.0, 0.13, 0.03))
+            ]
+        }
+    }
+
+
+# EOF
@@ -22,7 +22,7 @@
 
 # Creator:  Florian Meissner
 #           n1990b@gmx.de
-# Version:  0.1
+# Version:  0.2
 # Date:     2017/03/09
 
 
@@ -30,6 +30,7 @@
 # ===============
 
 # 0.1:  Initial Beta
+# 0.2:  Added procedural needles.
 
 
 ###################################################################################################
@@ -63,3 +64,29 @@ def calibration():
           180 : 337.0
     }
     return cal
+
+
+def needles():
+    """
+    Needles of the gauge. The pivot is the center of rotation of the needle image and given as
+    fraction of the gauge size. Shapes are used instead of the needle images if vector needles
+    are enabled. They are drawn in order and are given as fractions of the gauge size relative
+    to the pivot with the needle pointing up (0 deg).
+    """
+
+    return {
+        "BaseNeedle" : {
+            "pivot"  : (0.5, 0.5),
+            "shapes" : [
+                ("polygon", (128, 128, 128), [(-0.008, 0.0), (0.008, 0.0), (0.008, 0.2),
+                                              (-0.008, 0.2)]),
+                ("polygon", (255, 255, 218), [(-0.012, 0.0), (-0.012, -0.40), (0.0, -0.44),
+                                              (0.012, -0.40), (0.012, 0.0)]),
+                ("circle",  (77, 77, 77),    (0.0, 0.0, 0.028)),
+                ("circle",  (77, 77, 77),    (0.0, 0.2, 0.026))
+            ]
+        }
+    }
+
+
+# EOF
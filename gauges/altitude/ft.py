@@ -22,7 +22,7 @@
 
 # Creator:  Florian Meissner
 #           n1990b@gmx.de
-# Version:  0.1
+# Version:  0.2
 # Date:     2017/04/07
 
 
@@ -30,6 +30,7 @@
 # ===============
 
 # 0.1:  Initial Beta
+# 0.2:  Added procedural needles.
 
 
 ###################################################################################################
@@ -99,6 +100,50 @@ def calibration():
     return cal
 
 
+def needles():
+    """
+    Needles of the gauge. The pivot is the center of rotation of the needle image and given as
+    fraction of the gauge size. Shapes are used instead of the needle images if vector needles
+    are enabled. They are drawn in order and are given as fractions of the gauge size relative
+    to the pivot with the needle pointing up (0 deg).
+    """
+
+    return {
+        "BaseNeedle100" : {
+            "pivot"  : (0.5, 0.5),
+            "shapes" : [
+                ("polygon", (0, 0, 0),       [(-0.008, 0.0), (0.008, 0.0), (0.008, 0.15),
+                                              (-0.008, 0.15)]),
+                ("polygon", (255, 255, 255), [(-0.008, 0.0), (-0.008, -0.23), (0.0, -0.26),
+                                              (0.008, -0.23), (0.008, 0.0)]),
+                ("circle",  (0, 0, 0),       (0.0, 0.15, 0.02)),
+                ("circle",  (255, 255, 255), (0.0, 0.0, 0.025)),
+                ("circle",  (0, 0, 0),       (0.0, 0.0, 0.015))
+            ]
+        },
+        "BaseNeedle1000" : {
+            "pivot"  : (0.5, 0.5),
+            "shapes" : [
+                ("polygon", (0, 0, 0),       [(-0.02, 0.0), (0.02, 0.0), (0.035, 0.1),
+                                              (-0.035, 0.1)]),
+                ("polygon", (255, 255, 255), [(-0.008, 0.0), (-0.008, -0.05), (-0.03, -0.06),
+                                              (-0.03, -0.15), (0.0, -0.186), (0.03, -0.15),
+                                              (0.03, -0.06), (0.008, -0.05), (0.008, 0.0)]),
+                ("circle",  (255, 255, 255), (0.0, 0.0, 0.025)),
+                ("circle",  (0, 0, 0),       (0.0, 0.0, 0.015))
+            ]
+        },
+        "BaseNeedle10000" : {
+            "pivot"  : (0.5, 0.5),
+            "shapes" : [
+                ("polygon", (255, 255, 255), [(-0.004, 0.0), (-0.004, -0.33), (0.004, -0.33),
+                                              (0.004, 0.0)]),
+                ("polygon", (255, 255, 255), [(-0.035, -0.367), (0.035, -0.367), (0.0, -0.3)])
+            ]
+        }
+    }
+
+
 def splitPower(number):
     """
     Splits a given number into powers of 10.
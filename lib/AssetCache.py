@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Asset Cache                                                               *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Loader for the images of the gauges. Each image is decoded only once and a
+# chain of mipmaps (each level half the size of the previous one) is built
+# from it. Requested sizes are resampled from the smallest level still larger
+# than the request with a high quality filter in premultiplied alpha, so no
+# dark fringes appear at transparent edges.
+
+# Results are RGBA arrays of exactly the requested size. They are kept in
+# memory and written to a cache directory on disk, keyed by a hash of the
+# image file, the size and the filter. Later runs load them from there. The
+# memory kept can be limited, least recently used results are dropped first.
+
+
+# TODO
+# ====
+
+# - Evict old files from disk cache
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.2
+# Date:     2017/05/05
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+# 0.2:  - Limit of the memory kept.
+
+
+###############################################################################
+
+
+# Foreign libraries
+from collections        import OrderedDict
+from PIL                import Image
+import hashlib
+import logging          as log
+import numpy            as np
+import os
+import tempfile
+
+
+class AssetCache(object):
+
+    FILTERS = {
+        "nearest"   :   Image.NEAREST,
+        "bilinear"  :   Image.BILINEAR,
+        "bicubic"   :   Image.BICUBIC,
+        "lanczos"   :   Image.LANCZOS
+    }
+
+    DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache",
+                                "videoGauge", "assets")
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        path is the directory of the disk cache. Pass None to keep results in
+        memory only.
+        """
+
+        self._Path = path
+        self._Sources = {}      # Image path -> (hash, mip chain)
+        self._Buffers = OrderedDict()   # (hash, size, filter) -> RGBA array
+        self._Limit = None      # Bytes of buffers kept in memory
+
+        # Statistics
+        self.hits = 0           # Found in memory or on disk
+        self.misses = 0         # Resampled from source
+
+
+    # -------------------------------------------------------------------------
+    # - Interface methods                                                     -
+    # -------------------------------------------------------------------------
+
+
+    def load(self, path, size, resample="lanczos"):
+        """
+        Return the image at path as RGBA array (height x width x 4, uint8)
+        resampled to size (width, height).
+        """
+
+        size = (int(size[0]), int(size[1]))
+        if resample not in self.FILTERS:
+            raise ValueError("Unknown filter '%s'!" % resample)
+
+        digest = self.__hash(path)
+        key = (digest, size, resample)
+
+        # Memory
+        if key in self._Buffers:
+            self.hits += 1
+            buf = self._Buffers.pop(key)
+            self._Buffers[key] = buf
+            return buf
+
+        # Disk
+        cacheFile = self.__cacheFile(key)
+        if cacheFile is not None and os.path.isfile(cacheFile):
+            try:
+                buf = np.load(cacheFile)
+            except (IOError, ValueError):
+                log.warning("Ignoring broken cache file '%s'." % cacheFile)
+            else:
+                if buf.shape == (size[1], size[0], 4):
+                    self.hits += 1
+                    self._Buffers[key] = buf
+                    self.__evict()
+                    return buf
+
+        # Source
+        self.misses += 1
+        buf = self.__resample(path, size, self.FILTERS[resample])
+        self._Buffers[key] = buf
+        self.__store(cacheFile, buf)
+        self.__evict()
+        return buf
+
+
+    def getSize(self, path):
+        """
+        Return the size of the original image at path.
+        """
+
+        return self.__mipchain(path)[0].size
+
+
+    def setLimit(self, limit):
+        """
+        Keep at most limit bytes of buffers in memory. The most recently used
+        buffer is always kept. None removes the limit.
+        """
+
+        self._Limit = limit
+        self.__evict()
+
+
+    def stats(self):
+        """
+        Return dict with cache statistics.
+        """
+
+        return {
+            "hits"      :   self.hits,
+            "misses"    :   self.misses,
+            "buffers"   :   len(self._Buffers),
+            "bytes"     :   sum(b.nbytes for b in self._Buffers.values())
+        }
+
+
+    # -------------------------------------------------------------------------
+    # - Helpers                                                               -
+    # -------------------------------------------------------------------------
+
+
+    def __cacheFile(self, key):
+        """
+        Return path of the disk cache file for key.
+        """
+
+        if self._Path is None:
+            return None
+
+        digest, size, resample = key
+        name = "%s_%dx%d_%s.npy" % (digest, size[0], size[1], resample)
+        return os.path.join(self._Path, name)
+
+
+    def __evict(self):
+        """
+        Drop least recently used buffers until the limit is kept. Decoded
+        source images are only needed to resample misses, they are dropped
+        as well.
+        """
+
+        if self._Limit is None:
+            return
+
+        for path, (digest, chain) in self._Sources.items():
+            if chain is not None:
+                self._Sources[path] = (digest, None)
+
+        size = sum(b.nbytes for b in self._Buffers.values())
+        while size > self._Limit and len(self._Buffers) > 1:
+            key, buf = self._Buffers.popitem(last=False)
+            size -= buf.nbytes
+
+
+    def __hash(self, path):
+        """
+        Return hash of the image file. The file is read only once.
+        """
+
+        if path not in self._Sources:
+            with open(path, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            self._Sources[path] = (digest, None)
+
+        return self._Sources[path][0]
+
+
+    def __mipchain(self, path):
+        """
+        Decode image and build its mip chain. Levels are stored in
+        premultiplied alpha (PIL mode 'RGBa').
+        """
+
+        digest, chain = self._Sources.get(path, (None, None))
+
+        if chain is None:
+            if digest is None:
+                digest = self.__hash(path)
+
+            im = Image.open(path)
+            im.load()
+            chain = [im.convert("RGBA").convert("RGBa")]
+
+            while min(chain[-1].size) >= 2:
+                w, h = chain[-1].size
+                chain.append(chain[-1].resize((w // 2, h // 2), Image.BOX))
+
+            self._Sources[path] = (digest, chain)
+
+        return chain
+
+
+    def __resample(self, path, size, resample):
+        """
+        Resample image to size starting at the smallest mip level not smaller
+        than size.
+        """
+
+        chain = self.__mipchain(path)
+
+        level = chain[0]
+        for im in chain:
+            if im.size[0] < size[0] or im.size[1] < size[1]:
+                break
+            level = im
+
+        if level.size != size:
+            level = level.resize(size, resample)
+
+        return np.asarray(level.convert("RGBA"))
+
+
+    def __store(self, cacheFile, buf):
+        """
+        Write buffer to disk cache. The file is written under a temporary name
+        first so concurrent renders never read half written files.
+        """
+
+        if cacheFile is None:
+            return
+
+        try:
+            if not os.path.isdir(self._Path):
+                try:
+                    os.makedirs(self._Path)
+                except OSError:
+                    # Created by another render in the meantime.
+                    if not os.path.isdir(self._Path):
+                        raise
+
+            fd, tmp = tempfile.mkstemp(dir=self._Path, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, buf)
+            os.rename(tmp, cacheFile)
+
+        except (IOError, OSError) as e:
+            log.warning("Could not write asset cache '%s': %s" % (cacheFile, e))
+
+
+# Cache shared by all gauges of a process.
+ASSETS = AssetCache()
+
+
+# EOF
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Batch Processing                                                          *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Render the gauges of several flights in one run. Flights are either all
+# track files (GPX, IGC, NMEA, CSV, FIT) of a folder or the lines of a
+# manifest file:
+
+#     # GPX file            Options for this flight
+#     2017-04-01.gpx        --airspeed mph --altitude ft
+#     2017-04-08.gpx        --airspeed kt --start 00:10:00
+
+# Options given on the command line apply to all flights and are followed by
+# the options of the manifest line. Relative paths of GPX files are taken
+# relative to the manifest. Every flight gets its own subfolder of the output
+# folder named like the GPX file. Outputs of a flight are overwritten without
+# asking as there is nobody to answer in the worker processes.
+
+# Flights are put into a job queue and handled by a number of worker
+# processes. A worker keeps running for several flights, so caches of images
+# and calibration tables stay warm, while each flight gets its own waypoint
+# store. A failing flight is reported and the next one is started.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.2
+# Date:     2017/05/06
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+# 0.2:  - Folders take all track formats known to the readers.
+#       - Compressed track files.
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.readers        import isTrackFile
+from lib.readers.Stream import stripCompression
+
+# Foreign libraries
+from terminaltables     import AsciiTable   as Table
+from time               import time
+import logging          as log
+import multiprocessing
+import os
+import shlex
+import traceback
+
+try:
+    from Queue          import Empty
+except ImportError:
+    from queue          import Empty
+
+
+class Batch(object):
+
+    # Status of a flight
+    DONE    = "done"
+    SKIPPED = "up to date"
+    FAILED  = "failed"
+
+    def __init__(self, source, outputfolder, options=(), jobs=1, \
+        rebuild=False):
+
+        """
+        source is a folder holding GPX files or a manifest file. options is a
+        list of command line arguments passed to every flight. jobs is the
+        number of flights rendered at the same time. If rebuild is set,
+        flights are rendered even if their outputs are up to date.
+        """
+
+        self._Source = source
+        self._OutputFolder = outputfolder
+        self._Options = list(options)
+        self._Jobs = max(1, int(jobs))
+        self._Rebuild = rebuild
+
+
+    # -------------------------------------------------------------------------
+    # - Interface methods                                                     -
+    # -------------------------------------------------------------------------
+
+
+    def flights(self):
+        """
+        Return list of flights as dicts holding 'name', 'gpxfile' and 'argv'.
+        """
+
+        if os.path.isdir(self._Source):
+            entries = [(os.path.join(self._Source, f), [])
+                       for f in sorted(os.listdir(self._Source))
+                       if isTrackFile(f)]
+        elif os.path.isfile(self._Source):
+            entries = self.__readManifest(self._Source)
+        else:
+            raise IOError("Batch source '%s' does not exist!" % self._Source)
+
+        flights = []
+        names = set()
+        for gpxfile, options in entries:
+
+            # Flights of the same GPX file get numbered folders.
+            base = os.path.splitext(
+                stripCompression(os.path.basename(gpxfile)))[0]
+            name = base
+            count = 1
+            while name in names:
+                count += 1
+                name = "%s_%d" % (base, count)
+            names.add(name)
+
+            outputfolder = os.path.join(self._OutputFolder, name)
+
+            argv = ["-g", gpxfile, "-o", outputfolder, "-f"]
+            argv += self._Options + options
+
+            flights.append({
+                "name"      :   name,
+                "gpxfile"   :   gpxfile,
+                "argv"      :   argv
+            })
+
+        return flights
+
+
+    def run(self, runner):
+        """
+        Render all flights with runner(argv, skipUpToDate) which is expected
+        to return a tuple (status, message). Returns a list of tuples (name,
+        status, message, seconds) in order of the flights.
+        """
+
+        flights = self.flights()
+        if not flights:
+            log.warning("No flights found in '%s'!" % self._Source)
+            return []
+
+        jobs = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+
+        for index, flight in enumerate(flights):
+            jobs.put((index, flight['argv']))
+
+        workers = []
+        for i in range(min(self._Jobs, len(flights))):
+            jobs.put(None)
+            # Workers are no daemons, so they may start render processes.
+            p = multiprocessing.Process(
+                target=self.__worker,
+                args=(runner, jobs, results)
+            )
+            p.start()
+            workers.append(p)
+
+        log.info("Rendering %d flights in %d processes." %
+            (len(flights), len(workers)))
+
+        report = [None] * len(flights)
+        received = 0
+        while received < len(flights):
+            try:
+                index, status, message, seconds = results.get(timeout=1.0)
+            except Empty:
+                # Stop waiting if all workers died without reporting.
+                if not any(p.is_alive() for p in workers):
+                    break
+                continue
+
+            report[index] = (flights[index]['name'], status, message, seconds)
+            received += 1
+            log.info("Flight '%s': %s" % (flights[index]['name'], status))
+
+        for p in workers:
+            p.join()
+
+        for index, flight in enumerate(flights):
+            if report[index] is None:
+                report[index] = (flight['name'], self.FAILED,
+                    "Worker process died.", 0.0)
+
+        return report
+
+
+    def showReport(self, report):
+        """
+        Show table with the status of all flights.
+        """
+
+        rows = [["Flight", "Status", "Time", "Message"]]
+        for name, status, message, seconds in report:
+            rows.append([name, status, "%.1f sec" % seconds, message])
+
+        tbl = Table(rows)
+        tbl.justify_columns[2] = 'right'
+
+        print tbl.table + '\n'
+
+
+    # -------------------------------------------------------------------------
+    # - Helpers                                                               -
+    # -------------------------------------------------------------------------
+
+
+    def __readManifest(self, path):
+        """
+        Read manifest file. Returns list of tuples (gpxfile, options).
+        """
+
+        folder = os.path.dirname(os.path.abspath(path))
+        entries = []
+
+        with open(path, "r") as f:
+            for lineNo, line in enumerate(f, 1):
+                try:
+                    args = shlex.split(line, comments=True)
+                except ValueError, e:
+                    raise ValueError("Manifest '%s', line %d: %s" %
+                        (path, lineNo, e))
+
+                if not args:
+                    continue
+
+                gpxfile = os.path.join(folder, os.path.expanduser(args[0]))
+                entries.append((gpxfile, args[1:]))
+
+        return entries
+
+
+    def __worker(self, runner, jobs, results):
+        """
+        Worker process taking flights from queue jobs until None is received.
+        """
+
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+
+            index, argv = job
+            start = time()
+
+            try:
+                status, message = runner(argv, not self._Rebuild)
+            except Exception, e:
+                log.error(traceback.format_exc())
+                status, message = self.FAILED, str(e)
+
+            results.put((index, status, message, time() - start))
+
+
+# EOF
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Checkpoint                                                                *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Bookkeeping for renders split into segments of equal length. Each segment
+# of each output file is encoded into a file of its own in a folder next to
+# the first output (<output>.parts). A small state file in this folder lists
+# the finished segments together with a digest of everything the video
+# depends on (processed track, gauge, layout and video settings).
+
+# A segment is marked as finished only after its encoder was closed, and the
+# state file is replaced atomically, so a render killed at any point leaves
+# a consistent state. A resumed render with the same digest only renders the
+# missing segments. If the digest differs, all segments are dropped.
+
+# When all segments are finished they are joined into the output files by
+# ffmpeg's concat demuxer without encoding again. The folder is removed
+# afterwards.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/03
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+from moviepy.config     import get_setting
+import hashlib
+import json
+import logging          as log
+import os
+import shutil
+import subprocess
+
+
+STATE_VERSION = 1
+
+
+class Checkpoint(object):
+
+    STATE_FILE = "state.json"
+
+    def __init__(self, outputs, digest, count, resume=True):
+        """
+        outputs expects the list of output files. digest identifies the
+        content of the video and count is the number of segments. If resume
+        is False, segments of earlier renders are dropped.
+        """
+
+        self._Outputs = list(outputs)
+        self._Digest = digest
+        self._Count = count
+        self._Folder = self._Outputs[0] + ".parts"
+        self._State = os.path.join(self._Folder, self.STATE_FILE)
+        self._Done = set()
+
+        state = self.__load() if resume else None
+
+        if state is not None and state.get('version') == STATE_VERSION and \
+            state.get('digest') == digest and state.get('count') == count:
+            self._Done = set(i for i in state['done']
+                             if self.__partsExist(i))
+            log.info("Resuming render: %d of %d segments already done." %
+                (len(self._Done), count))
+        else:
+            if state is not None:
+                log.warning("Dropping segments of '%s' as track or settings "
+                    "changed." % self._Folder)
+            shutil.rmtree(self._Folder, ignore_errors=True)
+
+        if not os.path.isdir(self._Folder):
+            os.makedirs(self._Folder)
+
+        self.__save()
+
+
+    # -------------------------------------------------------------------------
+    # - Interface methods                                                     -
+    # -------------------------------------------------------------------------
+
+
+    def missing(self):
+        """
+        Return sorted list of indices of segments still to be rendered.
+        """
+
+        return [i for i in range(self._Count) if i not in self._Done]
+
+
+    def partFiles(self, index):
+        """
+        Return list of the files of segment index, one per output.
+        """
+
+        files = []
+        for k, path in enumerate(self._Outputs):
+            ext = os.path.splitext(path)[1]
+            files.append(os.path.join(self._Folder,
+                "%d_%05d%s" % (k, index, ext)))
+
+        return files
+
+
+    def finish(self, index):
+        """
+        Mark segment index as finished.
+        """
+
+        self._Done.add(index)
+        self.__save()
+
+
+    def join(self):
+        """
+        Join all segments into the output files and remove the segments.
+        """
+
+        missing = self.missing()
+        if missing:
+            raise IOError("Segments %s are missing!" %
+                ", ".join(str(i) for i in missing))
+
+        for k, path in enumerate(self._Outputs):
+            parts = [self.partFiles(i)[k] for i in range(self._Count)]
+            concat(parts, path, os.path.join(self._Folder, "%d.txt" % k))
+
+        shutil.rmtree(self._Folder, ignore_errors=True)
+
+
+    # -------------------------------------------------------------------------
+    # - Helpers                                                               -
+    # -------------------------------------------------------------------------
+
+
+    def __load(self):
+        """
+        Return content of the state file or None.
+        """
+
+        try:
+            with open(self._State, "r") as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+
+    def __partsExist(self, index):
+
+        return all(os.path.isfile(p) for p in self.partFiles(index))
+
+
+    def __save(self):
+        """
+        Replace state file atomically.
+        """
+
+        state = {
+            "version"   :   STATE_VERSION,
+            "digest"    :   self._Digest,
+            "count"     :   self._Count,
+            "outputs"   :   self._Outputs,
+            "done"      :   sorted(self._Done)
+        }
+
+        tmp = self._State + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp, self._State)
+
+
+def digest(*items):
+    """
+    Return hex digest of items. Items are serialized as JSON, so dicts,
+    lists, strings and numbers are accepted.
+    """
+
+    h = hashlib.sha1()
+    for item in items:
+        h.update(json.dumps(item, sort_keys=True, default=str).encode("utf-8"))
+
+    return h.hexdigest()
+
+
+def concat(parts, path, listFile):
+    """
+    Join video files parts into path without encoding again. listFile is
+    the path of the temporary list passed to ffmpeg.
+    """
+
+    with open(listFile, "w") as f:
+        for part in parts:
+            f.write("file '%s'\n" % os.path.abspath(part).replace("'", "'\\''"))
+
+    cmd = [get_setting("FFMPEG_BINARY"), "-y", "-v", "error", "-f", "concat",
+           "-safe", "0", "-i", listFile, "-c", "copy", path]
+
+    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = p.communicate()
+
+    if p.returncode != 0:
+        raise IOError("Joining segments into '%s' failed: %s" %
+            (path, err.strip()))
+
+
+# EOF
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Compositor                                                                *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Compositing of gauge layers into video frames. Layers are RGBA arrays with
+# premultiplied alpha (PIL mode 'RGBa'). Blending is done in 8 bit fixed point
+# arithmetic with 16 bit intermediates, so no float arrays and no separate
+# masks are created per frame:
+
+#     dst = src + dst * (255 - alpha) / 255
+
+# Layers which do not change over time (background, faceplate, ...) are
+# composited once into a base frame. Per frame only the regions of interest
+# (ROI) of the moving layers are blended into a copy of this base frame. All
+# temporary arrays are allocated once and reused.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/04/28
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+import numpy            as np
+
+
+class Compositor(object):
+
+    def __init__(self, size, background=(0, 0, 0)):
+        """
+        size is the resolution (width, height) of the frames. background is
+        the RGB color behind all layers.
+        """
+
+        w, h = int(size[0]), int(size[1])
+        self._Size = (w, h)
+
+        self._Base = np.empty((h, w, 3), dtype=np.uint8)
+        self._Base[:, :] = background
+
+        # Scratch buffers. Views of them are used for smaller ROIs.
+        self._Alpha = np.empty((h, w, 1), dtype=np.uint16)
+        self._Product = np.empty((h, w, 3), dtype=np.uint16)
+        self._Carry = np.empty((h, w, 3), dtype=np.uint16)
+
+
+    # -------------------------------------------------------------------------
+    # - Interface methods                                                     -
+    # -------------------------------------------------------------------------
+
+
+    def addStatic(self, layer, xy=(0, 0)):
+        """
+        Composite a layer not changing over time into the base frame.
+        """
+
+        self.blend(self._Base, layer, xy)
+
+
+    def blend(self, dst, roi, xy):
+        """
+        Blend premultiplied RGBA array roi over RGB array dst at position xy.
+        Parts outside of dst are cut off. dst is changed in place.
+        """
+
+        x, y = int(xy[0]), int(xy[1])
+        h, w = roi.shape[:2]
+        H, W = dst.shape[:2]
+
+        # Overlap of both arrays in coordinates of dst.
+        dx0 = max(x, 0)
+        dy0 = max(y, 0)
+        dx1 = min(x + w, W)
+        dy1 = min(y + h, H)
+
+        if dx0 >= dx1 or dy0 >= dy1:
+            return
+
+        d = dst[dy0:dy1, dx0:dx1]
+        s = roi[dy0 - y:dy1 - y, dx0 - x:dx1 - x]
+        h, w = d.shape[:2]
+
+        alpha = self._Alpha[:h, :w]
+        prod = self._Product[:h, :w]
+        carry = self._Carry[:h, :w]
+
+        # dst * (255 - alpha) / 255, rounded. Division by 255 is done as
+        # (p + 128 + ((p + 128) >> 8)) >> 8 which is exact for 8 bit values.
+        np.subtract(255, s[:, :, 3:4], out=alpha)
+        np.multiply(d, alpha, out=prod)
+        prod += 128
+        np.right_shift(prod, 8, out=carry)
+        prod += carry
+        prod >>= 8
+
+        # Premultiplied source never exceeds its alpha, so the sum fits.
+        np.add(prod, s[:, :, :3], out=d, casting="unsafe")
+
+
+    def frame(self, layers):
+        """
+        Return new RGB frame of the base frame with layers blended on top.
+        layers is a list of tuples (roi, (x, y)) from bottom to top.
+        """
+
+        out = self._Base.copy()
+
+        for roi, xy in layers:
+            self.blend(out, roi, xy)
+
+        return out
+
+
+def premultiply(rgba):
+    """
+    Convert RGBA array with straight alpha into premultiplied alpha using the
+    same rounding as the compositor.
+    """
+
+    rgba = np.asarray(rgba)
+    out = np.empty(rgba.shape, dtype=np.uint8)
+
+    prod = rgba[:, :, :3].astype(np.uint16) * rgba[:, :, 3:4]
+    prod += 128
+    prod += prod >> 8
+    prod >>= 8
+
+    out[:, :, :3] = prod
+    out[:, :, 3] = rgba[:, :, 3]
+    return out
+
+
+# EOF
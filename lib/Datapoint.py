@@ -10,6 +10,14 @@
 
 # Class to store Waypoints to be processed by VideoGaugeCreator.
 
+# Every instance holds its own track. Public methods are serialized by a lock
+# per instance, so an instance can be shared between threads. Instances can be
+# pickled to be passed to worker processes.
+
+# getView() returns another instance showing (a time window of) the same
+# track without copying it. Waypoints are shared until one of both instances
+# changes them. Then this instance copies the track first (copy-on-write).
+
 
 # TODO
 # ====
@@ -23,8 +31,8 @@
 
 # Creator:  Florian Meissner
 #           n1990b@gmx.de
-# Version:  0.1
-# Date:     2017/04/07
+# Version:  1.3
+# Date:     2017/05/06
 
 
 # VERSION HISTORY
@@ -32,25 +40,58 @@
 
 # 0.1:  - Initial Beta
 # 1.0:  - stable version
+# 1.1:  - Added time window to restrict getters to a part of the track.
+#       - Waypoint list per instance.
+# 1.2:  - All state per instance, guarded by a lock.
+#       - Copy-on-write views of the track.
+# 1.3:  - Add waypoints from columns of the track readers.
+#       - Set fields from columns of merged sensor logs.
+#       - Engine RPM field.
+#       - Bearings and distances calculated for all waypoints at once.
+#       - Simplification of the track by field tolerances.
+#       - Outlier and smoothing filters of fields.
+#       - Speeds derived from positions, gaps of speed and altitude filled.
+#       - No G forces and vertical speeds from missing values.
+#       - Waypoint table shows missing values.
+#       - Digest of the track data, check for fields without values.
 
 
 ###############################################################################
 
 
 # own libraries
-from lib.calculations.navigation    import getBearing, getDistance
+from lib.calculations.filters       import hampel, savitzkyGolay
+from lib.calculations.gaps          import fillGaps, groundSpeeds
+from lib.calculations.navigation    import bearings, distances
+from lib.calculations.simplification import simplify
 import lib.calculations.av_conv
 
 # foreign libraries
+from bisect                         import bisect_left, bisect_right
 from datetime                       import datetime
+from functools                      import wraps
 from operator                       import itemgetter
 from terminaltables                 import AsciiTable   as Table
+import hashlib
 import logging
+import numpy
+import threading
 
 
-class WP(object):
+def locked(method):
+    """
+    Decorator running a method of WP while holding the lock of the instance.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._WP__lock:
+            return method(self, *args, **kwargs)
 
-    WPlist = []
+    return wrapper
+
+
+class WP(object):
 
     # Units
     U_DEG   = "deg"
@@ -65,6 +106,7 @@ class WP(object):
     U_M     = "m"
     U_MIN   = "min"
     U_MS    = "ms"
+    U_REV   = "rpm"
     U_SEC   = "sec"
 
     # Defaults
@@ -78,6 +120,7 @@ class WP(object):
     DEFAULT_U_PITCH     =   U_DEG
     DEFAULT_U_QNH       =   U_HPA
     DEFAULT_U_ROLL      =   U_DEG
+    DEFAULT_U_RPM       =   U_REV
     DEFAULT_U_SPEED     =   U_KT
     #~ DEFAULT_U_TIME      =
     DEFAULT_U_TIMESTAMP =   U_SEC
@@ -96,6 +139,7 @@ class WP(object):
     U_PITCH = (U_DEG)
     U_QNH = (U_INHG, U_HPA)
     U_ROLL = (U_DEG)
+    U_RPM = (U_REV)
     U_SPEED = (U_KT, U_MPH, U_KMH, U_MS)
     #~ U_TIME = ()
     U_TIMESTAMP = (U_SEC)
@@ -104,14 +148,33 @@ class WP(object):
     U_WINDSPD = (U_KT, U_MPH, U_KMH, U_FTMIN, U_MS)
 
 
-    # Control variables
-    __listCalculated = False
-    __listOrdered = False
-    __refTimestamp = None
+    def __init__(self):
 
+        self.WPlist = []
+
+        # Control variables
+        self.__listCalculated = False
+        self.__listOrdered = False
+        self.__refTimestamp = None
+        self.__window = None    # (first index, last index, start, end)
+        self.__shared = False   # WPlist is shared with a view.
+        self.__lock = threading.RLock()
+
+
+    def __getstate__(self):
+        """
+        Locks can't be pickled. The copy gets a new one.
+        """
+
+        state = self.__dict__.copy()
+        del state['_WP__lock']
+        return state
 
-    def __init__(self):
-        pass
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        self.__lock = threading.RLock()
 
 
     # -------------------------------------------------------------------------
@@ -119,6 +182,7 @@ class WP(object):
     # -------------------------------------------------------------------------
 
 
+    @locked
     def addWP(self, \
         altitude    =   None,   altitude_unit   =   DEFAULT_U_ALTITUDE, \
         distance    =   None,   distance_unit   =   DEFAULT_U_DISTANCE, \
@@ -149,6 +213,8 @@ class WP(object):
         if all(v is None for v in params):
             raise ValueError("Specify at least one parameter to add a new waypoint.")
 
+        self.__unshare()
+
         # Parse units and convert values if neccessary.
         altitude = self.__setParam(
             altitude,
@@ -281,6 +347,7 @@ class WP(object):
                 "pitch"     :   pitch,
                 "qnh"       :   qnh,
                 "roll"      :   roll,
+                "rpm"       :   None,
                 "speed"     :   speed,
                 "time"      :   time,
                 "timestamp" :   timestamp,
@@ -289,6 +356,7 @@ class WP(object):
                 "windspd"   :   windSpd,
 
                 # Support fields
+                "gap"               :   (),
                 "higherNeighbour"   :   None,
                 "lowerNeighbour"    :   None
             }
@@ -297,9 +365,192 @@ class WP(object):
         # Perfom gap filling calculations.
         self.__listOrdered = False
         self.__listCalculated = False
+        self.__window = None
         #~ self.__calculate()
 
 
+    @locked
+    def addColumns(self, columns, units=None):
+        """
+        Add waypoints from a dict of equally long arrays, one per field (e.g.
+        as yielded by the track readers). NaN marks a missing value. units
+        maps fields to the unit of their column, the rest are taken in their
+        default unit. Values are converted per column, not per waypoint.
+        """
+
+        units = units or {}
+        count = len(columns['timestamp'])
+        if count == 0:
+            return
+
+        self.__unshare()
+
+        fields = {}
+        for field, column in columns.items():
+            fields[field.lower()] = self.__columnValues(field, column, units)
+
+        empty = [None] * count
+        names = ("altitude", "distance", "duration", "heading", "lat", "lon",
+                 "pitch", "qnh", "roll", "rpm", "speed", "time", "timestamp",
+                 "vsi", "winddir", "windspd")
+
+        for row in zip(*[fields.get(name, empty) for name in names]):
+            wp = dict(zip(names, row))
+            wp['g'] = {'x':None, 'y':None, 'z':None}
+            wp['gap'] = ()
+            wp['higherNeighbour'] = None
+            wp['lowerNeighbour'] = None
+            self.WPlist.append(wp)
+
+        self.__listOrdered = False
+        self.__listCalculated = False
+        self.__window = None
+
+
+    @locked
+    def setColumns(self, columns, units=None):
+        """
+        Set fields of all waypoints from a dict of arrays in the order of the
+        timestamps (see getTimestamps()). NaN leaves a waypoint unchanged.
+        units works as for addColumns().
+        """
+
+        units = units or {}
+
+        if not self.__listOrdered:
+            self.__orderByParam('timestamp')
+
+        self.__unshare()
+
+        for field, column in columns.items():
+            if len(column) != len(self.WPlist):
+                raise ValueError("Column '%s' doesn't match the waypoints!" %
+                    field)
+
+            key = field.lower()
+            values = self.__columnValues(field, column, units)
+            for wp, value in zip(self.WPlist, values):
+                if value is not None:
+                    wp[key] = value
+
+        self.__listCalculated = False
+
+
+    @locked
+    def simplify(self, tolerances):
+        """
+        Remove waypoints the gauges don't need, see
+        calculations.simplification. tolerances maps fields to the largest
+        change allowed in their default unit. Returns the number of waypoints
+        before and after.
+        """
+
+        self.__checkFields(tolerances, "simplify by",
+                           ("timestamp", "duration", "distance"))
+
+        if not self.__listOrdered:
+            self.__orderByParam('timestamp')
+
+        before = len(self.WPlist)
+        columns = dict((field, self.__columnArray(field.lower()))
+                       for field in tolerances)
+        keep = simplify(self.__columnArray('timestamp'), columns, tolerances)
+
+        # A new list, views keep the old one.
+        self.WPlist = [wp for wp, k in zip(self.WPlist, keep.tolist()) if k]
+
+        self.__listCalculated = False
+        self.__window = None
+
+        return before, len(self.WPlist)
+
+
+    @locked
+    def closeGaps(self, maxGap):
+        """
+        Derive missing speeds from the positions and fill the gaps of speed
+        and altitude, see calculations.gaps. Gaps longer than maxGap seconds
+        hold the last value; 'gap' of their waypoints lists the held fields.
+        Returns a dict with the number of derived speeds and of interpolated
+        and held values per field.
+        """
+
+        if not self.__listOrdered:
+            self.__orderByParam('timestamp')
+
+        self.__unshare()
+
+        times = self.__columnArray('timestamp')
+        speed = self.__columnArray('speed')
+        derived = groundSpeeds(times, self.__columnArray('lat'),
+            self.__columnArray('lon')) * lib.calculations.av_conv.ms2kt(1.0)
+        missing = numpy.isnan(speed)
+
+        stats = {'derived': int(numpy.isfinite(derived[missing]).sum())}
+        columns = {'speed': numpy.where(missing, derived, speed),
+                   'altitude': self.__columnArray('altitude')}
+
+        held = {}
+        for field, values in columns.items():
+            filled, held[field] = fillGaps(times, values, maxGap)
+            stats[field] = {
+                'interpolated': int((numpy.isnan(values) &
+                    numpy.isfinite(filled) & ~held[field]).sum()),
+                'held': int(held[field].sum())
+            }
+            self.__setColumn(field, filled)
+
+        for wp, altitude, speed in zip(self.WPlist, held['altitude'].tolist(),
+                                       held['speed'].tolist()):
+            wp['gap'] = tuple(field for field, isHeld in
+                (("altitude", altitude), ("speed", speed)) if isHeld)
+
+        self.__listCalculated = False
+
+        return stats
+
+
+    @locked
+    def filterFields(self, despike=None, smooth=None):
+        """
+        Filter fields of all waypoints, see calculations.filters. despike
+        maps fields to (window, sigmas) of the outlier filter, smooth maps
+        fields to (window, order) of the smoothing filter. Outliers are
+        replaced before smoothing. Returns a dict of the number of outliers
+        replaced per field.
+        """
+
+        despike = despike or {}
+        smooth = smooth or {}
+        # Angles wrap around, the rest is not measured.
+        excluded = ("timestamp", "duration", "distance", "heading",
+                    "winddir")
+        self.__checkFields(despike, "filter", excluded)
+        self.__checkFields(smooth, "filter", excluded)
+
+        if not self.__listOrdered:
+            self.__orderByParam('timestamp')
+
+        self.__unshare()
+
+        times = self.__columnArray('timestamp')
+        outliers = {}
+        for field in sorted(set(despike) | set(smooth)):
+            key = field.lower()
+            values = self.__columnArray(key)
+            if field in despike:
+                values, outliers[field] = hampel(times, values,
+                                                 *despike[field])
+            if field in smooth:
+                values = savitzkyGolay(times, values, *smooth[field])
+            self.__setColumn(key, values)
+
+        self.__listCalculated = False
+
+        return outliers
+
+
+    @locked
     def calculator(self):
         """
         Perform calculations to get more displayable values.
@@ -311,6 +562,7 @@ class WP(object):
         self.__calculate()
 
 
+    @locked
     def changeWP(self, ident, \
         altitude        =   None,   altitude_unit   =   DEFAULT_U_ALTITUDE, \
         distance        =   None,   distance_unit   =   DEFAULT_U_DISTANCE, \
@@ -344,6 +596,8 @@ class WP(object):
         if all(v is None for v in params):
             raise ValueError("Specify at least one parameter to change a waypoint.")
 
+        self.__unshare()
+
         altitude = self.__setParam(
             altitude,
             altitude_unit,
@@ -509,6 +763,7 @@ class WP(object):
         #~ self.__calculate()
 
 
+    @locked
     def getAllByField(self, fields, units=None):
         """
         Get a list of all waypoints containing only the fields given by 'fields'
@@ -541,16 +796,52 @@ class WP(object):
             else:
                 result[fields] = self.__convertUnit(fields, wp[fields], units)
 
+            # Neighbours are list indices. Within a time window they have to
+            # point into the returned list instead of the complete one.
+            if self.__window is not None:
+                for field in ('lowerNeighbour', 'higherNeighbour'):
+                    if field in result:
+                        result[field] = self.__windowIndex(result[field])
+
             return result
 
-        return self.__iterWPlist(subfunc, (fields, units), ret=True)
+        return self.__iterWPlist(subfunc, (fields, units), ret=True, \
+            windowed=True)
+
 
+    @locked
+    def digest(self):
+        """
+        Returns a hex digest of the data fields of all waypoints. Tracks read
+        or processed differently get different digests.
+        """
 
+        if not self.__listOrdered:
+            self.__orderByParam('timestamp')
+
+        h = hashlib.sha1()
+        fields = sorted(self.WPlist[0]) if self.WPlist else []
+        for field in fields:
+            # Derived from the other fields.
+            if field in ('g', 'time', 'higherNeighbour', 'lowerNeighbour'):
+                continue
+            h.update(field.encode("utf-8"))
+            if field == 'gap':
+                gaps = [wp[field] for wp in self.WPlist]
+                h.update(repr(gaps).encode("utf-8"))
+            else:
+                h.update(self.__columnArray(field).tobytes())
+
+        return h.hexdigest()
+
+
+    @locked
     def getDuration(self, waypoints=None):
         """
         Returns the accumulated duration of the given waypoints. Waypoints
         expects a tuple of indices. If None is given, all waypoints are summed
-        up.
+        up. If a time window is set, only the waypoints touching the window
+        are summed up.
         """
 
         def subfunc(wp):
@@ -563,13 +854,150 @@ class WP(object):
             for i in waypoints:
                 dur += self.getWP(i, 'index')['duration']
         else:
-            durations = self.__iterWPlist(subfunc, ret=True)
+            durations = self.__iterWPlist(subfunc, ret=True, windowed=True)
             for i in durations:
                 dur += i
 
         return dur
 
 
+    def getRefTimestamp(self):
+        """
+        Returns the unix timestamp of the first waypoint which marks second 0
+        of the video. Only available after calculator() has been run.
+        """
+
+        return self.__refTimestamp
+
+
+    @locked
+    def getTimestamps(self):
+        """
+        Returns the timestamp column of all waypoints in ascending order.
+        """
+
+        if not self.__listOrdered:
+            self.__orderByParam('timestamp')
+
+        return [wp['timestamp'] for wp in self.WPlist]
+
+
+    @locked
+    def getView(self, start=None, end=None):
+        """
+        Return a new instance showing the same calculated track without
+        copying it, e.g. to be handed to a gauge. The view keeps the window of
+        this instance unless another one is given by start and end in seconds
+        of video time. Waypoints are shared until either instance changes
+        them.
+        """
+
+        self.__calculate()
+
+        view = WP()
+        view.WPlist = self.WPlist
+        view.__listCalculated = self.__listCalculated
+        view.__listOrdered = self.__listOrdered
+        view.__refTimestamp = self.__refTimestamp
+        view.__window = self.__window
+
+        view.__shared = True
+        self.__shared = True
+
+        if start is not None or end is not None:
+            view.setWindow(start, end)
+
+        return view
+
+
+    def getWindowLength(self):
+        """
+        Returns the length of the set time window in seconds. Without a window
+        the duration of the hole track is returned.
+        """
+
+        if self.__window is None:
+            return self.getDuration()
+
+        return self.__window[3] - self.__window[2]
+
+
+    @locked
+    def getWindowOffset(self):
+        """
+        Returns the time in seconds between the first waypoint returned inside
+        the time window and the actual start of the window. Clips built from
+        the windowed waypoints need to be cut by this offset.
+        """
+
+        if self.__window is None:
+            return 0.0
+
+        first = self.getWP(self.__window[0], 'index')
+        return self.__window[2] - first['timestamp']
+
+
+    def hasWindow(self):
+        """
+        Returns True if a time window has been set.
+        """
+
+        return self.__window is not None
+
+
+    @locked
+    def setWindow(self, start=None, end=None):
+        """
+        Restrict getAllByField() and getDuration() to the waypoints needed to
+        display the time between start and end. Both are given in seconds of
+        the video (0 is the first waypoint). None keeps the start or end of
+        the track. Calling it without arguments removes the window.
+
+        The first and last waypoints are looked up by bisection of the
+        timestamp column, so the waypoint before start and the one after end
+        are part of the window to be able to animate the needle into it.
+        """
+
+        if start is None and end is None:
+            self.__window = None
+            return
+
+        self.__calculate()
+
+        timestamps = self.getTimestamps()
+        trackEnd = timestamps[-1]
+
+        if start is None or start < 0:
+            start = 0.0
+        if end is None or end > trackEnd:
+            end = trackEnd
+
+        if start >= end:
+            raise ValueError(
+                "Time window %.1f sec to %.1f sec does not cover any part of "
+                "the track (0.0 sec to %.1f sec)." % (start, end, trackEnd)
+            )
+
+        first = max(bisect_right(timestamps, start) - 1, 0)
+        last = min(bisect_left(timestamps, end), len(timestamps) - 1)
+
+        self.__window = (first, last, float(start), float(end))
+
+        logging.info(
+            "Time window %.1f sec to %.1f sec uses waypoints %d to %d of %d."
+            % (start, end, first, last, len(timestamps))
+        )
+
+
+    @locked
+    def hasValues(self, field):
+        """
+        Returns True if any waypoint has a value of field.
+        """
+
+        return any(wp[field] is not None for wp in self.WPlist)
+
+
     def getWPListLength(self):
         """
         Returns the number of current list entries.
@@ -578,6 +1006,7 @@ class WP(object):
         return len(self.WPlist)
 
 
+    @locked
     def getWP(self, identifier, ident_type, ident_mode="absolute"):
         """
         Return a Waypoint by a given identifier and identification mode.
@@ -612,21 +1041,25 @@ class WP(object):
             raise ValueError("Unknown ident_type %s" % ident_type)
 
 
+    @locked
     def showWPtable(self):
         """
         Show a table like pattern containing all waypoints stored at the time
         this method is called.
         """
 
+        def number(fmt, value):
+            return "-" if value is None else fmt % value
+
         def subfunc(wp):
 
             # Print table with trackpoints.
             line = []
 
-            line.append("%7.5f" % wp['lat'])
-            line.append("%7.5f" % wp['lon'])
-            line.append("%4.1f" % wp['altitude'])
-            line.append("%4.1f" % wp['speed'])
+            line.append(number("%7.5f", wp['lat']))
+            line.append(number("%7.5f", wp['lon']))
+            line.append(number("%4.1f", wp['altitude']))
+            line.append(number("%4.1f", wp['speed']))
             #line.append(str(wp['time']))
             line.append("%s" % wp['timestamp'])
 
@@ -644,9 +1077,9 @@ class WP(object):
 
             #line.append("%s, %s" % (lNb, hNb))
             line.append("%s" % wp['duration'])
-            line.append("%4.1f" % wp['heading'])
-            line.append("%4.1f" % wp['distance'])
-            line.append("%4.1f" % wp['vsi'])
+            line.append(number("%4.1f", wp['heading']))
+            line.append(number("%4.1f", wp['distance']))
+            line.append(number("%4.1f", wp['vsi']))
 
             g = ""
             for key, value in wp['g'].iteritems():
@@ -730,6 +1163,30 @@ class WP(object):
 
 
 
+    def __columnValues(self, field, column, units):
+        """
+        Convert an array of a field from the unit given by units into the
+        default unit. Returns a list with None for NaN.
+        """
+
+        key = field.lower()
+        column = numpy.asarray(column, dtype=float)
+
+        default = getattr(self, "DEFAULT_U_" + key.upper(), None)
+        unit = units.get(field, default)
+        if unit != default:
+            allowed = getattr(self, "U_" + key.upper())
+            if unit not in allowed:
+                raise ValueError("Unknown unit '%s'!" % unit)
+            func = getattr(lib.calculations.av_conv,
+                           "%s2%s" % (unit, default))
+            column = column * func(1.0)
+
+        values = column.astype(object)
+        values[numpy.isnan(column)] = None
+        return values.tolist()
+
+
     def __setParam(self, param, unit, default, allowed):
 
         """
@@ -777,6 +1234,7 @@ class WP(object):
         """
 
         if not self.__listCalculated:
+            self.__unshare()
             self.__convertTimestamp()
             self.__orderByParam('timestamp')
             self.__videoTimestamp()
@@ -809,46 +1267,28 @@ class WP(object):
 
     def __getBearing(self):
         """
-        Calculate bearing between waypoints.
+        Calculate bearing between waypoints. The last waypoint keeps the
+        bearing of the one before it.
         """
 
-        def subfunc(wp):
-            if wp['higherNeighbour'] == "LAST":
-                if wp['lowerNeighbour'] == "FIRST":
-                    retVal = 0.0
-                else:
-                    retVal = self.getWP(wp['lowerNeighbour'], 'index')['heading']
-            else:
-                nextWP = self.getWP(wp['higherNeighbour'], 'index')
-                wp1 = (wp['lat'], wp['lon'])
-                wp2 = (nextWP['lat'], nextWP['lon'])
-                bearing = getBearing(wp1, wp2)
-                retVal = bearing
-
-            if wp['heading'] != retVal:
-                return ('heading', retVal)
+        lat = self.__columnArray('lat')
+        lon = self.__columnArray('lon')
 
-        self.__iterWPlist(subfunc, writeChange = True)
+        heading = bearings(lat[:-1], lon[:-1], lat[1:], lon[1:])
+        last = heading[-1:] if len(heading) else [0.0]
+        self.__setColumn('heading', numpy.concatenate((heading, last)))
 
 
     def __getDistance(self):
         """
-        Calculate distance between waypoints.
+        Calculate distance between waypoints. The last waypoint gets 0.
         """
 
-        def subfunc(wp):
-            if wp['higherNeighbour'] == "LAST":
-                retVal = 0.0
-            else:
-                nextWP = self.getWP(wp['higherNeighbour'], 'index')
-                wp1 = (wp['lat'], wp['lon'])
-                wp2 = (nextWP['lat'], nextWP['lon'])
-                dist = getDistance(wp1, wp2)
-                retVal = dist
-            if wp['distance'] != retVal:
-                return ('distance', retVal)
+        lat = self.__columnArray('lat')
+        lon = self.__columnArray('lon')
 
-        self.__iterWPlist(subfunc, writeChange = True)
+        dist = distances(lat[:-1], lon[:-1], lat[1:], lon[1:])
+        self.__setColumn('distance', numpy.concatenate((dist, [0.0])))
 
 
     def __getDuration(self):
@@ -887,8 +1327,11 @@ class WP(object):
             else:
                 myAlt = wp['altitude']
                 nextAlt = self.getWP(wp['higherNeighbour'], 'index')['altitude']
-                a = (nextAlt - myAlt) / wp['duration']**2
-                a += 1 # Credit to earth gravity
+                if myAlt is None or nextAlt is None:
+                    a = None
+                else:
+                    a = (nextAlt - myAlt) / wp['duration']**2
+                    a += 1 # Credit to earth gravity
 
             if wp['g']['z'] != a:
                 return ('g', {'x':None, 'y':None, 'z':a})
@@ -901,16 +1344,10 @@ class WP(object):
             else:
                 mySpeed = wp['speed']
                 nextSpeed = self.getWP(wp['higherNeighbour'], 'index')['speed']
-                #~ try:
-                    #~ if nextSpeed is None:
-                        #~ a = None
-                    #~ else:
-                a = (nextSpeed - mySpeed) / wp['duration']**2
-                #~ except BaseException, e:
-                    #~ print e
-                    #~ print wp, self.getWP(wp['higherNeighbour'], 'index')
-                    #~ sys.exit(2)
-                    #~ a = None
+                if mySpeed is None or nextSpeed is None:
+                    a = None
+                else:
+                    a = (nextSpeed - mySpeed) / wp['duration']**2
 
             if wp['g']['x'] != a:
                 return ('g', {'x':a, 'y':None, 'z':None})
@@ -968,27 +1405,66 @@ class WP(object):
             else:
                 alt = wp['altitude']
                 nextAlt = self.getWP(wp['higherNeighbour'], 'index')['altitude']
-                vsi = (nextAlt - alt) / wp['duration'] # ft/sec
-                vsi = vsi * 60
+                if alt is None or nextAlt is None:
+                    vsi = None
+                else:
+                    vsi = (nextAlt - alt) / wp['duration'] # ft/sec
+                    vsi = vsi * 60
             if wp['vsi'] != vsi:
                 return ('vsi', vsi)
 
         self.__iterWPlist(subfunc, writeChange=True)
 
 
+    def __checkFields(self, fields, action, excluded=()):
+        """
+        Raise ValueError unless all fields are numeric fields of waypoints
+        not in excluded.
+        """
+
+        for field in fields:
+            if not hasattr(self, "DEFAULT_U_" + field.upper()) or \
+                field.lower() in excluded:
+                raise ValueError("Can't %s field '%s'!" % (action, field))
+
+
+    def __columnArray(self, field):
+        """
+        Return a field of all waypoints as float array, NaN for None.
+        """
+
+        return numpy.array([wp[field] for wp in self.WPlist], dtype=float)
+
+
+    def __setColumn(self, field, values):
+        """
+        Set a field of all waypoints from an array, None for NaN.
+        """
+
+        for wp, value in zip(self.WPlist, values.tolist()):
+            wp[field] = value if value == value else None
+
+
     def __iterWPlist(self, func, args=None, passIndex=False, \
-        writeChange=False, ret=False):
+        writeChange=False, ret=False, windowed=False):
         """
         Iterate through all waypoints an apply func to each one.
         func expects a function with first parameter to be the given waypoint.
         Further parameters can be passed as tuple or dict in args.
         If 'writeChange' is True func is expected to return a tuple (key, value)
         for the parameter to be written
+        If 'windowed' is True only the waypoints of the time window are
+        iterated.
         """
 
         retL = []   # List for return values
 
-        for i in range(self.getWPListLength()):
+        if windowed and self.__window is not None:
+            indices = range(self.__window[0], self.__window[1] + 1)
+        else:
+            indices = range(self.getWPListLength())
+
+        for i in indices:
             wp = self.getWP(i, "index")
             #~ print type(args), args
 
@@ -1043,6 +1519,25 @@ class WP(object):
                 return retL
 
 
+    def __windowIndex(self, index):
+        """
+        Translate a list index of the complete waypoint list into an index of
+        the list returned inside the time window. Indices beyond the window
+        are replaced by "FIRST" and "LAST" as for the ends of the track.
+        """
+
+        if not isinstance(index, int):
+            return index
+
+        first, last = self.__window[:2]
+
+        if index < first:
+            return "FIRST"
+        if index > last:
+            return "LAST"
+        return index - first
+
+
     def __orderByParam(self, param):
         """
         Order list of waypoints by a given dict key. The waypoint dicts themself
@@ -1059,6 +1554,17 @@ class WP(object):
             print wp
 
 
+    def __unshare(self):
+        """
+        Copy the waypoints before changing them if they are shared with a
+        view.
+        """
+
+        if self.__shared:
+            self.WPlist = [dict(wp, g=dict(wp['g'])) for wp in self.WPlist]
+            self.__shared = False
+
+
     def __videoTimestamp(self):
         """
         Convert timestamps to video position. First waypoint will be 0 seconds.
@@ -22,7 +22,7 @@
 
 # Creator:  Florian Meissner
 #           n1990b@gmx.de
-# Version:  0.1
+# Version:  0.2
 # Date:     2017/03/10
 
 
@@ -30,6 +30,7 @@
 # ===============
 
 # 0.1:  - Initial Beta
+# 0.2:  - Exit with the reason kept for reports.
 
 
 ###################################################################################################
@@ -44,3 +45,15 @@ class AbstractImplementationRequired(Exception):
 
         msg = "The object '%s' needs to be implemented in child class!" % obj
         super(AbstractImplementationRequired, self).__init__(msg)
+
+
+class FatalError(SystemExit):
+    """
+    Exit of Video Gauge Creator because of an error. Exits with code 2 and
+    keeps the reason in msg, e.g. for the reports of batches.
+    """
+
+    def __init__(self, msg=""):
+
+        super(FatalError, self).__init__(2)
+        self.msg = str(msg)
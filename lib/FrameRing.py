@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Frame Ring                                                                *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Transport of rendered frames from several render processes to the encoder
+# without pickling them. Frames are written into the slots of a ring buffer in
+# shared memory. Frame i always goes into slot i % slots, so the encoder reads
+# the frames in order straight from shared memory.
+
+# A render process waits until the slot for its frame was released by the
+# encoder. So the render processes are never more than the size of the ring
+# ahead of the encoder (backpressure).
+
+
+# TODO
+# ====
+
+# - Windows lacks fork(), so the clip would have to be pickled.
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/04/29
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+#       - Render processes profile themselves if profiling is on.
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.Profiler       import PROFILER
+
+# Foreign libraries
+import ctypes
+import logging          as log
+import multiprocessing
+import numpy            as np
+
+
+class FrameRing(object):
+
+    TIMEOUT = 1.0           # Seconds between checks of the render processes
+
+    def __init__(self, shape, slots):
+        """
+        shape is the shape of one frame (height, width, 3). All frames are
+        expected as uint8.
+        """
+
+        self._Shape = tuple(shape)
+        self._Slots = slots
+        self._Views = None
+
+        size = int(np.prod(self._Shape))
+        self._Data = multiprocessing.RawArray(ctypes.c_uint8, slots * size)
+
+        # Index of the frame expected in each slot and whether it was written.
+        self._Owner = multiprocessing.RawArray(ctypes.c_long, range(slots))
+        self._Ready = multiprocessing.RawArray(ctypes.c_byte, slots)
+        self._Abort = multiprocessing.RawValue(ctypes.c_byte, 0)
+        self._Cond = multiprocessing.Condition()
+
+
+    def __views(self):
+        """
+        Get numpy views of the slots. Created once per process.
+        """
+
+        if self._Views is None:
+            data = np.ctypeslib.as_array(self._Data)
+            data = data.reshape((self._Slots,) + self._Shape)
+            self._Views = [data[s] for s in range(self._Slots)]
+
+        return self._Views
+
+
+    # -------------------------------------------------------------------------
+    # - Render side                                                           -
+    # -------------------------------------------------------------------------
+
+
+    def put(self, index, frame):
+        """
+        Write frame with index into its slot. Blocks until the slot is free.
+        Returns False if the ring was aborted.
+        """
+
+        s = index % self._Slots
+
+        with self._Cond:
+            while self._Owner[s] != index:
+                if self._Abort.value:
+                    return False
+                self._Cond.wait(self.TIMEOUT)
+
+        self.__views()[s][...] = frame
+
+        with self._Cond:
+            self._Ready[s] = 1
+            self._Cond.notify_all()
+
+        return True
+
+
+    def abort(self):
+        """
+        Wake up and stop all processes waiting for a slot.
+        """
+
+        with self._Cond:
+            self._Abort.value = 1
+            self._Cond.notify_all()
+
+
+    # -------------------------------------------------------------------------
+    # - Encoder side                                                          -
+    # -------------------------------------------------------------------------
+
+
+    def get(self, index, check=None):
+        """
+        Return view of the frame with index. Blocks until it was written.
+        check is called regularly while waiting and may raise an exception to
+        stop waiting. The view is valid until release() is called.
+        """
+
+        s = index % self._Slots
+
+        with self._Cond:
+            while self._Owner[s] != index or not self._Ready[s]:
+                if check is not None:
+                    check()
+                self._Cond.wait(self.TIMEOUT)
+
+        return self.__views()[s]
+
+
+    def release(self, index):
+        """
+        Hand the slot of frame index over to the frame following in this slot.
+        """
+
+        s = index % self._Slots
+
+        with self._Cond:
+            self._Ready[s] = 0
+            self._Owner[s] = index + self._Slots
+            self._Cond.notify_all()
+
+
+def frameTimes(duration, fps):
+    """
+    Return the points in time of all frames in the same way as MoviePy.
+    """
+
+    return np.arange(0, duration, 1.0 / fps)
+
+
+def renderFrames(clip, times, workers, slots=None):
+    """
+    Render the frames of clip at times in several processes and yield them in
+    order. The yielded arrays are views into shared memory which are reused
+    as soon as the next frame is requested.
+    """
+
+    w, h = clip.size
+    ring = FrameRing((h, w, 3), slots or 2 * workers)
+
+    def render(first):
+        PROFILER.fork("render%d" % first)
+        try:
+            for i in range(first, len(times), workers):
+                with PROFILER.scope("frame"):
+                    frame = clip.get_frame(times[i])
+                if not ring.put(i, frame):
+                    break
+        finally:
+            PROFILER.stop()
+
+    processes = [multiprocessing.Process(target=render, args=(k,))
+                 for k in range(workers)]
+    for p in processes:
+        p.daemon = True
+        p.start()
+
+    log.info("Rendering %d frames in %d processes." % (len(times), workers))
+
+    def check():
+        for p in processes:
+            if p.exitcode not in (None, 0):
+                raise IOError("Render process failed with exit code %d!" %
+                    p.exitcode)
+
+    try:
+        for i in range(len(times)):
+            yield ring.get(i, check)
+            ring.release(i)
+
+    finally:
+        ring.abort()
+        for p in processes:
+            p.join(FrameRing.TIMEOUT)
+            if p.is_alive():
+                p.terminate()
+
+
+# EOF
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Memory Budget                                                             *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Sizing of the caches of a render to a memory budget. Frames are rendered
+# just in time and handed to the encoders, so a render holds only a fixed
+# number of frame buffers regardless of the length of the flight:
+
+#     base        Static layers of the compositor composited once.
+#     scratch     16 bit intermediates of the compositor.
+#     output      The frame being rendered.
+#     queues      Frames waiting in the queue of each encoder.
+#     ring        Shared memory slots of the render processes.
+
+# What is left of the budget after these buffers goes to the caches. A small
+# share is given to the in-memory buffers of the asset cache (they are kept
+# on disk anyway), the rest to the angle caches of the raster needles. Each
+# render process keeps caches of its own, so the rest is divided by their
+# number. Memory of the interpreter and of the track comes on top of the
+# budget.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/05
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.MultiEncoder   import MultiEncoder
+
+# Foreign libraries
+import logging          as log
+
+
+ASSET_SHARE = 0.1       # Share of the caches given to the asset cache
+SCRATCH = 7.0 * 2 / 3   # Compositor scratch (alpha + 2 x RGB, 16 bit) in frames
+
+
+def bufferBytes(size, outputs=1, workers=1):
+    """
+    Return the bytes of the frame buffers of a render of frames of size
+    (width, height) into outputs files by workers render processes.
+    """
+
+    w, h = size
+    frames = 1 + SCRATCH + 1 + MultiEncoder.QUEUE_SIZE * outputs
+    if workers > 1:
+        frames += 2 * workers
+
+    return int(w * h * 3 * frames)
+
+
+def budgetCaches(budget, size, needles, assets, outputs=1, workers=1):
+    """
+    Size the angle caches of needles (list of RasterNeedle) and the memory
+    limit of assets (AssetCache) so that a render of frames of size into
+    outputs files by workers processes stays within budget bytes. Returns the
+    list of the cache sizes (angles) of the needles.
+    """
+
+    rest = budget - bufferBytes(size, outputs, workers)
+
+    if rest <= 0:
+        log.warning("Memory budget of %.0f MB is too small for the frame "
+            "buffers of %dx%d. Caches are kept minimal." %
+            (budget / 1e6, size[0], size[1]))
+        rest = 0
+
+    assets.setLimit(int(rest * ASSET_SHARE))
+
+    # Same number of angles for each needle.
+    entryBytes = sum(n.entryBytes() for n in needles)
+    if entryBytes:
+        entries = int(rest * (1 - ASSET_SHARE) / workers // entryBytes)
+        for needle in needles:
+            needle.setCacheSize(entries)
+
+    sizes = [n.cacheSize for n in needles]
+    log.info("Memory budget of %.0f MB: %s angles per needle, %.0f MB of "
+        "assets." % (budget / 1e6, ", ".join(str(s) for s in sizes),
+        rest * ASSET_SHARE / 1e6))
+
+    return sizes
+
+
+# EOF
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Metrics                                                                   *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Timing of the stages of a render: GPX parsing, calculation, gauge
+# preparation, clip building, rendering and encoding of frames. For each
+# stage the count, wall time and CPU time of this process are summed up per
+# gauge. Stages producing frames report frames per second. Counters hold
+# cache statistics; counters named <cache>_hits and <cache>_misses are
+# reported as hit rate of <cache>.
+
+# Events are written as JSON lines, one object per line with at least the
+# fields 'event', 'time' and 'pid':
+
+#     stage       A stage finished (stage, gauge, wall, cpu, frames, fps).
+#     progress    Frames rendered so far (gauge, done, total, fps, eta).
+#     summary     Totals of all stages and counters at the end of a run.
+
+# Hot paths (per frame) only add up their times with add() and don't write
+# events. Without an open stream nothing is written at all.
+
+# Events for stdout go to the standard output the process started with, so
+# the application can redirect everything else (log, tables) to stderr.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/01
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+from collections        import OrderedDict
+from contextlib         import contextmanager
+from terminaltables     import AsciiTable   as Table
+from time               import time
+import json
+import logging          as log
+import os
+import sys
+
+
+def cpuTime():
+    """
+    Return user and system CPU time of this process in seconds.
+    """
+
+    t = os.times()
+    return t[0] + t[1]
+
+
+class Metrics(object):
+
+    PROGRESS_INTERVAL = 1.0     # Seconds between two progress events
+
+    def __init__(self):
+
+        self._Stream = None
+        self._Tags = {}
+        self.reset()
+
+
+    # -------------------------------------------------------------------------
+    # - Interface methods                                                     -
+    # -------------------------------------------------------------------------
+
+
+    def open(self, path, **tags):
+        """
+        Start writing events to file path (appended) or to stdout if path is
+        '-'. tags are added to every event, e.g. the name of the flight.
+        Statistics of earlier runs are dropped.
+        """
+
+        self.close()
+        self.reset()
+
+        if path == "-":
+            self._Stream = sys.__stdout__
+        else:
+            self._Stream = open(path, "a")
+
+        self._Tags = tags
+
+
+    def close(self):
+        """
+        Stop writing events.
+        """
+
+        if self._Stream is not None and self._Stream is not sys.__stdout__:
+            self._Stream.close()
+
+        self._Stream = None
+        self._Tags = {}
+
+
+    def isOpen(self):
+        """
+        Return True if events are written.
+        """
+
+        return self._Stream is not None
+
+
+    def toStdout(self):
+        """
+        Return True if events are written to stdout.
+        """
+
+        return self._Stream is sys.__stdout__
+
+
+    def reset(self):
+        """
+        Drop all statistics.
+        """
+
+        self._Stages = OrderedDict()    # (stage, gauge) -> [count, wall, cpu,
+                                        #                    frames]
+        self._Counters = OrderedDict()
+        self._LastProgress = {}         # Gauge -> time of last progress event
+
+
+    @contextmanager
+    def stage(self, name, gauge=None):
+        """
+        Context measuring the stage called name of gauge (None for stages of
+        the whole track). Writes a stage event when left.
+        """
+
+        wall = time()
+        cpu = cpuTime()
+
+        try:
+            yield
+        finally:
+            wall = time() - wall
+            cpu = cpuTime() - cpu
+            self.add(name, wall, cpu, gauge)
+
+            self.emit("stage", stage=name, gauge=gauge, wall=wall, cpu=cpu)
+            log.info("%s%s took %.2f sec (%.2f sec CPU)." % (name,
+                " of %s" % gauge if gauge else "", wall, cpu))
+
+
+    def add(self, name, wall, cpu=0.0, gauge=None, frames=0):
+        """
+        Add time of a stage without writing an event. Used per frame.
+        """
+
+        entry = self._Stages.setdefault((name, gauge), [0, 0.0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += wall
+        entry[2] += cpu
+        entry[3] += frames
+
+
+    def count(self, name, n=1):
+        """
+        Increase counter called name by n.
+        """
+
+        self._Counters[name] = self._Counters.get(name, 0) + n
+
+
+    def progress(self, gauge, done, total, start):
+        """
+        Report done of total frames of gauge rendered since time start. Events
+        are written once per PROGRESS_INTERVAL and for the last frame.
+        """
+
+        if self._Stream is None:
+            return
+
+        now = time()
+        if done < total and \
+            now - self._LastProgress.get(gauge, 0.0) < self.PROGRESS_INTERVAL:
+            return
+        self._LastProgress[gauge] = now
+
+        fps = done / max(now - start, 1e-9)
+        eta = (total - done) / fps if fps > 0 else None
+
+        self.emit("progress", gauge=gauge, done=done, total=total, fps=fps,
+                  eta=eta)
+        log.info("%s: %d/%d frames, %.1f fps, %s left" % (gauge, done, total,
+            fps, "%.0f sec" % eta if eta is not None else "unknown time"))
+
+
+    def emit(self, event, **fields):
+        """
+        Write event with fields as one JSON line.
+        """
+
+        if self._Stream is None:
+            return
+
+        record = dict(self._Tags)
+        record.update(fields)
+        record['event'] = event
+        record['time'] = time()
+        record['pid'] = os.getpid()
+
+        self._Stream.write(json.dumps(record, sort_keys=True) + "\n")
+        self._Stream.flush()
+
+
+    def snapshot(self):
+        """
+        Return statistics as dict to be passed to merge() of another process.
+        """
+
+        return {
+            "stages"    :   [(k, list(v)) for k, v in self._Stages.items()],
+            "counters"  :   list(self._Counters.items())
+        }
+
+
+    def merge(self, snapshot):
+        """
+        Add statistics of another process returned by its snapshot().
+        """
+
+        for (name, gauge), (count, wall, cpu, frames) in snapshot['stages']:
+            entry = self._Stages.setdefault((name, gauge), [0, 0.0, 0.0, 0])
+            entry[0] += count
+            entry[1] += wall
+            entry[2] += cpu
+            entry[3] += frames
+
+        for name, n in snapshot['counters']:
+            self.count(name, n)
+
+
+    def hitRates(self):
+        """
+        Return dict of cache name -> hit rate for all counter pairs
+        <cache>_hits and <cache>_misses.
+        """
+
+        rates = OrderedDict()
+        for name in self._Counters:
+            if name.endswith("_hits"):
+                cache = name[:-len("_hits")]
+                hits = self._Counters[name]
+                total = hits + self._Counters.get(cache + "_misses", 0)
+                if total:
+                    rates[cache] = float(hits) / total
+
+        return rates
+
+
+    def summary(self):
+        """
+        Write summary event with the totals of all stages and counters.
+        """
+
+        stages = []
+        for (name, gauge), (count, wall, cpu, frames) in self._Stages.items():
+            stage = {"stage": name, "gauge": gauge, "count": count,
+                     "wall": wall, "cpu": cpu}
+            if frames:
+                stage['frames'] = frames
+                stage['fps'] = frames / wall if wall > 0 else None
+            stages.append(stage)
+
+        self.emit("summary", stages=stages, counters=dict(self._Counters),
+                  hitrates=self.hitRates())
+
+
+    def showReport(self):
+        """
+        Show table of all stages and cache hit rates.
+        """
+
+        rows = [["Stage", "Gauge", "Count", "Wall", "CPU", "FPS"]]
+        for (name, gauge), (count, wall, cpu, frames) in self._Stages.items():
+            fps = "%.1f" % (frames / wall) if frames and wall > 0 else ""
+            rows.append([name, gauge or "", count, "%.2f sec" % wall,
+                         "%.2f sec" % cpu, fps])
+
+        tbl = Table(rows)
+        for column in (2, 3, 4, 5):
+            tbl.justify_columns[column] = 'right'
+
+        print tbl.table
+
+        rates = self.hitRates()
+        if rates:
+            print "Cache hit rates: " + ", ".join("%s %.1f%%" % (c, r * 100)
+                for c, r in rates.items())
+        print
+
+
+# Metrics of the process.
+METRICS = Metrics()
+
+
+# EOF
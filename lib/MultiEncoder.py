@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Multi Resolution Encoder                                                  *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Feed the frames of one render pass into several ffmpeg encoders at once.
+# Every encoder runs in its own thread with a small queue of frames. The
+# frames are shared between all encoders and only read by them. If an output
+# has a smaller resolution than the rendered frames, its thread downscales a
+# copy before handing it to ffmpeg.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.2
+# Date:     2017/04/29
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+# 0.2:  - Added sync() for frames living in reused buffers.
+
+
+###############################################################################
+
+
+# Foreign libraries
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from PIL                            import Image
+import logging                      as log
+import numpy                        as np
+import sys
+import threading
+
+try:
+    import Queue                    as queue
+except ImportError:
+    import queue
+
+
+class MultiEncoder(object):
+
+    QUEUE_SIZE = 4          # Frames waiting per encoder before render blocks.
+    RESAMPLE = Image.BOX    # Filter used to downscale frames.
+
+    def __init__(self, outputs, size, settings):
+        """
+        outputs expects a list of tuples (path, (width, height)). size is the
+        resolution of the frames passed to write_frame().
+        """
+
+        self._Size = tuple(size)
+        self._Errors = []
+        self._Threads = []
+        self._Queues = []
+
+        # Share ffmpeg threads between all encoders.
+        threads = max(1, settings['ffmpeg_threads'] // len(outputs))
+
+        for path, outSize in outputs:
+            outSize = tuple(outSize)
+
+            if abs(float(outSize[0]) / outSize[1] - \
+                float(self._Size[0]) / self._Size[1]) > 0.01:
+                log.warning("Aspect ratio of '%s' differs from rendered "
+                    "frames. The gauges will be distorted." % path)
+
+            writer = FFMPEG_VideoWriter(
+                path,
+                outSize,
+                settings['framerate'],
+                codec=settings['codec'],
+                preset=settings['ffmpeg_preset'],
+                threads=threads
+            )
+
+            q = queue.Queue(maxsize=self.QUEUE_SIZE)
+            thread = threading.Thread(
+                target=self.__encode,
+                args=(q, writer, outSize)
+            )
+            thread.daemon = True
+            thread.start()
+
+            self._Queues.append(q)
+            self._Threads.append(thread)
+
+
+    def __encode(self, q, writer, size):
+        """
+        Worker thread taking frames from queue q until None is received.
+        """
+
+        try:
+            while True:
+                frame = q.get()
+                if frame is None:
+                    q.task_done()
+                    break
+
+                if size != self._Size:
+                    frame = np.asarray(
+                        Image.fromarray(frame).resize(size, self.RESAMPLE)
+                    )
+
+                writer.write_frame(frame)
+                q.task_done()
+
+        except Exception:
+            self._Errors.append(sys.exc_info())
+            q.task_done()
+
+            # Drain queue so that the render loop does not block forever.
+            while q.get() is not None:
+                q.task_done()
+            q.task_done()
+
+        finally:
+            writer.close()
+
+
+    def close(self):
+        """
+        Wait for all encoders to finish. Errors of the encoder threads are
+        raised here.
+        """
+
+        for q in self._Queues:
+            q.put(None)
+        for thread in self._Threads:
+            thread.join()
+
+        if self._Errors:
+            exc_type, exc_value, exc_tb = self._Errors[0]
+            raise IOError("Encoding failed: %s" % exc_value)
+
+
+    def sync(self):
+        """
+        Wait until all encoders took over the frames passed so far. Needed if
+        the caller reuses the memory of the frames.
+        """
+
+        for q in self._Queues:
+            q.join()
+
+
+    def write_frame(self, frame):
+        """
+        Pass one rendered frame to all encoders.
+        """
+
+        if self._Errors:
+            self.close()
+
+        for q in self._Queues:
+            q.put(frame)
+
+
+# EOF
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Planner                                                                   *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Estimate the cost of rendering a gauge without rendering it. Counted from
+# the track and the settings:
+
+#     frames      Frames of the video (after time window and time lapse).
+#     segments    Segments of a segmented render.
+#     states      Distinct quantized angles per needle image, i.e. the
+#                 rotations which can't be taken from the needle cache.
+
+# A micro benchmark renders a few frames spread over the clip twice, once
+# with empty needle caches and once with filled ones, and encodes a few
+# consecutive frames into a temporary file. This gives the cost of a frame,
+# of a needle rotation and of encoding on the current machine, as well as the
+# bytes per frame of the output. From these the render time, the output size
+# and the peak memory (resident size of the process so far plus caches and
+# frame buffers) are estimated.
+
+# Estimates are rough: output size depends on how much the needles move and
+# encoding overlaps with rendering on machines with several cores.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.2
+# Date:     2017/05/05
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+# 0.2:  - Cache and buffer sizes of the memory budget.
+
+
+###############################################################################
+
+
+# Gauge modules
+from gauges.Needle      import RasterNeedle
+
+# Own libraries
+from lib.calculations.time_conv import sec2hms
+from lib.FrameRing      import frameTimes
+from lib.MemoryBudget   import bufferBytes
+from lib.MultiEncoder   import MultiEncoder
+
+# Foreign libraries
+from terminaltables     import AsciiTable   as Table
+from time               import time
+import multiprocessing
+import numpy            as np
+import os
+import shutil
+import tempfile
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class Planner(object):
+
+    SAMPLES = 24            # Frames rendered and encoded by the benchmark
+
+    def __init__(self, settings):
+
+        self._Settings = settings
+
+
+    # -------------------------------------------------------------------------
+    # - Interface methods                                                     -
+    # -------------------------------------------------------------------------
+
+
+    def plan(self, gauge, clip, outputs):
+        """
+        Estimate cost of rendering clip of gauge into outputs (list of tuples
+        (path, (width, height))). Returns dict of the estimates.
+        """
+
+        settings = self._Settings
+        fps = settings['framerate']
+
+        # Points in time of the track shown by the frames.
+        speed = 1.0
+        if settings.get('stride'):
+            speed = float(settings['stride']) * fps
+            clip = gauge._timelapse(clip, settings['stride'], fps)
+
+        times = frameTimes(clip.duration, fps)
+        offset = 0.0
+        if gauge._WpInst.hasWindow():
+            offset = gauge._WpInst.getWindowOffset()
+        trackTimes = offset + times * speed
+
+        frames = len(times)
+
+        segments = 1
+        if settings.get('segment_length'):
+            length = int(round(settings['segment_length'] * fps))
+            segments = max(1, (frames + length - 1) // length)
+
+        # Distinct rotations per needle. Vector needles are drawn per frame.
+        needles = gauge._ComposedNeedles
+        states = []
+        for needle, angle in needles:
+            if isinstance(needle, RasterNeedle):
+                keys = set(int(round((angle(t) % 360.0) / needle.ANGLE_STEP))
+                           for t in trackTimes)
+                states.append(len(keys))
+            else:
+                states.append(frames)
+
+        bench = self.__benchmark(clip, outputs, needles)
+
+        # Time of rendering and encoding.
+        workers = min(settings.get('render_workers', 1),
+                      multiprocessing.cpu_count())
+        rotations = sum(states)
+        render = (frames * bench['frame'] + rotations * bench['rotation']) \
+            / workers
+        encode = frames * bench['encode']
+
+        # Memory of caches and buffers on top of what is used now.
+        cacheBytes = 0
+        for (needle, angle), n in zip(needles, states):
+            if isinstance(needle, RasterNeedle):
+                cacheBytes += min(n, needle.cacheSize) * bench['roi']
+        memory = self.__rss() + cacheBytes * workers + \
+            bufferBytes(clip.size, len(outputs), workers)
+
+        return {
+            "gauge"     :   gauge._name(),
+            "frames"    :   frames,
+            "segments"  :   segments,
+            "states"    :   states,
+            "seconds"   :   render + encode,
+            "render"    :   render,
+            "encode"    :   encode,
+            "memory"    :   int(memory),
+            "size"      :   [int(frames * b) for b in bench['bytes']],
+            "outputs"   :   [path for path, size in outputs],
+            "benchmark" :   bench
+        }
+
+
+    def showPlan(self, plans):
+        """
+        Show table of plans.
+        """
+
+        rows = [["Gauge", "Frames", "Segments", "Needle states", "Time",
+                 "Peak memory", "Output size"]]
+
+        for p in plans:
+            rows.append([
+                p['gauge'],
+                p['frames'],
+                p['segments'],
+                ", ".join(str(n) for n in p['states']),
+                sec2hms(p['seconds']),
+                "%.0f MB" % (p['memory'] / 1e6),
+                ", ".join("%.1f MB" % (s / 1e6) for s in p['size'])
+            ])
+
+        if len(plans) > 1:
+            rows.append([
+                "total", sum(p['frames'] for p in plans),
+                sum(p['segments'] for p in plans), "",
+                sec2hms(sum(p['seconds'] for p in plans)),
+                "%.0f MB" % (max(p['memory'] for p in plans) / 1e6),
+                "%.1f MB" % (sum(sum(p['size']) for p in plans) / 1e6)
+            ])
+
+        tbl = Table(rows)
+        for column in (1, 2, 4, 5, 6):
+            tbl.justify_columns[column] = 'right'
+
+        print tbl.table + '\n'
+
+
+    # -------------------------------------------------------------------------
+    # - Helpers                                                               -
+    # -------------------------------------------------------------------------
+
+
+    def __benchmark(self, clip, outputs, needles):
+        """
+        Render and encode a few frames of clip showing needles (list of
+        tuples (needle, angle function)). Returns dict with the seconds per
+        frame with filled needle caches ('frame'), per needle rotation
+        ('rotation') and per encoded frame ('encode'), the mean bytes of a
+        rotated needle ('roi') and the bytes per frame of each output
+        ('bytes').
+        """
+
+        count = min(self.SAMPLES, max(1, len(frameTimes(clip.duration,
+            self._Settings['framerate']))))
+        times = np.linspace(0, clip.duration, count, endpoint=False)
+
+        # Empty caches, then filled caches.
+        start = time()
+        for t in times:
+            clip.get_frame(t)
+        cold = (time() - start) / count
+
+        start = time()
+        for t in times:
+            clip.get_frame(t)
+        warm = (time() - start) / count
+
+        rotation = max(cold - warm, 0.0) / max(len(needles), 1)
+
+        # Size of the rotated needles now in the caches.
+        entries = 0
+        cached = 0
+        for needle, angle in needles:
+            if isinstance(needle, RasterNeedle):
+                stats = needle.stats()
+                entries += stats['entries']
+                cached += stats['bytes']
+        roi = cached / float(entries) if entries else 0.0
+
+        # Encode consecutive frames from the middle of the clip into
+        # temporary files of the same formats, as frames spread over the
+        # clip differ more than those of a video.
+        fps = float(self._Settings['framerate'])
+        first = max(0.0, clip.duration / 2 - count / fps / 2)
+        frames = [clip.get_frame(first + k / fps).astype("uint8")
+                  for k in range(count)]
+
+        tmp = tempfile.mkdtemp(prefix="videogauge_plan_")
+        try:
+            files = [(os.path.join(tmp, "%d%s" % (k,
+                      os.path.splitext(path)[1])), size)
+                     for k, (path, size) in enumerate(outputs)]
+
+            start = time()
+            encoder = MultiEncoder(files, clip.size, self._Settings)
+            try:
+                for frame in frames:
+                    encoder.write_frame(frame)
+            finally:
+                encoder.close()
+            encode = (time() - start) / count
+
+            sizes = [os.path.getsize(path) / float(count)
+                     for path, size in files]
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        return {
+            "frame"     :   warm,
+            "rotation"  :   rotation,
+            "encode"    :   encode,
+            "roi"       :   roi,
+            "bytes"     :   sizes
+        }
+
+
+    def __rss(self):
+        """
+        Return the peak resident size of this process so far in bytes.
+        """
+
+        if resource is None:
+            return 0
+
+        # Linux reports kilobytes.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# EOF
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Profiler                                                                  *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Profiling of the stages of a render. Code inside a scope() is run under
+# cProfile while a thread samples the stack of the profiled thread every few
+# milliseconds. Stops write two files:
+
+#     <prefix>.txt      Functions sorted by cumulative and by own time, and a
+#                       section for the per frame hot paths (make_frame,
+#                       needle rendering, compositing, resizing, encoding).
+#     <prefix>.folded   Sampled stacks in collapsed format ("a;b;c count")
+#                       for flame graph tools. Stacks start with the names of
+#                       the open scopes.
+
+# Processes forked while profiling call fork() to profile themselves into
+# files named <prefix>.<name>.
+
+# Without start() scope() returns a shared context doing nothing, so the
+# scopes can stay in the hot paths.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/01
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+from contextlib         import contextmanager
+import cProfile
+import logging          as log
+import os
+import pstats
+import sys
+import threading
+import time
+
+
+# Functions called per frame shown in their own section of the report.
+HOT_PATHS = "make_frame|render|blend|frame|transform|resize|write_frame"
+
+
+class NullScope(object):
+    """
+    Context doing nothing, used while profiling is off.
+    """
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        return False
+
+
+class Profiler(object):
+
+    INTERVAL = 0.005        # Seconds between two samples
+
+    def __init__(self):
+
+        self.enabled = False
+        self._Prefix = None
+        self._Null = NullScope()
+
+
+    # -------------------------------------------------------------------------
+    # - Interface methods                                                     -
+    # -------------------------------------------------------------------------
+
+
+    def start(self, prefix):
+        """
+        Start profiling the calling thread. Reports are written to files
+        starting with prefix.
+        """
+
+        self._Prefix = prefix
+        self._Scopes = []
+        self.enabled = True
+        self.__begin()
+
+
+    def fork(self, name):
+        """
+        Continue profiling in a forked process into files of its own. Does
+        nothing if profiling is off.
+        """
+
+        if not self.enabled:
+            return
+
+        self._Prefix = "%s.%s" % (self._Prefix, name)
+        self.__begin()
+
+        # The forked process may start inside a scope.
+        if self._Scopes:
+            self._Profile.enable()
+
+
+    def stop(self):
+        """
+        Stop profiling and write the reports. Does nothing if profiling is
+        off.
+        """
+
+        if not self.enabled:
+            return
+
+        self.enabled = False
+        self._Profile.disable()
+        self._Sampling.clear()
+        self._Sampler.join()
+
+        try:
+            self.__writeReport(self._Prefix + ".txt")
+            self.__writeStacks(self._Prefix + ".folded")
+        except IOError, e:
+            log.error("Could not write profile: %s" % e)
+            return
+
+        log.info("Profile written to %s.txt and %s.folded." %
+            (self._Prefix, self._Prefix))
+
+
+    def scope(self, name):
+        """
+        Return context profiling the code inside as scope called name.
+        """
+
+        if not self.enabled:
+            return self._Null
+
+        return self.__scope(name)
+
+
+    # -------------------------------------------------------------------------
+    # - Helpers                                                               -
+    # -------------------------------------------------------------------------
+
+
+    def __begin(self):
+        """
+        Set up a new profile and start sampling the calling thread.
+        """
+
+        self._Profile = cProfile.Profile()
+        self._Stacks = {}
+        self._Samples = 0
+
+        self._Sampling = threading.Event()
+        self._Sampling.set()
+        self._Sampler = threading.Thread(
+            target=self.__sample,
+            args=(threading.current_thread().ident,)
+        )
+        self._Sampler.daemon = True
+        self._Sampler.start()
+
+
+    @contextmanager
+    def __scope(self, name):
+
+        self._Scopes.append(name)
+        if len(self._Scopes) == 1:
+            self._Profile.enable()
+
+        try:
+            yield
+        finally:
+            self._Scopes.pop()
+            if not self._Scopes:
+                self._Profile.disable()
+
+
+    def __sample(self, ident):
+        """
+        Sampler thread recording the stack of thread ident while it is
+        inside a scope.
+        """
+
+        while self._Sampling.is_set():
+            time.sleep(self.INTERVAL)
+
+            scopes = list(self._Scopes)
+            frame = sys._current_frames().get(ident)
+            if not scopes or frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("%s (%s:%d)" % (code.co_name,
+                    os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            del frame
+
+            key = ";".join(scopes + stack[::-1])
+            self._Stacks[key] = self._Stacks.get(key, 0) + 1
+            self._Samples += 1
+
+
+    def __writeReport(self, path):
+
+        with open(path, "w") as f:
+            f.write("Profile of process %d, %d samples every %.0f ms\n\n" %
+                (os.getpid(), self._Samples, self.INTERVAL * 1000))
+
+            try:
+                stats = pstats.Stats(self._Profile, stream=f)
+            except TypeError:
+                f.write("Nothing was profiled.\n")
+                return
+
+            stats.strip_dirs()
+
+            f.write("=== By cumulative time ===\n")
+            stats.sort_stats("cumulative").print_stats(40)
+
+            f.write("=== By own time ===\n")
+            stats.sort_stats("time").print_stats(40)
+
+            f.write("=== Per frame hot paths ===\n")
+            stats.sort_stats("cumulative").print_stats(HOT_PATHS)
+
+
+    def __writeStacks(self, path):
+
+        with open(path, "w") as f:
+            for stack, count in sorted(self._Stacks.items()):
+                f.write("%s %d\n" % (stack, count))
+
+
+# Profiler of the process.
+PROFILER = Profiler()
+
+
+# EOF
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track filters                                                             *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Filters for noisy fields of the track, applied before vertical speed and G
+# forces are derived from them by differences.
+
+# hampel() replaces outliers: a value farther than a number of standard
+# deviations from the median of the window around it is replaced by that
+# median. The standard deviation is estimated from the median absolute
+# deviation (MAD) of the window, so single spikes don't widen it.
+
+# savitzkyGolay() smoothes by fitting a polynomial to the window around each
+# trackpoint by least squares and taking its value at the trackpoint. The fit
+# is done over the timestamps, so irregular sampling is handled; for equal
+# steps it is the classic Savitzky-Golay filter. Slopes and peaks are kept
+# much better than by a moving average of the same width.
+
+# Windows are counted in trackpoints and are shifted inwards at both ends of
+# the track. All windows are taken from the whole column at once by an index
+# matrix, there are no loops over trackpoints. Missing values are bridged
+# linearly for the windows and stay missing.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/10
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+import numpy                        as np
+
+
+MAD_SIGMA = 1.4826          # Standard deviations per MAD of normal noise
+
+
+def windows(count, window):
+    """
+    Index matrix of the window of window trackpoints around each of count
+    trackpoints, shifted inwards at the ends.
+    """
+
+    start = np.clip(np.arange(count) - window // 2, 0, count - window)
+    return start[:, None] + np.arange(window)
+
+
+def bridged(times, values):
+    """
+    Return values with missing ones interpolated linearly over times.
+    """
+
+    valid = np.isfinite(values)
+    if valid.all():
+        return values
+    return np.interp(times, times[valid], values[valid])
+
+
+def checkWindow(window, minimum=3):
+    """
+    Raise ValueError unless window is an odd number of trackpoints.
+    """
+
+    if window < minimum or window % 2 != 1:
+        raise ValueError("Filter windows must be odd numbers of at least %d "
+            "trackpoints, got %s!" % (minimum, window))
+
+
+def hampel(times, values, window=7, sigmas=3.0):
+    """
+    Replace outliers of values by the median of their window. Returns the
+    filtered values and the number of outliers replaced.
+    """
+
+    checkWindow(window)
+    v = np.asarray(values, dtype=float)
+    valid = np.isfinite(v)
+    if valid.sum() < 2 or len(v) < window:
+        return v.copy(), 0
+
+    w = bridged(np.asarray(times, dtype=float), v)[windows(len(v), window)]
+    median = np.median(w, axis=1)
+    mad = np.median(np.abs(w - median[:, None]), axis=1) * MAD_SIGMA
+
+    with np.errstate(invalid="ignore"):
+        outlier = valid & (np.abs(v - median) > sigmas * mad)
+
+    return np.where(outlier, median, v), int(outlier.sum())
+
+
+def savitzkyGolay(times, values, window=9, order=2):
+    """
+    Smooth values by local polynomials of order over windows of window
+    trackpoints. Returns the smoothed values.
+    """
+
+    checkWindow(window)
+    if not 0 <= order < window:
+        raise ValueError("Polynomial order must be below the window!")
+
+    t = np.asarray(times, dtype=float)
+    v = np.asarray(values, dtype=float)
+    valid = np.isfinite(v)
+    if valid.sum() < 2 or len(v) < window:
+        return v.copy()
+
+    index = windows(len(v), window)
+    y = bridged(t, v)[index]
+
+    # Times relative to the trackpoint, scaled to -1..1 for the fit.
+    x = t[index] - t[:, None]
+    scale = np.abs(x).max(axis=1)
+    x /= np.where(scale > 0, scale, 1.0)[:, None]
+
+    # Normal equations of all windows: sums of x^k and x^k * y.
+    power = np.ones_like(x)
+    sums = []
+    moments = []
+    for k in range(2 * order + 1):
+        sums.append(power.sum(axis=1))
+        if k <= order:
+            moments.append((power * y).sum(axis=1))
+        power = power * x
+
+    exponents = np.add.outer(np.arange(order + 1), np.arange(order + 1))
+    normal = np.stack(sums, axis=1)[:, exponents]
+    moments = np.stack(moments, axis=1)
+
+    try:
+        coef = np.linalg.solve(normal, moments)
+    except np.linalg.LinAlgError:
+        # Windows of equal timestamps.
+        coef = np.einsum("nab,nb->na", np.linalg.pinv(normal), moments)
+
+    return np.where(valid, coef[:, 0], np.nan)
+
+
+# EOF
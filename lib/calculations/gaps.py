@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track gaps                                                                *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Filling of missing values of the track. Many loggers write no speed, and
+# fixes without altitude or with a lost signal leave holes in the columns.
+
+# groundSpeeds() derives the speed at each trackpoint from the along track
+# distance between the trackpoints before and after it and their times
+# (central differences, one-sided next to missing positions and at the ends).
+
+# fillGaps() closes the gaps of a column. Gaps up to maxGap seconds between
+# the valid values around them are interpolated linearly. Longer gaps and
+# gaps at the ends of the track hold the last (or first) valid value and are
+# marked in the returned mask, so gauges can show them as held or fade out.
+
+# Both work on whole columns.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/10
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.calculations.navigation    import trackDistances
+
+# Foreign libraries
+import numpy                        as np
+
+
+def groundSpeeds(times, lat, lon):
+    """
+    Ground speeds in m/s at the trackpoints from their positions and times.
+    NaN where the position is missing or no neighbour has one.
+    """
+
+    t = np.asarray(times, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    n = len(t)
+    if n < 2:
+        return np.full(n, np.nan)
+
+    known = np.isfinite(lat) & np.isfinite(lon)
+    along = trackDistances(lat, lon)
+
+    # Neighbours with position, else the trackpoint itself.
+    index = np.arange(n)
+    lower = np.where(np.concatenate(([False], known[:-1])), index - 1, index)
+    higher = np.where(np.concatenate((known[1:], [False])), index + 1, index)
+
+    dt = t[higher] - t[lower]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        speed = (along[higher] - along[lower]) / dt
+
+    return np.where(known & (dt > 0), speed, np.nan)
+
+
+def fillGaps(times, values, maxGap):
+    """
+    Interpolate gaps of values up to maxGap seconds long, hold the values
+    over longer gaps. Returns the filled values and the mask of held ones.
+    A column without any value is returned as it is.
+    """
+
+    t = np.asarray(times, dtype=float)
+    v = np.asarray(values, dtype=float)
+    valid = np.isfinite(v)
+    if valid.all() or not valid.any():
+        return v.copy(), np.zeros(len(v), dtype=bool)
+
+    n = len(v)
+    index = np.arange(n)
+
+    # Last valid value before and first one after each trackpoint.
+    lower = np.maximum.accumulate(np.where(valid, index, -1))
+    higher = np.minimum.accumulate(np.where(valid, index, n)[::-1])[::-1]
+
+    inside = (lower >= 0) & (higher < n)
+    span = t[np.minimum(higher, n - 1)] - t[np.maximum(lower, 0)]
+    short = ~valid & inside & (span <= maxGap)
+
+    known = np.flatnonzero(valid)
+    interpolated = np.interp(t, t[known], v[known])
+    hold = v[np.where(lower >= 0, lower, known[0])]
+
+    held = ~valid & ~short
+    filled = np.where(valid, v, np.where(short, interpolated, hold))
+    return filled, held
+
+
+# EOF
@@ -22,7 +22,7 @@
 
 # Creator:  Florian Meissner
 #           n1990b@gmx.de
-# Version:  1.0
+# Version:  1.1
 # Date:     2017/03/21
 
 
@@ -31,6 +31,7 @@
 
 # 0.1:  Initial Beta
 # 1.0:  Restructured, Split from av_conv.py
+# 1.1:  Added joinXY() and scaleXY().
 
 
 ###############################################################################
@@ -60,4 +61,27 @@ def splitXY(string):
     return (int(x), int(y))
 
 
+# Join coordinates into string separated by 'x'.
+# E.g. '(1280, 720)' -> '1280x720'
+def joinXY(x, y):
+    return "%dx%d" % (x, y)
+
+
+# Scale coordinate string or tuple by factor. Results can be rounded to even
+# numbers as needed by most video codecs.
+# E.g. ('1280x720', 0.25) -> '(320, 180)'
+def scaleXY(xy, factor, even=False):
+    if not isinstance(xy, tuple):
+        xy = splitXY(xy)
+
+    x = int(round(xy[0] * factor))
+    y = int(round(xy[1] * factor))
+
+    if even:
+        x -= x % 2
+        y -= y % 2
+
+    return (x, y)
+
+
 # EOF
@@ -10,6 +10,15 @@
 
 # Collection of calculations used for aeronautical navigational purposes.
 
+# The functions work on whole numpy arrays of latitudes and longitudes (in
+# degrees) at once and broadcast like numpy operators, e.g. one point against
+# a track. NaN positions give NaN results. getBearing(), getDistance() and
+# findFix() are the scalar versions for one pair of points. They use the
+# math module, which is much faster than numpy for single values.
+
+# Formulas from http://www.movable-type.co.uk/scripts/latlong.html on a
+# sphere of EARTH_RADIUS.
+
 
 # TODO
 # ====
@@ -22,20 +31,152 @@
 
 # Creator:  Florian Meissner
 #           n1990b@gmx.de
-# Version:  0.1
-# Date:     2017/03/21
+# Version:  0.2
+# Date:     2017/05/09
 
 
 # VERSION HISTORY
 # ===============
 
 # 0.1:  Initial Beta
+# 0.2:  Array versions of all calculations.
 
 
 ###############################################################################
 
 
 from math import sin, cos, asin, atan2, sqrt, radians, degrees
+import numpy as np
+
+
+EARTH_RADIUS = 6371000.0    # meters
+
+
+# -----------------------------------------------------------------------------
+# - Arrays                                                                    -
+# -----------------------------------------------------------------------------
+
+
+def bearings(lat1, lon1, lat2, lon2):
+    """
+    Initial bearings in degrees (0 to 360) from points 1 to points 2.
+    Formula from http://www.movable-type.co.uk/scripts/latlong.html#bearing
+    """
+
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dLambda = np.radians(lon2) - np.radians(lon1)
+
+    y = np.sin(dLambda) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - \
+        np.sin(phi1) * np.cos(phi2) * np.cos(dLambda)
+
+    # atan2 gives values between -180 deg and 180 deg.
+    return (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+
+def finalBearings(lat1, lon1, lat2, lon2):
+    """
+    Bearings in degrees (0 to 360) on arrival at points 2 coming from
+    points 1.
+    Formula from http://www.movable-type.co.uk/scripts/latlong.html#bearing
+    """
+
+    return (bearings(lat2, lon2, lat1, lon1) + 180) % 360
+
+
+def distances(lat1, lon1, lat2, lon2):
+    """
+    Great circle distances in meters between points 1 and points 2
+    (haversine).
+    Formula from http://www.movable-type.co.uk/scripts/latlong.html#distance
+    """
+
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dPhi = phi2 - phi1
+    dLambda = np.radians(lon2) - np.radians(lon1)
+
+    a = np.sin(dPhi / 2) ** 2 + \
+        np.cos(phi1) * np.cos(phi2) * np.sin(dLambda / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return EARTH_RADIUS * c
+
+
+def trackDistances(lat, lon):
+    """
+    Cumulative along track distances in meters of the points of a track
+    from its first point. Legs touching a point without position add
+    nothing.
+    """
+
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if len(lat) == 0:
+        return np.zeros(0)
+
+    legs = distances(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    legs[~np.isfinite(legs)] = 0.0
+
+    return np.concatenate(([0.0], np.cumsum(legs)))
+
+
+def findFixes(lat, lon, bearing, distance):
+    """
+    Points reached from lat, lon in degrees on the initial bearing (in
+    radians like findFix()) after distance meters. Returns the tuple of
+    arrays (lat, lon), longitudes normalized to -180 to 180.
+    Formula from http://www.movable-type.co.uk/scripts/latlong.html#destPoint
+    """
+
+    phi1 = np.radians(lat)
+    lambda1 = np.radians(lon)
+    dr = np.asarray(distance, dtype=float) / EARTH_RADIUS
+
+    phi2 = np.arcsin(np.sin(phi1) * np.cos(dr) +
+                     np.cos(phi1) * np.sin(dr) * np.cos(bearing))
+    lambda2 = lambda1 + np.arctan2(np.sin(bearing) * np.sin(dr) * np.cos(phi1),
+                                   np.cos(dr) - np.sin(phi1) * np.sin(phi2))
+
+    return np.degrees(phi2), (np.degrees(lambda2) + 540) % 360 - 180
+
+
+def crossTrackDistances(lat1, lon1, lat2, lon2, lat, lon):
+    """
+    Distances in meters of points lat, lon from the great circle through
+    points 1 and 2. Points right of the course from 1 to 2 are positive.
+    Formula from http://www.movable-type.co.uk/scripts/latlong.html#cross-track
+    """
+
+    d13 = distances(lat1, lon1, lat, lon) / EARTH_RADIUS
+    theta13 = np.radians(bearings(lat1, lon1, lat, lon))
+    theta12 = np.radians(bearings(lat1, lon1, lat2, lon2))
+
+    return np.arcsin(np.sin(d13) * np.sin(theta13 - theta12)) * EARTH_RADIUS
+
+
+def alongTrackDistances(lat1, lon1, lat2, lon2, lat, lon):
+    """
+    Distances in meters from points 1 to the foot of points lat, lon on the
+    great circle through points 1 and 2. Negative if the foot lies behind
+    points 1.
+    Formula from http://www.movable-type.co.uk/scripts/latlong.html#cross-track
+    """
+
+    d13 = distances(lat1, lon1, lat, lon) / EARTH_RADIUS
+    theta13 = np.radians(bearings(lat1, lon1, lat, lon))
+    theta12 = np.radians(bearings(lat1, lon1, lat2, lon2))
+    dxt = np.arcsin(np.sin(d13) * np.sin(theta13 - theta12))
+
+    ratio = np.clip(np.cos(d13) / np.cos(dxt), -1.0, 1.0)
+    return np.arccos(ratio) * np.sign(np.cos(theta13 - theta12)) * \
+        EARTH_RADIUS
+
+
+# -----------------------------------------------------------------------------
+# - Scalars                                                                   -
+# -----------------------------------------------------------------------------
 
 
 def getBearing(wp1, wp2):
@@ -84,26 +225,22 @@ def getDistance(wp1, wp2):
     phi2 = radians(lat2)
     lambda2 = radians(lon2)
 
-    earth_radius = 6371000 # meters
-
     delta_phi = phi2 - phi1
     delta_lambda = lambda2 - lambda1
 
     a = sin(delta_phi/2)**2 + cos(phi1) * cos(phi2) * sin(delta_lambda/2)**2
     c = 2 * atan2(sqrt(a), sqrt(1-a))
-    dist = earth_radius * c
+    dist = EARTH_RADIUS * c
 
     return dist
 
 
 def findFix(startWP, bearing, distance):
     """
-    Calculate a fix defined by a waypoint, bearing and distance..
+    Calculate a fix defined by a waypoint, bearing (in radians) and distance.
     Formular from http://www.movable-type.co.uk/scripts/latlong.html#destPoint
     """
 
-    earth_radius = 6371000 # meters
-
     # lat, lon in degrees
     # phi, lambda in radians
 
@@ -113,7 +250,7 @@ def findFix(startWP, bearing, distance):
     phi1 = radians(lat1)
     lambda1 = radians(lon1)
 
-    dr = distance / earth_radius
+    dr = distance / EARTH_RADIUS
 
     phi2 = asin(sin(phi1) * cos(dr) + cos(phi1) * sin(dr) * cos(bearing))
     lambda2 = lambda1 + atan2(sin(bearing) * sin(dr) * cos(phi1), cos(dr) - sin(phi1) * sin(phi2))
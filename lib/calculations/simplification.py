@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track simplification                                                      *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Douglas-Peucker simplification of a track over time. Every trackpoint
+# becomes a needle segment of the gauges, which interpolate the fields
+# linearly in time between trackpoints. A trackpoint can be left out if the
+# line between the trackpoints kept around it misses its value by less than
+# the tolerance of every field, e.g. 0.5 kt of speed and 5 ft of altitude.
+# The error is measured against all original trackpoints, not only against
+# the ones removed last, so the simplified track never leaves the tolerance.
+
+# The recursion is run level by level on whole columns: each pass finds the
+# trackpoint of largest error of all unfinished segments at once and keeps
+# it if it is out of tolerance. Segments within tolerance are finished and
+# their trackpoints dropped from the following passes. Smooth tracks need
+# about log N passes over a shrinking set of trackpoints, O(N log N) in
+# total. Noise near the tolerance splits segments unevenly and needs more
+# passes.
+
+# Trackpoints missing a value of a selected field and their neighbours are
+# always kept.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/10
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+import numpy                        as np
+
+
+def simplify(times, columns, tolerances):
+    """
+    Return a boolean array marking the trackpoints to keep. times are the
+    sorted timestamps, columns a dict of arrays of the fields and tolerances
+    maps fields to the largest change allowed. Fields without any value are
+    ignored; if no field is left, all trackpoints are kept.
+    """
+
+    t = np.asarray(times, dtype=float)
+    n = len(t)
+    keep = np.zeros(n, dtype=bool)
+    if n < 3:
+        keep[:] = True
+        return keep
+
+    keep[0] = keep[-1] = True
+
+    # Values in units of their tolerance, so errors compare to 1.
+    scaled = []
+    for field, tolerance in tolerances.items():
+        if tolerance <= 0:
+            raise ValueError("Tolerance of '%s' must be positive!" % field)
+        values = np.asarray(columns[field], dtype=float)
+        missing = np.isnan(values)
+        if missing.all():
+            continue
+        keep[1:] |= missing[:-1]
+        keep[:-1] |= missing[1:]
+        keep |= missing
+        scaled.append(values / tolerance)
+
+    if not scaled:
+        keep[:] = True
+        return keep
+
+    active = np.flatnonzero(~keep)
+    while len(active):
+        kept = np.flatnonzero(keep)
+
+        # Kept trackpoints around each active one.
+        after = np.searchsorted(kept, active)
+        a = kept[after - 1]
+        b = kept[after]
+
+        span = t[b] - t[a]
+        frac = (t[active] - t[a]) / np.where(span > 0, span, 1.0)
+
+        error = np.zeros(len(active))
+        for v in scaled:
+            line = v[a] + (v[b] - v[a]) * frac
+            np.maximum(error, np.abs(v[active] - line), out=error)
+
+        # Largest error of each segment.
+        first = np.concatenate(([True], after[1:] != after[:-1]))
+        segment = np.cumsum(first) - 1
+        largest = np.maximum.reduceat(error, np.flatnonzero(first))[segment]
+
+        split = largest > 1.0
+        pick = np.flatnonzero(split & (error == largest))
+        pick = pick[np.unique(segment[pick], return_index=True)[1]]
+        keep[active[pick]] = True
+
+        split[pick] = False
+        active = active[split]
+
+    return keep
+
+
+# EOF
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Collection of conversions                                                 *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Collection of conversion functions for points in time and durations as they
+# are given on the command line or found in video metadata.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/04/20
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  Initial Beta
+
+
+###############################################################################
+
+
+from datetime import datetime
+
+
+EPOCH = datetime(1970, 1, 1)
+
+# Formats of absolute points in time. All of them are expected in UTC.
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%d %H:%M:%S"
+)
+
+
+# -----------------------------------------------------------------------------
+# - Points in time                                                            -
+# -----------------------------------------------------------------------------
+
+
+def parseTimestamp(string):
+    """
+    Parse an absolute UTC point in time like '2017-04-07T10:15:00Z' into a
+    datetime object. Returns None if the string is no absolute point in time.
+    """
+
+    string = string.strip()
+
+    # Timezone designator for UTC.
+    if string.endswith("Z"):
+        string = string[:-1]
+
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(string, fmt)
+        except ValueError:
+            continue
+
+    return None
+
+
+def datetime2unix(dt):
+    """
+    Convert a datetime object into seconds since epoch in the same way the
+    waypoint class does.
+    """
+
+    return (dt - EPOCH).total_seconds()
+
+
+# -----------------------------------------------------------------------------
+# - Durations                                                                 -
+# -----------------------------------------------------------------------------
+
+
+def hms2sec(string):
+    """
+    Convert a duration given as [-][[HH:]MM:]SS[.fff] into seconds.
+    """
+
+    string = string.strip()
+
+    sign = 1
+    if string.startswith("-"):
+        sign = -1
+        string = string[1:]
+    elif string.startswith("+"):
+        string = string[1:]
+
+    parts = string.split(":")
+    if len(parts) > 3:
+        raise ValueError("Unknown duration format '%s'!" % string)
+
+    sec = 0.0
+    for part in parts:
+        sec = sec * 60 + float(part)
+
+    return sign * sec
+
+
+def sec2hms(sec):
+    """
+    Convert seconds into a string formatted as HH:MM:SS.ff.
+    """
+
+    sign = ""
+    if sec < 0:
+        sign = "-"
+        sec = -sec
+
+    hours = int(sec // 3600)
+    minutes = int((sec - hours * 3600) // 60)
+    seconds = sec - hours * 3600 - minutes * 60
+
+    return "%s%02d:%02d:%05.2f" % (sign, hours, minutes, seconds)
+
+
+# EOF
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track Readers: Base Class                                                 *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Base class of the track readers and helpers shared by them. A reader parses
+# a file object incrementally and yields the track in chunks of columns, each
+# a dict of equally long float arrays:
+
+#     timestamp   Seconds since 1970-01-01 UTC.
+#     lat, lon    Degrees.
+#     altitude    Unit as given by UNITS (default m).
+#     speed       Unit as given by UNITS (default m/s).
+
+# Missing values are NaN. Columns a format doesn't know may be left out.
+# Chunks hold at most CHUNK_SIZE trackpoints, so readers never keep more than
+# one chunk of the file in memory.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/06
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.calculations.time_conv     import datetime2unix, parseTimestamp
+from lib.Datapoint                  import WP
+from lib.Exceptions                 import *
+
+# Foreign libraries
+import abc
+import numpy                        as np
+
+
+EPOCH64 = np.datetime64("1970-01-01T00:00:00", "us")
+
+
+class AbstractReader(object):
+
+    __metaclass__ = abc.ABCMeta
+
+    NAME = None             # Name used to choose the reader explicitly
+    EXTENSIONS = ()         # File extensions (lower case, with dot)
+    CHUNK_SIZE = 65536      # Trackpoints per chunk
+    UNITS = {"altitude": WP.U_M, "speed": WP.U_MS}
+
+    def __init__(self, chunkSize=None):
+
+        if chunkSize is not None:
+            self.CHUNK_SIZE = chunkSize
+
+
+    @classmethod
+    def sniff(cls, head):
+        """
+        Return True if head (the first bytes of a file) looks like this
+        format.
+        """
+
+        return False
+
+
+    @abc.abstractmethod
+    def chunks(self, f):
+        """
+        Parse file object f (opened in binary mode) and yield dicts of
+        columns.
+        """
+
+        raise AbstractImplementationRequired("chunks()")
+
+
+def joinChunks(chunks):
+    """
+    Concatenate the columns of a list of chunks. Columns missing in a chunk
+    are filled with NaN.
+    """
+
+    fields = set(k for c in chunks for k in c)
+    columns = {}
+    for field in fields:
+        columns[field] = np.concatenate([c[field] if field in c else
+            np.full(len(c['timestamp']), np.nan) for c in chunks])
+
+    return columns
+
+
+def floats(strings):
+    """
+    Convert array of strings into floats. Empty and unparsable strings give
+    NaN.
+    """
+
+    strings = np.asarray(strings)
+    out = np.full(len(strings), np.nan)
+    ok = strings != b""
+
+    try:
+        out[ok] = strings[ok].astype(float)
+    except ValueError:
+        for i in np.flatnonzero(ok):
+            try:
+                out[i] = float(strings[i])
+            except ValueError:
+                pass
+
+    return out
+
+
+def parseTimes(strings):
+    """
+    Convert ISO 8601 points in time in UTC (e.g. '2017-04-07T10:15:00.5Z')
+    into seconds since epoch. Unparsable strings give NaN.
+    """
+
+    strings = [s.strip().rstrip(b"Z") for s in strings]
+
+    try:
+        stamps = np.array(strings, dtype="datetime64[us]")
+        return (stamps - EPOCH64).astype(np.int64) / 1e6
+    except ValueError:
+        pass
+
+    out = np.full(len(strings), np.nan)
+    for i, s in enumerate(strings):
+        dt = parseTimestamp(s.decode("ascii", "replace"))
+        if dt is not None:
+            out[i] = datetime2unix(dt)
+
+    return out
+
+
+# EOF
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track Readers: CSV                                                        *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Reader of CSV exports of EFIS units and flight logging apps. The first line
+# names the columns. Known names (case and blanks ignored) are mapped to
+# fields of the waypoint class, other columns are skipped:
+
+#     timestamp   time, timestamp, datetime, utc, gps time, date + time
+#     lat         lat, latitude
+#     lon         lon, lng, long, longitude
+#     altitude    alt, altitude, ele, elevation, gps alt, msl
+#     speed       speed, gs, groundspeed, ground speed, spd
+
+# A unit may follow the name, e.g. "Altitude (ft)", "alt_ft" or "GS [kt]".
+# Without unit altitudes are taken as m and speeds as m/s. Times are ISO 8601
+# in UTC or seconds (milliseconds if larger than 1e11) since epoch. A date
+# column is joined with the time column. The delimiter (comma, semicolon or
+# tab) is guessed from the header.
+
+# Rows are read in chunks and converted column by column.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/06
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.Datapoint                  import WP
+from lib.readers.BaseReader         import AbstractReader, floats, parseTimes
+
+# Foreign libraries
+from itertools                      import islice
+import csv
+import numpy                        as np
+import re
+
+
+# Column names of the fields.
+ALIASES = {
+    "timestamp" :   ("time", "timestamp", "datetime", "utc", "gpstime",
+                     "utctime", "datetimeutc"),
+    "date"      :   ("date", "utcdate", "gpsdate"),
+    "lat"       :   ("lat", "latitude"),
+    "lon"       :   ("lon", "lng", "long", "longitude"),
+    "altitude"  :   ("alt", "altitude", "ele", "elevation", "gpsalt",
+                     "gpsaltitude", "msl", "altmsl"),
+    "speed"     :   ("speed", "gs", "groundspeed", "spd", "gpsspeed")
+}
+
+# Unit names in column headers.
+UNITS = {
+    "ft"    :   WP.U_FT,    "feet"  :   WP.U_FT,
+    "m"     :   WP.U_M,     "meter" :   WP.U_M,     "meters":   WP.U_M,
+    "kt"    :   WP.U_KT,    "kts"   :   WP.U_KT,    "knots" :   WP.U_KT,
+    "kmh"   :   WP.U_KMH,   "km/h"  :   WP.U_KMH,   "kph"   :   WP.U_KMH,
+    "mph"   :   WP.U_MPH,
+    "ms"    :   WP.U_MS,    "m/s"   :   WP.U_MS,    "mps"   :   WP.U_MS,
+    "hpa"   :   WP.U_HPA,   "mbar"  :   WP.U_HPA,   "inhg"  :   WP.U_INHG,
+    "fpm"   :   WP.U_FTMIN, "ft/min":   WP.U_FTMIN, "deg"   :   WP.U_DEG
+}
+
+DELIMITERS = (b",", b";", b"\t")
+HEADER = re.compile(r"^\s*(.*?)\s*(?:[\(\[]\s*([^\)\]]*?)\s*[\)\]])?\s*$")
+
+
+def splitHeader(name, aliases=ALIASES):
+    """
+    Return tuple (field, unit) of column name. Both are None if unknown.
+    """
+
+    match = HEADER.match(name)
+    base, unit = match.group(1), match.group(2)
+
+    # Unit appended with underscore, e.g. alt_ft.
+    if unit is None and "_" in base:
+        head, tail = base.rsplit("_", 1)
+        if tail.lower() in UNITS:
+            base, unit = head, tail
+
+    key = re.sub(r"[\s_\-\.]", "", base.lower())
+    for field, names in aliases.items():
+        if key in names:
+            return field, UNITS.get((unit or "").lower())
+
+    return None, None
+
+
+class CsvReader(AbstractReader):
+
+    NAME = "csv"
+    EXTENSIONS = (".csv", ".tsv")
+    ALIASES = ALIASES
+
+    def __init__(self, chunkSize=None):
+
+        super(CsvReader, self).__init__(chunkSize)
+
+        self.UNITS = dict(AbstractReader.UNITS)
+
+
+    @classmethod
+    def sniff(cls, head):
+
+        header = head.split(b"\n", 1)[0].decode("ascii", "replace")
+        fields = [splitHeader(n)[0] for n in re.split(r"[,;\t]", header)]
+        return "lat" in fields and "lon" in fields
+
+
+    def chunks(self, f):
+
+        header = f.readline()
+        delimiter = max(DELIMITERS, key=header.count)
+
+        rows = csv.reader(f, delimiter=delimiter)
+        names = next(csv.reader([header], delimiter=delimiter))
+
+        # Column of each field.
+        columns = {}
+        for i, name in enumerate(names):
+            field, unit = splitHeader(name, self.ALIASES)
+            if field is None or field in columns:
+                continue
+            columns[field] = i
+            if unit is not None:
+                self.UNITS[field] = unit
+
+        if "timestamp" not in columns:
+            raise ValueError("CSV file has no time column! Columns: %s" %
+                ", ".join(names))
+
+        width = len(names)
+        pad = [b""] * width
+
+        while True:
+            chunk = list(islice(rows, self.CHUNK_SIZE))
+            if not chunk:
+                break
+
+            m = np.array([(r + pad)[:width] for r in chunk if r])
+            yield self.__columns(m, columns)
+
+
+    def __columns(self, m, columns):
+        """
+        Convert matrix of strings m into columns of the fields.
+        """
+
+        out = {}
+        for field, i in columns.items():
+            if field in ("timestamp", "date"):
+                continue
+            out[field] = floats(m[:, i])
+
+        times = m[:, columns['timestamp']]
+        if "date" in columns:
+            times = np.char.add(np.char.add(
+                np.char.strip(m[:, columns['date']]), b"T"),
+                np.char.strip(times))
+
+        # Numeric times are seconds or milliseconds since epoch, ISO times
+        # have colons. Each cell is read by its own format, so blank or
+        # garbled cells only lose their own row.
+        iso = np.char.count(times, b":") > 0
+        timestamp = np.full(len(times), np.nan)
+        if iso.any():
+            timestamp[iso] = parseTimes(times[iso])
+        if not iso.all():
+            numeric = floats(times[~iso])
+            with np.errstate(invalid="ignore"):
+                numeric[numeric > 1e11] /= 1000.0
+            timestamp[~iso] = numeric
+
+        out['timestamp'] = timestamp
+        return out
+
+
+# EOF
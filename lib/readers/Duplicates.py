@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track Readers: Duplicate Timestamps                                       *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Loggers write several trackpoints with the same timestamp, e.g. when the
+# time has a resolution of seconds but fixes come faster, or when a track is
+# joined from overlapping files. Such trackpoints are merged into one per
+# timestamp. The fields are merged by a policy:
+
+#     last        Last valid value (as the old GPX parser did)
+#     first       First valid value
+#     average     Mean of the valid values
+
+# The columns are sorted by time first (stable, so points of a timestamp
+# keep their order), which costs nothing for the usual sorted track. Groups
+# of equal timestamps are then found and reduced in one pass over each
+# column.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/09
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+import numpy                        as np
+
+
+POLICIES = ("last", "first", "average")
+
+
+def sortColumns(columns):
+    """
+    Return columns sorted by timestamp. Sorted columns are returned as they
+    are.
+    """
+
+    timestamp = columns['timestamp']
+    if np.all(timestamp[1:] >= timestamp[:-1]):
+        return columns
+
+    order = np.argsort(timestamp, kind="mergesort")
+    return dict((k, v[order]) for k, v in columns.items())
+
+
+def collapse(columns, policy="last"):
+    """
+    Merge trackpoints of equal timestamps of sorted columns by policy.
+    Returns the merged columns and the number of trackpoints merged away.
+    """
+
+    if policy not in POLICIES:
+        raise ValueError("Unknown duplicate policy '%s'! Use one of: %s" %
+            (policy, ", ".join(POLICIES)))
+
+    timestamp = columns['timestamp']
+    n = len(timestamp)
+    if n < 2:
+        return columns, 0
+
+    starts = np.flatnonzero(np.concatenate(([True],
+        timestamp[1:] != timestamp[:-1])))
+    merged = n - len(starts)
+    if merged == 0:
+        return columns, 0
+
+    index = np.arange(n)
+    out = {}
+    for k, v in columns.items():
+        valid = np.isfinite(v)
+
+        if policy == "average":
+            total = np.add.reduceat(np.where(valid, v, 0.0), starts)
+            count = np.add.reduceat(valid.astype(int), starts)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[k] = np.where(count > 0, total / count, np.nan)
+            continue
+
+        if policy == "last":
+            pick = np.maximum.reduceat(np.where(valid, index, -1), starts)
+        else:
+            pick = np.minimum.reduceat(np.where(valid, index, n), starts)
+
+        found = (pick >= 0) & (pick < n)
+        out[k] = np.where(found, v[np.clip(pick, 0, n - 1)], np.nan)
+
+    return out, merged
+
+
+# EOF
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track Readers: FIT                                                        *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Reader of Garmin FIT activity files. A FIT file is a stream of definition
+# messages, which describe the layout of a local message type, and data
+# messages of such a layout. Trackpoints are taken from the "record" message
+# (global number 20) with these fields:
+
+#     253     timestamp       s since 1989-12-31 UTC
+#     0, 1    position        semicircles (2^31 = 180 deg)
+#     2, 78   altitude        m * 5 + 500 (78: enhanced)
+#     6, 73   speed           m/s * 1000 (73: enhanced)
+
+# The messages are walked once to find the record messages and their
+# layout. Records of the same layout are then cut out of the file as a byte
+# matrix and decoded at once with a structured dtype. Compressed timestamp
+# headers and chained FIT files are supported, developer fields are skipped.
+# CRCs are not verified.
+
+# FIT files are compact (about 30 bytes per trackpoint), so the data of a
+# file is read at once and yielded in chunks.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/06
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.readers.BaseReader         import AbstractReader
+
+# Foreign libraries
+import numpy                        as np
+import struct
+
+
+FIT_EPOCH = 631065600       # 1989-12-31 00:00 UTC in unix time
+SEMICIRCLE = 180.0 / 2 ** 31
+MESG_RECORD = 20
+FIELD_TIMESTAMP = 253
+
+# Base types: numpy type and whether 0 marks invalid values (else the
+# maximum does).
+BASE_TYPES = {
+    0x00: ("u1", False), 0x01: ("i1", False), 0x02: ("u1", False),
+    0x83: ("i2", False), 0x84: ("u2", False), 0x85: ("i4", False),
+    0x86: ("u4", False), 0x88: ("f4", False), 0x89: ("f8", False),
+    0x0A: ("u1", True),  0x0D: ("u1", False), 0x8B: ("u2", True),
+    0x8C: ("u4", True),  0x8E: ("i8", False), 0x8F: ("u8", False),
+    0x90: ("u8", True)
+}
+
+# Record fields: column, scale and offset.
+FIELDS = {
+    0   :   ("lat", SEMICIRCLE, 0.0),
+    1   :   ("lon", SEMICIRCLE, 0.0),
+    2   :   ("altitude", 0.2, -500.0),
+    6   :   ("speed", 0.001, 0.0),
+    73  :   ("speed", 0.001, 0.0),          # Enhanced speed
+    78  :   ("altitude", 0.2, -500.0),      # Enhanced altitude
+    253 :   ("timestamp", 1.0, FIT_EPOCH)
+}
+
+
+class Definition(object):
+    """
+    Layout of a local message type.
+    """
+
+    def __init__(self, mesg, endian, fields, size):
+
+        self.mesg = mesg        # Global message number
+        self.endian = endian    # "<" or ">"
+        self.fields = fields    # List of (number, offset, size, base type)
+        self.size = size        # Bytes of a data message without header
+
+        self.tsOffset = None
+        for number, offset, length, base in fields:
+            if number == FIELD_TIMESTAMP and length == 4:
+                self.tsOffset = offset
+
+
+    def dtype(self):
+        """
+        Structured dtype of the record fields known to the reader.
+        """
+
+        names, formats, offsets = [], [], []
+        for number, offset, length, base in self.fields:
+            if number not in FIELDS or base not in BASE_TYPES:
+                continue
+            fmt = self.endian + BASE_TYPES[base][0]
+            if np.dtype(fmt).itemsize != length:
+                continue
+            names.append("f%d" % number)
+            formats.append(fmt)
+            offsets.append(offset)
+
+        return np.dtype({"names": names, "formats": formats,
+                         "offsets": offsets, "itemsize": self.size})
+
+
+class FitReader(AbstractReader):
+
+    NAME = "fit"
+    EXTENSIONS = (".fit",)
+
+    @classmethod
+    def sniff(cls, head):
+
+        return len(head) >= 12 and head[8:12] == b".FIT"
+
+
+    def chunks(self, f):
+
+        while True:
+            header = f.read(1)
+            if not header:
+                break
+
+            size = ord(header)
+            header += f.read(size - 1)
+            if size < 12 or header[8:12] != b".FIT":
+                raise ValueError("Not a FIT file!")
+
+            length = struct.unpack("<I", header[4:8])[0]
+            data = f.read(length)
+            f.read(2)       # CRC
+
+            columns = self.__decode(data)
+            for start in range(0, len(columns['timestamp']), self.CHUNK_SIZE):
+                yield dict((k, v[start:start + self.CHUNK_SIZE])
+                           for k, v in columns.items())
+
+
+    def __decode(self, data):
+        """
+        Decode the record messages of the data of a FIT file.
+        """
+
+        definitions = {}
+        records = {}            # Definition: list of data offsets
+        compressed = {}         # Definition: list of compressed timestamps
+        lastTime = None
+        pos = 0
+        end = len(data)
+
+        while pos < end:
+            header = ord(data[pos:pos + 1])
+            pos += 1
+
+            # Compressed timestamp header.
+            if header & 0x80:
+                local = (header >> 5) & 0x03
+                offset = header & 0x1F
+                timestamp = None
+                if lastTime is not None:
+                    timestamp = (lastTime & ~0x1F) + offset
+                    if offset < lastTime & 0x1F:
+                        timestamp += 0x20
+                    lastTime = timestamp
+                definition = definitions[local]
+                if definition.mesg == MESG_RECORD:
+                    records.setdefault(definition, []).append(pos)
+                    compressed.setdefault(definition, []).append(
+                        np.nan if timestamp is None else timestamp)
+                pos += definition.size
+                continue
+
+            local = header & 0x0F
+
+            # Definition message.
+            if header & 0x40:
+                endian = ">" if ord(data[pos + 1:pos + 2]) else "<"
+                mesg, count = struct.unpack(endian + "HB",
+                                            data[pos + 2:pos + 5])
+                pos += 5
+
+                fields = []
+                offset = 0
+                for i in range(count):
+                    number, length, base = struct.unpack("BBB",
+                        data[pos:pos + 3])
+                    fields.append((number, offset, length, base))
+                    offset += length
+                    pos += 3
+
+                # Developer fields are only skipped.
+                if header & 0x20:
+                    count = ord(data[pos:pos + 1])
+                    pos += 1
+                    for i in range(count):
+                        offset += ord(data[pos + 1:pos + 2])
+                        pos += 3
+
+                definitions[local] = Definition(mesg, endian, fields, offset)
+                continue
+
+            # Data message.
+            definition = definitions[local]
+            if definition.tsOffset is not None:
+                timestamp = struct.unpack(definition.endian + "I",
+                    data[pos + definition.tsOffset:
+                         pos + definition.tsOffset + 4])[0]
+                if timestamp != 0xFFFFFFFF:
+                    lastTime = timestamp
+            if definition.mesg == MESG_RECORD:
+                records.setdefault(definition, []).append(pos)
+                compressed.setdefault(definition, []).append(np.nan)
+            pos += definition.size
+
+        return self.__columns(data, records, compressed)
+
+
+    def __columns(self, data, records, compressed):
+        """
+        Cut the record messages out of data and convert them into columns.
+        """
+
+        buf = np.frombuffer(data, dtype=np.uint8)
+        order = []
+        parts = dict((k, []) for k in ("timestamp", "lat", "lon",
+                                       "altitude", "speed"))
+
+        for definition, offsets in records.items():
+            offsets = np.array(offsets)
+            n = len(offsets)
+            raw = buf[offsets[:, None] + np.arange(definition.size)]
+            values = raw.view(definition.dtype()).reshape(n)
+            order.append(offsets)
+
+            cols = dict((k, np.full(n, np.nan)) for k in parts)
+            bases = dict((f[0], f[3]) for f in definition.fields)
+
+            # Enhanced fields come last and overwrite the plain ones.
+            for number in sorted(FIELDS):
+                name = "f%d" % number
+                if name not in values.dtype.names:
+                    continue
+                column, scale, offset = FIELDS[number]
+                v = values[name].astype(float)
+                stored = values[name]
+                if stored.dtype.kind == "f":
+                    invalid = ~np.isfinite(stored)
+                elif BASE_TYPES[bases[number]][1]:
+                    invalid = stored == 0
+                else:
+                    invalid = stored == np.iinfo(stored.dtype).max
+                v = v * scale + offset
+                cols[column] = np.where(invalid, cols[column], v)
+
+            stamps = np.array(compressed[definition]) + FIT_EPOCH
+            cols['timestamp'] = np.where(np.isnan(stamps), cols['timestamp'],
+                                         stamps)
+
+            for k in parts:
+                parts[k].append(cols[k])
+
+        if not order:
+            return dict((k, np.zeros(0)) for k in parts)
+
+        # Back into file order.
+        index = np.argsort(np.concatenate(order), kind="mergesort")
+        return dict((k, np.concatenate(v)[index]) for k, v in parts.items())
+
+
+# EOF
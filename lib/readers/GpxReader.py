@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track Readers: GPX                                                        *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Reader of GPX 1.0 and 1.1 files. The file is parsed incrementally and each
+# trackpoint is dropped from the document as soon as it was read. Speeds are
+# taken from <speed> of GPX 1.0 (as written by SkyDemon even into files
+# marked as 1.1) or from a <speed> inside <extensions>.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/06
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.readers.BaseReader         import AbstractReader, floats, parseTimes
+
+# Foreign libraries
+import numpy                        as np
+
+try:
+    import xml.etree.cElementTree   as ElementTree
+except ImportError:
+    import xml.etree.ElementTree    as ElementTree
+
+
+def localName(tag):
+    """
+    Strip the namespace from tag.
+    """
+
+    return tag.rsplit("}", 1)[-1]
+
+
+class GpxReader(AbstractReader):
+
+    NAME = "gpx"
+    EXTENSIONS = (".gpx",)
+
+    @classmethod
+    def sniff(cls, head):
+
+        return b"<gpx" in head
+
+
+    def chunks(self, f):
+
+        try:
+            for columns in self.__parse(f):
+                yield columns
+        except SyntaxError, e:      # ElementTree.ParseError
+            raise ValueError("Malformed GPX file: %s" % e)
+
+
+    def __parse(self, f):
+        """
+        Yield columns of the trackpoints of file object f.
+        """
+
+        parent = None
+        rows = []
+
+        for event, elem in ElementTree.iterparse(f, events=("start", "end")):
+            tag = localName(elem.tag)
+
+            if event == "start":
+                if tag == "trkseg":
+                    parent = elem
+                continue
+
+            if tag != "trkpt":
+                continue
+
+            row = [elem.get("lat"), elem.get("lon"), None, None, None]
+            for child in elem.iter():
+                name = localName(child.tag)
+                if name == "ele":
+                    row[2] = child.text
+                elif name == "time":
+                    row[3] = child.text
+                elif name == "speed":
+                    row[4] = child.text
+            rows.append(row)
+
+            # Drop the trackpoint from the document.
+            elem.clear()
+            if parent is not None:
+                parent.clear()
+
+            if len(rows) >= self.CHUNK_SIZE:
+                yield self.__columns(rows)
+                rows = []
+
+        if rows:
+            yield self.__columns(rows)
+
+
+    def __columns(self, rows):
+        """
+        Convert rows of strings (lat, lon, ele, time, speed) into columns.
+        """
+
+        cols = np.array([[(v or b"").strip() for v in row] for row in rows])
+
+        return {
+            "timestamp" :   parseTimes(cols[:, 3]),
+            "lat"       :   floats(cols[:, 0]),
+            "lon"       :   floats(cols[:, 1]),
+            "altitude"  :   floats(cols[:, 2]),
+            "speed"     :   floats(cols[:, 4])
+        }
+
+
+# EOF
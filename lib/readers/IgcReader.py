@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track Readers: IGC                                                        *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Reader of IGC flight recorder files as written by gliders. Fixes are taken
+# from the B records, the date from the HFDTE header record:
+
+#     B HHMMSS DDMMmmmN DDDMMmmmE V PPPPP GGGGG ...
+#       time   latitude longitude  | |     GNSS altitude (m)
+#                                  | pressure altitude (m)
+#                                  validity (A: 3D fix, V: 2D fix)
+
+# B records have fixed columns, so a chunk of them is decoded at once from
+# a byte matrix. The GNSS altitude is used where the fix is valid, otherwise
+# the pressure altitude. IGC has no speed, it is left missing and derived
+# from the fixes by the gap stage (calculations.gaps).
+# Times passing midnight continue on the next day.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/06
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.readers.BaseReader         import AbstractReader
+
+# Foreign libraries
+from datetime                       import datetime
+import logging                      as log
+import numpy                        as np
+import re
+
+
+B_LENGTH = 35               # Columns of a B record used
+DATE = re.compile(br"^HFDTE(?:DATE:)?\s*(\d{2})(\d{2})(\d{2})")
+
+
+def number(raw, start, end):
+    """
+    Decode the decimal digits in columns start to end of byte matrix raw. A
+    leading minus sign is allowed.
+    """
+
+    digits = raw[:, start:end].astype(np.int64) - ord("0")
+    negative = digits[:, 0] == ord("-") - ord("0")
+    digits[negative, 0] = 0
+
+    weights = 10 ** np.arange(end - start - 1, -1, -1, dtype=np.int64)
+    value = digits.dot(weights)
+    value[negative] *= -1
+    return value
+
+
+class IgcReader(AbstractReader):
+
+    NAME = "igc"
+    EXTENSIONS = (".igc",)
+
+    @classmethod
+    def sniff(cls, head):
+
+        return head[:1] == b"A" and b"\nHF" in head
+
+
+    def chunks(self, f):
+
+        day = 0.0           # Unix time of 00:00 of the current day
+        lastTime = None     # Seconds of day of the last fix
+        records = []
+
+        for line in f:
+            if line[:1] == b"B" and len(line) >= B_LENGTH:
+                records.append(line[:B_LENGTH])
+                if len(records) >= self.CHUNK_SIZE:
+                    columns, day, lastTime = self.__columns(records, day,
+                        lastTime)
+                    yield columns
+                    records = []
+
+            elif line[:5] == b"HFDTE":
+                match = DATE.match(line)
+                if match:
+                    d, m, y = [int(v) for v in match.groups()]
+                    date = datetime(2000 + y if y < 80 else 1900 + y, m, d)
+                    day = (date - datetime(1970, 1, 1)).total_seconds()
+
+        if not day:
+            log.warning("IGC file has no date (HFDTE). Assuming 1970-01-01.")
+
+        if records:
+            columns, day, lastTime = self.__columns(records, day, lastTime)
+            yield columns
+
+
+    def __columns(self, records, day, lastTime):
+        """
+        Decode B records. Returns the columns and the state passed on to the
+        next chunk.
+        """
+
+        raw = np.frombuffer(b"".join(records), dtype=np.uint8) \
+            .reshape(-1, B_LENGTH)
+
+        seconds = number(raw, 1, 3) * 3600 + number(raw, 3, 5) * 60 + \
+            number(raw, 5, 7)
+
+        # Days passed at midnight.
+        previous = np.concatenate(([seconds[0] if lastTime is None
+                                    else lastTime], seconds[:-1]))
+        days = np.cumsum(seconds < previous - 43200)
+        timestamp = day + days * 86400.0 + seconds
+        day += days[-1] * 86400.0
+
+        lat = number(raw, 7, 9) + number(raw, 9, 14) / 60000.0
+        lat[raw[:, 14] == ord("S")] *= -1
+        lon = number(raw, 15, 18) + number(raw, 18, 23) / 60000.0
+        lon[raw[:, 23] == ord("W")] *= -1
+
+        pressure = number(raw, 25, 30).astype(float)
+        gnss = number(raw, 30, 35).astype(float)
+        valid = (raw[:, 24] == ord("A")) & (gnss != 0)
+        altitude = np.where(valid, gnss, pressure)
+
+        columns = {
+            "timestamp" :   timestamp,
+            "lat"       :   lat,
+            "lon"       :   lon,
+            "altitude"  :   altitude
+        }
+
+        return columns, day, seconds[-1]
+
+
+# EOF
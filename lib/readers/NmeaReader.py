@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track Readers: NMEA 0183                                                  *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Reader of raw NMEA 0183 logs as recorded from panel mount GPS. These
+# sentences of any talker (GP, GN, ...) are used:
+
+#     RMC     Time, date, status, position, speed over ground (kt)
+#     GGA     Time, position, fix quality, altitude above MSL (m)
+#     VTG     Speed over ground (kt, km/h), no time
+
+# A GPS sends one sentence of each type per fix. The sentences of a fix
+# (epoch) are found by their time of day, VTG belongs to the fix of the
+# sentence before it. Per epoch the position and speed of RMC are used and
+# the altitude of GGA. GGA positions and VTG speeds fill in where RMC has
+# none. Fixes marked invalid (RMC status V, GGA quality 0) are dropped.
+
+# Lines are read in chunks. Sentences of one type are split into a matrix of
+# fields and converted column by column. The last epoch of a chunk is carried
+# over to the next one as its sentences may continue there. Epochs before the
+# first RMC get its date, times passing midnight continue on the next day.
+# Checksums are not verified, malformed sentences are skipped.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/06
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.Datapoint                  import WP
+from lib.readers.BaseReader         import AbstractReader, floats
+
+# Foreign libraries
+from itertools                      import islice
+import logging                      as log
+import numpy                        as np
+import re
+
+
+SENTENCE = re.compile(br"^\$[A-Z]{2}(RMC|GGA|VTG),", re.M)
+KINDS = {b"RMC": 0, b"GGA": 1, b"VTG": 2}
+FIELDS = {0: 10, 1: 10, 2: 8}   # Fields used per kind
+
+
+def fieldMatrix(lines, count):
+    """
+    Split sentences into a matrix of count fields. The checksum is cut off
+    and missing fields are empty.
+    """
+
+    pad = [b""] * count
+    return np.array([(l.split(b"*", 1)[0].rstrip().split(b",") + pad)[:count]
+                     for l in lines])
+
+
+def coordinate(values, hemisphere, negative):
+    """
+    Convert NMEA coordinates (D)DDMM.mmmm into degrees. Values in the
+    negative hemisphere (S or W) get a negative sign.
+    """
+
+    v = floats(values)
+    deg = np.floor(v / 100)
+    v = deg + (v - deg * 100) / 60.0
+    v[hemisphere == negative] *= -1
+    return v
+
+
+def timeOfDay(values):
+    """
+    Convert NMEA times HHMMSS(.ss) into seconds of the day.
+    """
+
+    v = floats(values)
+    h = np.floor(v / 10000)
+    m = np.floor((v - h * 10000) / 100)
+    return h * 3600 + m * 60 + (v - h * 10000 - m * 100)
+
+
+class NmeaReader(AbstractReader):
+
+    NAME = "nmea"
+    EXTENSIONS = (".nmea", ".nma")
+    UNITS = {"altitude": WP.U_M, "speed": WP.U_KT}
+
+    @classmethod
+    def sniff(cls, head):
+
+        return SENTENCE.search(head) is not None
+
+
+    def chunks(self, f):
+
+        # State carried from chunk to chunk.
+        self._Day = None        # Unix time of 00:00 of the current date
+        self._LastTime = None   # Unix time of the last epoch
+        carry = []
+
+        # About three sentences per fix.
+        size = self.CHUNK_SIZE * 3
+
+        while True:
+            lines = carry + list(islice(f, size))
+            if len(lines) == len(carry):
+                lines = carry
+                final = True
+            else:
+                final = False
+
+            if not lines:
+                break
+
+            columns, carry = self.__columns(lines, final)
+            if columns is not None:
+                yield columns
+
+            if final:
+                break
+
+        if self._Day is None:
+            log.warning("NMEA log has no RMC sentences with a date. "
+                "Assuming 1970-01-01.")
+
+
+    def __columns(self, lines, final):
+        """
+        Merge the sentences of lines into one trackpoint per epoch. Unless
+        final is set, the lines of the last epoch are returned to be parsed
+        again with the next chunk.
+        """
+
+        # Sentences used and their kind.
+        used = [l for l in lines if l[:1] == b"$" and l[3:6] in KINDS]
+        if not used:
+            return None, []
+        kind = np.array([KINDS[l[3:6]] for l in used])
+
+        # Time of day of each sentence. VTG takes that of the one before.
+        tod = np.full(len(used), np.nan)
+        timed = np.flatnonzero(kind != 2)
+        tod[timed] = timeOfDay(np.array([l.split(b",", 2)[1]
+                                         for l in (used[i] for i in timed)]))
+
+        index = np.maximum.accumulate(np.where(np.isfinite(tod),
+                                               np.arange(len(tod)), 0))
+        tod = tod[index]
+
+        # A new epoch starts whenever the time of day changes.
+        change = np.concatenate(([True], tod[1:] != tod[:-1]))
+        epoch = np.cumsum(change) - 1
+
+        # Keep the last epoch for the next chunk.
+        if not final:
+            last = np.flatnonzero(epoch == epoch[-1])[0]
+            if last == 0:
+                # The whole chunk is a single epoch.
+                return None, used
+            carry = used[last:]
+            used = used[:last]
+            kind = kind[:last]
+            epoch = epoch[:last]
+            tod = tod[:last]
+        else:
+            carry = []
+
+        count = epoch[-1] + 1
+        epochTod = tod[change[:len(tod)]]
+        date = np.full(count, np.nan)
+        lat = np.full(count, np.nan)
+        lon = np.full(count, np.nan)
+        altitude = np.full(count, np.nan)
+        speed = np.full(count, np.nan)
+
+        # VTG: speed over ground in kt or km/h.
+        r = np.flatnonzero(kind == 2)
+        if len(r):
+            m = fieldMatrix([used[i] for i in r], FIELDS[2])
+            kt = floats(m[:, 5])
+            kmh = floats(m[:, 7]) / 1.852
+            speed[epoch[r]] = np.where(np.isfinite(kt), kt, kmh)
+
+        # GGA: altitude and position.
+        r = np.flatnonzero(kind == 1)
+        if len(r):
+            m = fieldMatrix([used[i] for i in r], FIELDS[1])
+            ok = (m[:, 6] != b"") & (m[:, 6] != b"0")
+            e = epoch[r][ok]
+            m = m[ok]
+            lat[e] = coordinate(m[:, 2], m[:, 3], b"S")
+            lon[e] = coordinate(m[:, 4], m[:, 5], b"W")
+            altitude[e] = floats(m[:, 9])
+
+        # RMC: date, position and speed. Void fixes drop the epoch.
+        valid = np.ones(count, dtype=bool)
+        r = np.flatnonzero(kind == 0)
+        if len(r):
+            m = fieldMatrix([used[i] for i in r], FIELDS[0])
+            e = epoch[r]
+            void = m[:, 2] != b"A"
+            valid[e[void]] = False
+            e = e[~void]
+            m = m[~void]
+
+            rmcLat = coordinate(m[:, 3], m[:, 4], b"S")
+            rmcLon = coordinate(m[:, 5], m[:, 6], b"W")
+            rmcSpeed = floats(m[:, 7])
+            lat[e] = np.where(np.isfinite(rmcLat), rmcLat, lat[e])
+            lon[e] = np.where(np.isfinite(rmcLon), rmcLon, lon[e])
+            speed[e] = np.where(np.isfinite(rmcSpeed), rmcSpeed, speed[e])
+            date[e] = self.__dates(m[:, 9])
+
+        # Date of epochs without RMC from the epoch before or after them.
+        known = np.isfinite(date)
+        if known.any():
+            if self._Day is None:
+                self._Day = date[np.flatnonzero(known)[0]]
+            index = np.maximum.accumulate(np.where(known,
+                np.arange(count), -1))
+            date = np.where(index >= 0, date[np.maximum(index, 0)], self._Day)
+        else:
+            date[:] = self._Day if self._Day is not None else 0.0
+
+        timestamp = date + epochTod
+
+        # Continue on the next day where time of day jumps back.
+        previous = np.concatenate(([timestamp[0] if self._LastTime is None
+                                    else self._LastTime], timestamp[:-1]))
+        timestamp += np.cumsum(timestamp < previous - 43200) * 86400.0
+
+        self._Day = timestamp[-1] - epochTod[-1]
+        self._LastTime = timestamp[-1]
+
+        keep = valid & np.isfinite(lat) & np.isfinite(lon) & \
+            np.isfinite(timestamp)
+
+        columns = {
+            "timestamp" :   timestamp[keep],
+            "lat"       :   lat[keep],
+            "lon"       :   lon[keep],
+            "altitude"  :   altitude[keep],
+            "speed"     :   speed[keep]
+        }
+
+        return columns, carry
+
+
+    def __dates(self, values):
+        """
+        Convert NMEA dates DDMMYY into the unix time of 00:00 of that day.
+        """
+
+        v = floats(values)
+        d = np.floor(v / 10000)
+        m = np.floor((v - d * 10000) / 100)
+        y = v - d * 10000 - m * 100
+        y = np.where(y < 80, 2000 + y, 1900 + y)
+
+        ok = np.isfinite(v) & (m >= 1) & (m <= 12) & (d >= 1)
+        out = np.full(len(v), np.nan)
+        if ok.any():
+            months = (y[ok] - 1970).astype(np.int64).astype("datetime64[Y]") \
+                .astype("datetime64[M]") + \
+                (m[ok] - 1).astype(np.int64).astype("timedelta64[M]")
+            days = months.astype("datetime64[D]") + \
+                (d[ok] - 1).astype(np.int64).astype("timedelta64[D]")
+            out[ok] = days.astype(np.int64) * 86400.0
+
+        return out
+
+
+# EOF
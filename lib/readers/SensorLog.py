@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track Readers: Sensor Logs                                                *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Reader and merge of sensor logs of AHRS, EFIS or engine monitors. Such a
+# log holds data the GPS doesn't know (pitch, roll, QNH, wind, RPM), usually
+# at a higher rate than the track. A CSV log needs a time column and at least
+# one of these columns (unit suffixes as for track CSVs, compression as for
+# tracks):
+
+#     pitch       pitch, pitch angle
+#     roll        roll, bank, roll angle, bank angle
+#     qnh         qnh, baro, altimeter, altimeter setting
+#     windDir     wind dir, wind direction, wdir
+#     windSpd     wind spd, wind speed, wspd
+#     rpm         rpm, engine rpm, rpm1
+
+# Without unit angles are taken as deg, QNH as hPa and wind speed as kt.
+
+# alignColumns() matches the samples to the timestamps of the track. Both are
+# sorted, so for every trackpoint the samples before and after it are found
+# by a binary search over the whole column at once. A trackpoint gets the
+# value of the previous sample, the nearest one or the linear interpolation
+# of both. Trackpoints farther than the tolerance from any sample get none.
+# Wind directions are interpolated on the circle. offset is added to the
+# clock of the log to correct the difference to the GPS.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/08
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.readers.BaseReader         import joinChunks
+from lib.readers.CsvReader          import ALIASES, CsvReader, splitHeader
+from lib.readers.Duplicates         import sortColumns
+from lib.readers.Stream             import openStream
+
+# Foreign libraries
+import numpy                        as np
+import re
+
+
+SENSOR_FIELDS = ("pitch", "roll", "qnh", "windDir", "windSpd", "rpm")
+CIRCULAR = ("windDir",)
+INTERPOLATIONS = ("linear", "nearest", "previous")
+
+SENSOR_ALIASES = dict(ALIASES)
+SENSOR_ALIASES.update({
+    "pitch"     :   ("pitch", "pitchangle"),
+    "roll"      :   ("roll", "bank", "rollangle", "bankangle"),
+    "qnh"       :   ("qnh", "baro", "altimeter", "altimetersetting"),
+    "windDir"   :   ("winddir", "winddirection", "wdir"),
+    "windSpd"   :   ("windspd", "windspeed", "wspd"),
+    "rpm"       :   ("rpm", "enginerpm", "rpm1")
+})
+
+
+class SensorCsvReader(CsvReader):
+
+    NAME = "sensor-csv"
+    ALIASES = SENSOR_ALIASES
+
+    @classmethod
+    def sniff(cls, head):
+
+        header = head.split(b"\n", 1)[0].decode("ascii", "replace")
+        fields = [splitHeader(n, SENSOR_ALIASES)[0]
+                  for n in re.split(r"[,;\t]", header)]
+        return "timestamp" in fields and \
+            any(f in fields for f in SENSOR_FIELDS)
+
+
+SENSOR_READERS = [SensorCsvReader]
+
+
+def readSensorLog(path, name=None):
+    """
+    Read the sensor log at path. name forces a reader. Returns the columns
+    sorted by time and their units.
+    """
+
+    f, inner = openStream(path)
+    with f:
+        head = f.peek(4096)[:4096]
+
+        reader = None
+        for r in SENSOR_READERS:
+            if r.NAME == name or (name is None and r.sniff(head)):
+                reader = r()
+                break
+        if reader is None:
+            raise ValueError("Unknown sensor log format of '%s'!" % path)
+
+        chunks = list(reader.chunks(f))
+
+    fields = set(k for c in chunks for k in c) & set(SENSOR_FIELDS)
+    if not chunks or not fields:
+        raise ValueError("No sensor data found in '%s'!" % path)
+
+    # Logs of several devices may be joined out of order.
+    columns = dict((k, v) for k, v in joinChunks(chunks).items()
+                   if k in fields or k == "timestamp")
+
+    # Samples without time can't be merged.
+    timed = np.isfinite(columns['timestamp'])
+    if not timed.all():
+        columns = dict((k, v[timed]) for k, v in columns.items())
+    columns = sortColumns(columns)
+
+    units = dict((k, v) for k, v in reader.UNITS.items() if k in fields)
+    return columns, units
+
+
+def alignColumns(track, columns, tolerance=1.0, offset=0.0,
+                 interpolation="linear"):
+    """
+    Resample the sensor columns at the sorted timestamps track. Returns a
+    dict of arrays as long as track, NaN where no sample is within tolerance
+    seconds.
+    """
+
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError("Unknown interpolation '%s'! Use one of: %s" %
+            (interpolation, ", ".join(INTERPOLATIONS)))
+
+    track = np.asarray(track, dtype=float)
+    times = columns['timestamp'] + offset
+    aligned = {}
+
+    for field, values in columns.items():
+        if field == "timestamp":
+            continue
+
+        ok = np.isfinite(values) & np.isfinite(times)
+        t = times[ok]
+        v = values[ok]
+        out = np.full(len(track), np.nan)
+        if len(t) == 0:
+            aligned[field] = out
+            continue
+
+        # Samples before and after each trackpoint.
+        after = np.searchsorted(t, track)
+        before = np.maximum(after - 1, 0)
+        last = np.minimum(after, len(t) - 1)
+        gapBefore = np.where(after > 0, track - t[before], np.inf)
+        gapAfter = np.where(after < len(t), t[last] - track, np.inf)
+
+        if interpolation == "previous":
+            held = np.searchsorted(t, track, side="right") - 1
+            out = v[np.maximum(held, 0)]
+            gap = np.where(held >= 0, track - t[np.maximum(held, 0)], np.inf)
+        elif interpolation == "nearest":
+            out = np.where(gapAfter < gapBefore, v[last], v[before])
+            gap = np.minimum(gapBefore, gapAfter)
+        elif field in CIRCULAR:
+            rad = np.radians(v)
+            out = np.degrees(np.arctan2(np.interp(track, t, np.sin(rad)),
+                                        np.interp(track, t, np.cos(rad))))
+            out %= 360.0
+            gap = np.minimum(gapBefore, gapAfter)
+        else:
+            out = np.interp(track, t, v)
+            gap = np.minimum(gapBefore, gapAfter)
+
+        aligned[field] = np.where(gap <= tolerance, out, np.nan)
+
+    return aligned
+
+
+# EOF
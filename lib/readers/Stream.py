@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track Readers: Input Streams                                              *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Opens the input of the readers. Besides plain files these are read:
+
+#     -           Standard input
+#     .gz         gzip
+#     .bz2        bzip2
+#     .xz         xz (needs the lzma module, on Python 2 backports.lzma)
+#     .zip        First track file of the archive (not from standard input)
+
+# Compressed input is recognised by its first bytes, so piped archives work
+# as well. It is decompressed block by block while the reader consumes it,
+# nothing is written to temporary files. Concatenated gzip, bzip2 and xz
+# streams are read one after another.
+
+# Streams are buffered readers, so readers can iterate lines and the format
+# can be sniffed with peek() without consuming the head.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/05/08
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Foreign libraries
+import bz2
+import io
+import os
+import sys
+import zipfile
+import zlib
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+
+ERRORS = (zlib.error, IOError) + \
+    ((lzma.LZMAError,) if lzma is not None else ())
+
+BLOCK_SIZE = 1 << 16        # Bytes read from the source at once
+STDIN = "-"
+
+MAGIC = (
+    (b"\x1f\x8b", "gz"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"PK\x03\x04", "zip")
+)
+EXTENSIONS = (".gz", ".bz2", ".xz", ".zip")
+
+
+def decompressor(kind):
+    """
+    Return a new decompressor object of kind.
+    """
+
+    if kind == "gz":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if kind == "bz2":
+        return bz2.BZ2Decompressor()
+    if lzma is None:
+        raise ValueError("Reading xz files needs the lzma module "
+            "(backports.lzma on Python 2)!")
+    return lzma.LZMADecompressor()
+
+
+class DecompressedIO(io.RawIOBase):
+    """
+    Raw stream decompressing the blocks read from file object source.
+    """
+
+    def __init__(self, source, kind, closeSource=True):
+
+        self.__source = source
+        self.__kind = kind
+        self.__closeSource = closeSource
+        self.__decompressor = decompressor(kind)
+        self.__pending = b""
+
+
+    def readable(self):
+
+        return True
+
+
+    def readinto(self, b):
+
+        while not self.__pending:
+            block = self.__nextBlock()
+            if block is None:
+                return 0
+            self.__pending = block
+
+        n = min(len(b), len(self.__pending))
+        b[:n] = self.__pending[:n]
+        self.__pending = self.__pending[n:]
+        return n
+
+
+    def close(self):
+
+        if not self.closed and self.__closeSource:
+            self.__source.close()
+        super(DecompressedIO, self).close()
+
+
+    def __nextBlock(self):
+        """
+        Return the next decompressed block or None at the end.
+        """
+
+        while True:
+            data = self.__source.read(BLOCK_SIZE)
+            if not data:
+                return None
+
+            out = b""
+            while data:
+                try:
+                    out += self.__decompressor.decompress(data)
+                except EOFError:
+                    # Data after the end of a bz2 or xz stream.
+                    self.__decompressor = decompressor(self.__kind)
+                    continue
+                except ERRORS, e:
+                    raise ValueError("Corrupt %s input: %s" % (self.__kind, e))
+
+                # Next stream of concatenated files.
+                data = getattr(self.__decompressor, "unused_data", b"")
+                if data:
+                    self.__decompressor = decompressor(self.__kind)
+
+            if out:
+                return out
+
+
+class MemberIO(io.RawIOBase):
+    """
+    Raw stream of a member of a zip archive.
+    """
+
+    def __init__(self, archive, name):
+
+        self.__archive = archive
+        self.__member = archive.open(name)
+
+
+    def readable(self):
+
+        return True
+
+
+    def readinto(self, b):
+
+        data = self.__member.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+    def close(self):
+
+        if not self.closed:
+            self.__member.close()
+            self.__archive.close()
+        super(MemberIO, self).close()
+
+
+def compression(head):
+    """
+    Return the compression of a file with first bytes head or None.
+    """
+
+    for magic, kind in MAGIC:
+        if head.startswith(magic):
+            return kind
+
+    return None
+
+
+def stripCompression(path):
+    """
+    Return path without its compression extension.
+    """
+
+    root, ext = os.path.splitext(path)
+    if ext.lower() in EXTENSIONS:
+        return root
+    return path
+
+
+def openStream(path, select=None):
+    """
+    Open path (STDIN for standard input) for reading. select picks the
+    member of a zip archive from the list of names, default is the first
+    one. Returns the buffered stream and the name of the file inside any
+    compression, which tells its format.
+    """
+
+    if path == STDIN:
+        f = io.open(sys.stdin.fileno(), "rb", closefd=False)
+        name = ""
+    else:
+        f = io.open(path, "rb")
+        name = path
+
+    kind = compression(f.peek(8)[:8])
+    if kind is None:
+        return f, name
+
+    if kind == "zip":
+        if path == STDIN:
+            raise ValueError("Zip archives can't be read from standard "
+                "input!")
+        f.close()
+        archive = zipfile.ZipFile(path)
+        names = [n for n in archive.namelist() if not n.endswith("/")]
+        if not names:
+            archive.close()
+            raise ValueError("Zip archive '%s' is empty!" % path)
+        member = select(names) if select is not None else names[0]
+        raw = MemberIO(archive, member)
+        name = member
+    else:
+        raw = DecompressedIO(f, kind, closeSource=(path != STDIN))
+        name = stripCompression(name)
+
+    return io.BufferedReader(raw, BLOCK_SIZE), name
+
+
+# EOF
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Track Readers                                                             *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Registry of the track readers. readTrack() picks the reader of a file and
+# feeds its chunks into a waypoint instance. The reader is chosen by name
+# (--track-format), by the file extension or, if both fail, by sniffing the
+# first bytes of the file. New formats are added by subclassing
+# AbstractReader and passing the class to register().
+
+# Files may be compressed (gzip, bzip2, xz, zip) or piped to standard input,
+# see Stream.
+
+# Trackpoints with the same timestamp are merged into one, see Duplicates.
+
+
+# TODO
+# ====
+
+# -
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.2
+# Date:     2017/05/08
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+# 0.2:  - Compressed files and standard input.
+#       - Duplicate timestamps merged over the whole track by a policy.
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.readers.BaseReader         import AbstractReader, joinChunks
+from lib.readers.CsvReader          import CsvReader
+from lib.readers.Duplicates         import collapse, sortColumns
+from lib.readers.FitReader          import FitReader
+from lib.readers.GpxReader          import GpxReader
+from lib.readers.IgcReader          import IgcReader
+from lib.readers.NmeaReader         import NmeaReader
+from lib.readers.Stream             import openStream, stripCompression
+
+# Foreign libraries
+import logging                      as log
+import numpy                        as np
+import os
+
+
+HEAD_SIZE = 4096            # Bytes read to sniff the format
+
+READERS = [GpxReader, IgcReader, NmeaReader, CsvReader, FitReader]
+
+
+def register(reader):
+    """
+    Add a reader class to the registry.
+    """
+
+    if reader not in READERS:
+        READERS.append(reader)
+
+
+def formatNames():
+    """
+    Returns the names of all registered formats.
+    """
+
+    return [r.NAME for r in READERS]
+
+
+def findReader(path, head=b"", name=None):
+    """
+    Returns the reader class for the file at path. head are its first bytes.
+    Raises ValueError if no reader fits.
+    """
+
+    if name is not None:
+        for reader in READERS:
+            if reader.NAME == name.lower():
+                return reader
+        raise ValueError("Unknown track format '%s'! Known formats: %s" %
+            (name, ", ".join(formatNames())))
+
+    ext = os.path.splitext(path)[1].lower()
+    for reader in READERS:
+        if ext in reader.EXTENSIONS:
+            return reader
+
+    for reader in READERS:
+        if reader.sniff(head):
+            return reader
+
+    raise ValueError("Unknown track format of '%s'! Known formats: %s" %
+        (path, ", ".join(formatNames())))
+
+
+def isTrackFile(path):
+    """
+    Returns True if a reader is registered for the extension of path. Zip
+    archives and compressed track files count as well.
+    """
+
+    if path.lower().endswith(".zip"):
+        return True
+
+    ext = os.path.splitext(stripCompression(path))[1].lower()
+    return any(ext in reader.EXTENSIONS for reader in READERS)
+
+
+def firstTrackFile(names):
+    """
+    Returns the first of names looking like a track file, else the first one.
+    """
+
+    return next((n for n in names if isTrackFile(n)), names[0])
+
+
+def readTrack(path, wp, name=None, duplicates="last"):
+    """
+    Read the track file at path ("-" for standard input) into waypoint
+    instance wp. name forces a format, duplicates is the policy to merge
+    trackpoints of equal timestamps (see Duplicates). Returns a dict of
+    ingest statistics.
+    """
+
+    f, inner = openStream(path, firstTrackFile)
+    with f:
+        head = f.peek(HEAD_SIZE)[:HEAD_SIZE]
+
+        reader = findReader(inner, head, name)()
+        stats = {"reader": reader.NAME, "points": 0, "chunks": 0,
+                 "duplicates": 0, "dropped": 0}
+
+        chunks = []
+        for columns in reader.chunks(f):
+            stats['chunks'] += 1
+
+            # Drop trackpoints without time.
+            timed = np.isfinite(columns['timestamp'])
+            if not timed.all():
+                stats['dropped'] += len(timed) - int(timed.sum())
+                columns = dict((k, v[timed]) for k, v in columns.items())
+
+            chunks.append(columns)
+
+    if stats['dropped']:
+        log.warning("Dropped %d trackpoints without time." % stats['dropped'])
+
+    columns = joinChunks(chunks) if chunks else {}
+    if not len(columns.get('timestamp', ())):
+        raise ValueError("No trackpoints found in '%s'!" % path)
+
+    columns, stats['duplicates'] = collapse(sortColumns(columns), duplicates)
+    stats['points'] = len(columns['timestamp'])
+    wp.addColumns(columns, reader.UNITS)
+
+    return stats
+
+
+# EOF
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+# *****************************************************************************
+# * Video Metadata                                                            *
+# *****************************************************************************
+
+
+# Description
+# ===========
+
+# Read metadata of recorded videos needed to align the gauges to the footage.
+# The container is probed with the same ffmpeg binary as used by MoviePy.
+
+
+# TODO
+# ====
+
+# - Read timecode tracks of professional cameras
+
+
+# ABOUT
+# =====
+
+# Creator:  Florian Meissner
+#           n1990b@gmx.de
+# Version:  0.1
+# Date:     2017/04/20
+
+
+# VERSION HISTORY
+# ===============
+
+# 0.1:  - Initial Beta
+
+
+###############################################################################
+
+
+# Own libraries
+from lib.calculations.time_conv import parseTimestamp
+
+# Foreign libraries
+from moviepy.config             import get_setting
+import os
+import re
+import subprocess
+
+
+RE_DURATION = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+RE_CREATION = re.compile(r"creation_time\s*:\s*(\S+(?: \S+)?)")
+
+
+def getVideoInfo(path):
+    """
+    Return a dict holding 'creation_time' (datetime in UTC or None if the
+    container does not tell) and 'duration' (seconds) of the given video.
+    """
+
+    if not os.path.isfile(path):
+        raise IOError("Video file '%s' does not exist!" % path)
+
+    # ffmpeg without output file prints the container info to stderr and
+    # exits with an error which is ignored here.
+    proc = subprocess.Popen(
+        [get_setting("FFMPEG_BINARY"), "-hide_banner", "-i", path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    infos = proc.communicate()[1].decode("utf8", "replace")
+
+    match = RE_DURATION.search(infos)
+    if match is None:
+        raise IOError("Could not read duration of video file '%s'!" % path)
+
+    hours, minutes, seconds = match.groups()
+    duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    # The first creation time belongs to the container, the following ones to
+    # the streams.
+    creation = None
+    match = RE_CREATION.search(infos)
+    if match is not None:
+        creation = parseTimestamp(match.group(1))
+
+    return {
+        "creation_time" :   creation,
+        "duration"      :   duration
+    }
+
+
+# EOF
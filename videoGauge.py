@@ -27,9 +27,10 @@
 
 # Python 2.7
 # PIP terminaltables
-#     gpxpy
 #     moviepy
+#     numpy
 #     Pillow
+#     backports.lzma (optional, xz compressed tracks)
 
 
 # ABOUT
@@ -37,7 +38,7 @@
 
 # Creator:  Florian Meissner
 #           n1990b@gmx.de
-# Version:  0.2
+# Version:  0.3
 # Date:     2017/03/10
 
 
@@ -48,6 +49,28 @@
 # 0.2:  - Added title centered in console window
 #       - Adjusted gauge class calls to new gauge structure
 #       - Switched gpxpy from local lib to pypi.
+# 0.3:  - Render only a time window of the track. Window can be taken from
+#         the metadata of the recorded video.
+#       - Preview mode with reduced resolution and frame rate.
+#       - Encode several resolutions from one render pass.
+#       - Optional procedural vector needles.
+#       - Render frames in several processes.
+#       - Batch mode for several flights.
+#       - Gauges get read-only views of the track.
+#       - Render several gauges in parallel processes.
+#       - Timing of stages and cache statistics as JSON lines.
+#       - Profiling of stages and frames.
+#       - Resumable renders in segments.
+#       - Estimate cost of a render without rendering.
+#       - Memory budget for the caches of a render.
+#       - Track readers for GPX, IGC, NMEA, CSV and FIT instead of gpxpy.
+#       - Merge sensor logs (pitch, roll, QNH, wind, RPM) into the track.
+#       - Compressed track files and tracks piped to standard input.
+#       - Policy to merge trackpoints of equal timestamps.
+#       - Optional simplification of the track by field tolerances.
+#       - Optional outlier and smoothing filters of track fields.
+#       - Missing speeds derived from positions, gaps of speed and altitude
+#         filled or held.
 
 
 ###############################################################################
@@ -57,26 +80,54 @@
 import gauges
 
 # Own libraries
-from lib.calculations.gui_conv  import colorHex2RGB, splitXY
+from lib.calculations.gui_conv  import colorHex2RGB, joinXY, scaleXY, \
+                                       splitXY
+from lib.AssetCache             import ASSETS
+from lib.Batch                  import Batch
+from lib.calculations.time_conv import datetime2unix, hms2sec, \
+                                       parseTimestamp, sec2hms
 from lib.Datapoint              import WP
+from lib.Exceptions             import FatalError
+from lib.Metrics                import METRICS
+from lib.Planner                import Planner
+from lib.Profiler               import PROFILER
+from lib.readers                import formatNames, readTrack
+from lib.readers.Duplicates     import POLICIES as DUPLICATE_POLICIES
+from lib.readers.SensorLog      import INTERPOLATIONS, alignColumns, \
+                                       readSensorLog
 from lib.myMisc                 import basePath
 from lib.terminalSize           import getTerminalSize
+from lib.videoInfo              import getVideoInfo
 
 # Foreign libraries
-from datetime                   import datetime
 from math                       import floor
+from terminaltables             import AsciiTable   as Table
 from time                       import time
 import getopt
-import gpxpy
 import logging                  as log
+import multiprocessing
+import numpy                    as np
 import os
 import sys
+import traceback
+
+try:
+    from Queue                  import Empty
+except ImportError:
+    from queue                  import Empty
 
 
 
 class VideoGauge(object):
 
-    def __init__(self):
+    _LogHandler = None      # Shared by all instances of a batch process.
+
+    def __init__(self, argv=None, run=True):
+        """
+        argv expects the command line arguments without the program name.
+        Defaults to sys.argv. If run is False, only the settings are parsed
+        and run() has to be called.
+        """
 
         # Constants
         self.STARTTIME = time()
@@ -90,22 +141,171 @@ class VideoGauge(object):
                                 "format"            :   "1280x720"
                              }
         self.LOG_FORMAT = "%(levelname)s: %(message)s"
+        self.SEGMENT_LENGTH = "300"     # Default for --resume in seconds
         self.LOG_LEVEL = "WARNING"
         self.BASEPATH = basePath(__file__)
 
+        if argv is None:
+            argv = sys.argv[1:]
+        self._Argv = list(argv)
+
         # Construct Waypoint class
         self._wp = WP()
 
         # Start calling methods
         self.__eventlogger()
         self._getCmdParams()
+        self._reserveStdout()
         self.__title()
         self._displayHelp()
         #~ self.__output_folder()
         self._chkMissingParams()
-        self._readGPX()
+        self._previewSettings()
+        self._formatSettings()
+        self._renderSettings()
+
+        if self.params['batch']['source']:
+            self._runBatch()
+        elif run:
+            self.run()
+
+
+    def run(self):
+        """
+        Read track and render all wanted gauges.
+        """
+
+        if not os.path.isdir(self.params['outputfolder']):
+            try:
+                os.makedirs(self.params['outputfolder'])
+            except OSError, e:
+                self.__exit(e, True)
+
+        self._openMetrics()
+        if self.params['profile']:
+            PROFILER.start(self.params['profile'])
+
+        try:
+            self._readGPX()
+            self._setWindow()
+
+            # Segments of resumed renders must belong to the same track as
+            # read, merged, filtered and simplified.
+            if self.VIDEOSETTINGS.get('segment_length'):
+                self.VIDEOSETTINGS['input_digest'] = self._wp.digest()
+
+            if self.params['plan']:
+                self._planGauges()
+            else:
+                self._runGauges()
+        finally:
+            PROFILER.stop()
+            self._closeMetrics()
+
+        self.__exit()
+
+
+    def _planGauges(self):
+        """
+        Estimate time, memory and output size of rendering the wanted gauges
+        and show them instead of rendering.
+        """
+
+        self._Plans = []
         self._runGauges()
 
+        if not self._Plans:
+            return
+
+        if not self.params['quiet']:
+            Planner(self.VIDEOSETTINGS).showPlan(self._Plans)
+
+        METRICS.emit("plan", plans=self._Plans)
+
+
+    def _reserveStdout(self):
+        """
+        Keep standard output for the metrics if they are written there. Log,
+        title and tables go to stderr instead.
+        """
+
+        if self.params['metrics'] != "-":
+            return
+
+        sys.stdout = sys.stderr
+        self.logHandler.stream = sys.stderr
+
+
+    def _openMetrics(self):
+        """
+        Start recording metrics if they are wanted.
+        """
+
+        if not self.params['metrics']:
+            return
+
+        try:
+            METRICS.open(self.params['metrics'],
+                flight=os.path.basename(self.params['gpxfile']))
+        except IOError, e:
+            self.__exit(e, True)
+
+        self._AssetStats = (ASSETS.hits, ASSETS.misses)
+
+
+    def _closeMetrics(self):
+        """
+        Write summary of the metrics and show it.
+        """
+
+        if not METRICS.isOpen():
+            return
+
+        self._countAssets(self._AssetStats)
+        METRICS.summary()
+
+        if not self.params['quiet'] and not METRICS.toStdout():
+            METRICS.showReport()
+
+        METRICS.close()
+
+
+    def _countAssets(self, before):
+        """
+        Add hits and misses of the asset cache since before (hits, misses)
+        to the metrics.
+        """
+
+        METRICS.count("assets_hits", ASSETS.hits - before[0])
+        METRICS.count("assets_misses", ASSETS.misses - before[1])
+
+
+    def _runBatch(self):
+        """
+        Render all flights of a batch and exit.
+        """
+
+        params = self.params['batch']
+
+        try:
+            batch = Batch(
+                params['source'],
+                self.params['outputfolder'],
+                options=params['options'],
+                jobs=int(params['jobs']),
+                rebuild=params['rebuild']
+            )
+            report = batch.run(runFlight)
+        except (IOError, ValueError), e:
+            self.__exit(e, True)
+
+        batch.showReport(report)
+
+        failed = [r[0] for r in report if r[1] == Batch.FAILED]
+        if failed:
+            self.__exit("%d of %d flights failed: %s" %
+                (len(failed), len(report), ", ".join(failed)), True)
+
         self.__exit()
 
 
@@ -119,7 +319,7 @@ class VideoGauge(object):
 
         if force:
             log.warning(msg)
-            sys.exit(2)
+            raise FatalError(msg)
         else:
             log.info(msg)
             self.__runningTime()
@@ -132,9 +332,13 @@ class VideoGauge(object):
         """
 
         self.logger = log.getLogger()
-        self.logHandler = log.StreamHandler(sys.stdout)
-        #self.logHandler = log.FileHandler()
-        self.logger.addHandler(self.logHandler)
+
+        # Flights of a batch reuse the handler of the first one.
+        if VideoGauge._LogHandler is None:
+            VideoGauge._LogHandler = log.StreamHandler(sys.stdout)
+            #VideoGauge._LogHandler = log.FileHandler()
+            self.logger.addHandler(VideoGauge._LogHandler)
+        self.logHandler = VideoGauge._LogHandler
         self._setLogLevel()
         self._setLogFormat()
 
@@ -221,6 +425,12 @@ class VideoGauge(object):
         displayHelp = False
 
         gpxfile = None
+        trackFormat = False
+        duplicates = "last"
+        maxGap = "10"
+        simplify = False
+        despike = False
+        smooth = False
         #~ outputfolder = "Gauges/"
         outputfolder = os.getcwd() + "/"
         force = False
@@ -228,6 +438,46 @@ class VideoGauge(object):
         quiet = False
         verbose = False
 
+        sensors =   {
+                        "logs"          :   [],
+                        "offset"        :   "0",
+                        "tolerance"     :   "1",
+                        "interpolation" :   "linear"
+                    }
+
+        window =    {
+                        "start"     :   False,
+                        "end"       :   False,
+                        "video"     :   False,
+                        "offset"    :   "0"
+                    }
+
+        formats = False
+        vectorNeedles = False
+        workers = "1"
+        gaugeJobs = "1"
+        metrics = False
+        profile = False
+        segmentLength = False
+        resume = False
+        memoryBudget = False
+        plan = False
+
+        batch =     {
+                        "source"    :   False,
+                        "jobs"      :   "1",
+                        "rebuild"   :   False,
+                        "options"   :   []
+                    }
+
+        preview =   {
+                        "display"   :   False,
+                        "scale"     :   "0.25",
+                        "framerate" :   "12",
+                        "stride"    :   "5",
+                        "sheet"     :   False
+                    }
+
         airspeed = {
                         "display"   :   False,
                         "size"      :   "200x200",
@@ -293,8 +543,45 @@ class VideoGauge(object):
         long_options = [
                         "help",
                         "gpxfile=",
+                        "track-format=",
+                        "duplicates=",
+                        "max-gap=",
+                        "simplify=",
+                        "despike=",
+                        "smooth=",
                         "outputfolder=",
 
+                        "sensor-log=",
+                        "sensor-offset=",
+                        "sensor-tolerance=",
+                        "sensor-interpolation=",
+
+                        "start=",
+                        "end=",
+                        "sync-video=",
+                        "sync-offset=",
+
+                        "formats=",
+                        "vector-needles",
+                        "workers=",
+                        "gauge-jobs=",
+                        "segment-length=",
+                        "resume",
+                        "memory-budget=",
+                        "plan",
+                        "metrics=",
+                        "profile=",
+
+                        "batch=",
+                        "batch-jobs=",
+                        "batch-rebuild",
+
+                        "preview",
+                        "preview-scale=",
+                        "preview-fps=",
+                        "preview-stride=",
+                        "preview-sheet",
+
                         "airspeed=",
                         "airspeed-size=",
                         "airspeed-position=",
@@ -335,7 +622,7 @@ class VideoGauge(object):
         # Parse arguemnts. "opts" contains recognised parameters. "args"
         # contains unrecognized ones.
         try:
-            opts, args = getopt.getopt(sys.argv[1:], options, long_options)
+            opts, args = getopt.getopt(self._Argv, options, long_options)
         except getopt.GetoptError as err:
             self.__exit(str(err), True)
         else:
@@ -351,6 +638,38 @@ class VideoGauge(object):
                 elif opt in ("-g", "--gpxfile"):
                     gpxfile = arg
 
+                # Format of the track file
+                elif opt == "--track-format":
+                    trackFormat = arg
+
+                # Merge policy of trackpoints with equal timestamps
+                elif opt == "--duplicates":
+                    duplicates = arg
+
+                # Longest gap of speed and altitude interpolated
+                elif opt == "--max-gap":
+                    maxGap = arg
+
+                # Tolerances to leave out trackpoints
+                elif opt == "--simplify":
+                    simplify = arg
+
+                # Filters of noisy fields
+                elif opt == "--despike":
+                    despike = arg
+                elif opt == "--smooth":
+                    smooth = arg
+
+                # Sensor logs
+                elif opt == "--sensor-log":
+                    sensors['logs'].append(arg)
+                elif opt == "--sensor-offset":
+                    sensors['offset'] = arg
+                elif opt == "--sensor-tolerance":
+                    sensors['tolerance'] = arg
+                elif opt == "--sensor-interpolation":
+                    sensors['interpolation'] = arg
+
                 # Video outputfile
                 elif opt in ("-o", "--outputfolder"):
                     if arg[:-1] != "/":
@@ -361,6 +680,61 @@ class VideoGauge(object):
                 elif opt == "-f":
                     force = True
 
+                # Time window
+                elif opt == "--start":
+                    window['start'] = arg
+                elif opt == "--end":
+                    window['end'] = arg
+                elif opt == "--sync-video":
+                    window['video'] = arg
+                elif opt == "--sync-offset":
+                    window['offset'] = arg
+
+                # Output resolutions
+                elif opt == "--formats":
+                    formats = arg
+                elif opt == "--vector-needles":
+                    vectorNeedles = True
+                elif opt == "--workers":
+                    workers = arg
+                elif opt == "--gauge-jobs":
+                    gaugeJobs = arg
+                elif opt == "--segment-length":
+                    segmentLength = arg
+                elif opt == "--resume":
+                    resume = True
+                elif opt == "--memory-budget":
+                    memoryBudget = arg
+
+                # Diagnostics
+                elif opt == "--metrics":
+                    metrics = arg
+                elif opt == "--profile":
+                    profile = arg
+                elif opt == "--plan":
+                    plan = True
+
+                # Batch mode
+                elif opt == "--batch":
+                    batch['source'] = arg
+                elif opt == "--batch-jobs":
+                    batch['jobs'] = arg
+                elif opt == "--batch-rebuild":
+                    batch['rebuild'] = True
+
+                # Preview mode
+                elif opt == "--preview":
+                    preview['display'] = True
+                elif opt == "--preview-scale":
+                    preview['scale'] = arg
+                elif opt == "--preview-fps":
+                    preview['framerate'] = arg
+                elif opt == "--preview-stride":
+                    preview['stride'] = arg
+                elif opt == "--preview-sheet":
+                    preview['display'] = True
+                    preview['sheet'] = True
+
                 # Airspeed indicator settings
                 elif opt == "--airspeed":
                     airspeed['display'] = True
@@ -449,11 +823,37 @@ class VideoGauge(object):
                     force = True
                     self._setLogLevel('CRITICAL')
 
+            # Options passed on to the flights of a batch.
+            for opt, arg in opts:
+                if opt not in ("-g", "--gpxfile", "-o", "--outputfolder",
+                    "--batch", "--batch-jobs", "--batch-rebuild"):
+                    batch['options'] += [opt, arg] if arg else [opt]
+
             # Transfor parameters into public dictionary.
             self.params = { "gpxfile"       :   gpxfile,
+                            "trackFormat"   :   trackFormat,
+                            "duplicates"    :   duplicates,
+                            "maxGap"        :   maxGap,
+                            "simplify"      :   simplify,
+                            "despike"       :   despike,
+                            "smooth"        :   smooth,
+                            "sensors"       :   sensors,
                             "outputfolder"  :   outputfolder,
                             "force"         :   force,
                             "displayHelp"   :   displayHelp,
+                            "window"        :   window,
+                            "formats"       :   formats,
+                            "vectorNeedles" :   vectorNeedles,
+                            "workers"       :   workers,
+                            "gaugeJobs"     :   gaugeJobs,
+                            "metrics"       :   metrics,
+                            "profile"       :   profile,
+                            "segmentLength" :   segmentLength,
+                            "resume"        :   resume,
+                            "memoryBudget"  :   memoryBudget,
+                            "plan"          :   plan,
+                            "batch"         :   batch,
+                            "preview"       :   preview,
                             "airspeed"      :   airspeed,
                             "altitude"      :   altitude,
                             "attitude"      :   attitude,
@@ -471,9 +871,14 @@ class VideoGauge(object):
         missing parameter is expected to hold default value "None".
         """
 
+        # A batch brings its own GPX files.
+        optional = ()
+        if self.params['batch']['source']:
+            optional = ("gpxfile",)
+
         count = 0
         for opt, arg in self.params.items():
-            if arg is None:
+            if arg is None and opt not in optional:
                 log.error("Required parameter \"%s\" is missing!" % opt)
                 count+=1
         if count > 0:
@@ -485,51 +890,319 @@ class VideoGauge(object):
         Run class handler method for wated gauges.
         """
 
-        # Control variable
-        run_something = False
+        # Names of the wanted gauges. The handler of gauge name is _<name>.
+        names = []
 
         # Airspeed indicator
         if self.params['airspeed']['display']:
             if self.params['airspeed']['unit'] in ("mph", "kt", "kmh"):
-                self._airspeed()
-                run_something = True
+                names.append("airspeed")
             else:
                 log.warning("Unknown unit \"%s\" for 'airspeed'!" % self.params['airspeed']['unit'])
 
         # Altitude indicator
         if self.params['altitude']['display']:
             if self.params['altitude']['unit'] in ("ft", "m"):
-                self._altitude()
-                run_something = True
+                names.append("altitude")
             else:
                 log.warning("Unknown unit \"%s\" for 'altitude'!" % self.params['altitude']['unit'])
 
         # Attitude indicator
         if self.params['attitude']['display']:
-            self._attitude()
-            run_something = True
+            names.append("attitude")
 
         # Compass
         if self.params['compass']['display']:
-            self._compass()
-            run_something = True
+            names.append("compass")
 
         # G-Meter
         if self.params['g_meter']['display']:
-            self._g_meter()
-            run_something = True
+            names.append("g_meter")
 
         # Vertical speed indicator
         if self.params['vsi']['display']:
             if self.params['vsi']['unit'] in ("ftmin", "ms"):
-                self._vsi()
-                run_something = True
+                names.append("vsi")
             else:
                 log.warning("Unknown unit \"%s\" for 'vsi'!" % self.params['vsi']['unit'])
 
+        # Gauges of fields the track has no values of.
+        for name, field in (("airspeed", "speed"), ("altitude", "altitude")):
+            if name in names and not self._wp.hasValues(field):
+                log.warning("Track has no %s, skipping '%s'!" % (field, name))
+                names.remove(name)
+
         # Check if at least one gauge was selected.
-        if not run_something:
+        if not names:
             log.warning("No gauge selected and no output produced!")
+            return
+
+        if self.VIDEOSETTINGS.get('gauge_jobs', 1) > 1 and len(names) > 1 \
+            and not self.params['plan']:
+            self._runGaugesParallel(names)
+            return
+
+        for name in names:
+            try:
+                getattr(self, "_" + name)()
+            except IOError, e:
+                self.__exit(e, True)
+
+
+    def _runGaugesParallel(self, names):
+        """
+        Render the gauges called names in parallel processes. The processes
+        are forked after the track was prepared, so they inherit it without
+        copying. The ffmpeg threads and render workers of the video settings
+        are split between the processes so they don't oversubscribe the CPU
+        together. Each gauge has its own progress bar and a failing gauge
+        does not stop the others.
+        """
+
+        # Nobody can answer questions of the processes, so ask once here.
+        existing = [path for name in names
+                    for path, size in self._outputFiles(name)
+                    if os.path.isfile(path)]
+        if existing and not self.params['force']:
+            q  = "%d output files already exist. "
+            q += "They will be overridden. "
+            q += "Continue? (Y/n): "
+            if raw_input(q % len(existing)).lower() not in ("", "y", "yes"):
+                self.__exit("Aborted by user!", True)
+            self.params['force'] = True
+
+        jobs = min(self.VIDEOSETTINGS['gauge_jobs'], len(names))
+
+        settings = dict(self.VIDEOSETTINGS)
+        settings['ffmpeg_threads'] = max(1,
+            self.VIDEOSETTINGS['ffmpeg_threads'] // jobs)
+        settings['render_workers'] = max(1,
+            self.VIDEOSETTINGS['render_workers'] // jobs)
+
+        queue = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+
+        for index, name in enumerate(names):
+            queue.put((index, name))
+
+        processes = []
+        for slot in range(jobs):
+            queue.put(None)
+            # No daemons, so they may start render processes.
+            p = multiprocessing.Process(
+                target=self.__gaugeWorker,
+                args=(slot, settings, queue, results)
+            )
+            p.start()
+            processes.append(p)
+
+        log.info("Rendering %d gauges in %d processes with %d encoder "
+            "threads each." % (len(names), jobs, settings['ffmpeg_threads']))
+
+        report = [None] * len(names)
+        received = 0
+        while received < len(names):
+            try:
+                index, status, message, seconds, metrics = \
+                    results.get(timeout=1.0)
+            except Empty:
+                # Stop waiting if all processes died without reporting.
+                if not any(p.is_alive() for p in processes):
+                    break
+                continue
+
+            METRICS.merge(metrics)
+            report[index] = (names[index], status, message, seconds)
+            received += 1
+            log.info("Gauge '%s': %s" % (names[index], status))
+
+        for p in processes:
+            p.join()
+
+        for index, name in enumerate(names):
+            if report[index] is None:
+                report[index] = (name, Batch.FAILED,
+                    "Render process died.", 0.0)
+
+        if not self.params['quiet']:
+            rows = [["Gauge", "Status", "Time", "Message"]]
+            for name, status, message, seconds in report:
+                rows.append([name, status, "%.1f sec" % seconds, message])
+
+            tbl = Table(rows)
+            tbl.justify_columns[2] = 'right'
+
+            print tbl.table + '\n'
+
+        failed = [r[0] for r in report if r[1] == Batch.FAILED]
+        if failed:
+            self.__exit("%d of %d gauges failed: %s" %
+                (len(failed), len(report), ", ".join(failed)), True)
+
+
+    def __gaugeWorker(self, slot, settings, queue, results):
+        """
+        Process rendering gauges taken from queue until None is received.
+        slot is the line of the progress bars of this process.
+        """
+
+        self.VIDEOSETTINGS = dict(settings, progress_position=slot)
+        PROFILER.fork("gauges%d" % slot)
+
+        while True:
+            job = queue.get()
+            if job is None:
+                PROFILER.stop()
+                break
+
+            index, name = job
+            self.VIDEOSETTINGS['progress_label'] = name
+            start = time()
+            assets = (ASSETS.hits, ASSETS.misses)
+
+            try:
+                getattr(self, "_" + name)()
+                status, message = Batch.DONE, ""
+            except FatalError, e:
+                status, message = Batch.FAILED, e.msg
+            except SystemExit, e:
+                status, message = Batch.FAILED, "Exit code %s" % e.code
+            except Exception, e:
+                log.error(traceback.format_exc())
+                status, message = Batch.FAILED, str(e)
+
+            # Metrics are summed up by the main process.
+            self._countAssets(assets)
+            metrics = METRICS.snapshot()
+            METRICS.reset()
+
+            results.put((index, status, message, time() - start, metrics))
+
+
+    def _previewSettings(self):
+        """
+        Switch video settings to a fast draft render if preview mode is
+        wanted. Gauge sizes and positions are scaled with the video format so
+        the layout stays the same.
+        """
+
+        params = self.params['preview']
+        self.VIDEOSETTINGS['scale'] = 1.0
+
+        if not params['display']:
+            return
+
+        try:
+            scale = float(params['scale'])
+            framerate = float(params['framerate'])
+            stride = float(params['stride'])
+        except ValueError as e:
+            self.__exit("Invalid preview parameter: %s" % e, True)
+
+        if not 0 < scale <= 1 or framerate <= 0 or stride <= 0:
+            self.__exit("Preview scale must be within (0, 1], frame rate and "
+                "stride must be positive.", True)
+
+        self.VIDEOSETTINGS.update({
+            "codec"         :   "mjpeg",
+            "filetype"      :   ".avi",
+            "framerate"     :   framerate,
+            "format"        :   joinXY(*scaleXY(self.VIDEOSETTINGS['format'],
+                                                scale, even=True)),
+            "scale"         :   scale,
+            "stride"        :   stride,
+            "sheet"         :   params['sheet'],
+            "sheet_columns" :   8
+        })
+
+        log.info("Preview mode: %s at %s fps, %s sec of track per frame." %
+            (self.VIDEOSETTINGS['format'], framerate, stride))
+
+
+    def _formatSettings(self):
+        """
+        Prepare rendering of several output resolutions. The gauges are
+        composed in the largest one, so their layout given for the default
+        format is scaled up accordingly.
+        """
+
+        if not self.params['formats']:
+            return
+
+        if self.params['preview']['display']:
+            log.warning("--formats is ignored in preview mode.")
+            return
+
+        try:
+            formats = [splitXY(f) for f in self.params['formats'].split(",")]
+        except ValueError:
+            self.__exit("Invalid list of formats '%s'!" %
+                self.params['formats'], True)
+
+        formats.sort(key=lambda f: f[0] * f[1], reverse=True)
+
+        layout = splitXY(self.VIDEOSETTINGS['format'])
+        self.VIDEOSETTINGS['scale'] = float(formats[0][0]) / layout[0]
+        self.VIDEOSETTINGS['format'] = joinXY(*formats[0])
+        self.VIDEOSETTINGS['formats'] = formats
+
+        log.info("Rendering in %s for %s." % (self.VIDEOSETTINGS['format'],
+            ", ".join(joinXY(*f) for f in formats)))
+
+
+    def _renderSettings(self):
+        """
+        Pass settings of the renderer to the video settings.
+        """
+
+        self.VIDEOSETTINGS['vector_needles'] = self.params['vectorNeedles']
+
+        try:
+            workers = int(self.params['workers'])
+            if workers < 1:
+                raise ValueError
+        except ValueError:
+            self.__exit("Invalid number of workers '%s'!" %
+                self.params['workers'], True)
+
+        self.VIDEOSETTINGS['render_workers'] = workers
+
+        try:
+            jobs = int(self.params['gaugeJobs'])
+            if jobs < 1:
+                raise ValueError
+        except ValueError:
+            self.__exit("Invalid number of gauge jobs '%s'!" %
+                self.params['gaugeJobs'], True)
+
+        self.VIDEOSETTINGS['gauge_jobs'] = jobs
+
+        # Resumed renders need segments. Contact sheets are not segmented.
+        length = self.params['segmentLength']
+        if self.params['resume'] and not length:
+            length = self.SEGMENT_LENGTH
+        if length and not self.VIDEOSETTINGS.get('sheet'):
+            try:
+                length = hms2sec(length)
+                if length <= 0:
+                    raise ValueError
+            except ValueError:
+                self.__exit("Invalid segment length '%s'!" % length, True)
+
+            self.VIDEOSETTINGS['segment_length'] = length
+            self.VIDEOSETTINGS['resume'] = self.params['resume']
+
+        # Budget in MB, shared by the gauges rendered side by side.
+        if self.params['memoryBudget']:
+            try:
+                budget = float(self.params['memoryBudget'])
+                if budget <= 0:
+                    raise ValueError
+            except ValueError:
+                self.__exit("Invalid memory budget '%s'!" %
+                    self.params['memoryBudget'], True)
+
+            self.VIDEOSETTINGS['memory_budget'] = int(budget * 1e6 / jobs)
 
 
     # -------------------------------------------------------------------------
@@ -579,9 +1252,29 @@ class VideoGauge(object):
 
         h  = "usage: videogauge [--help | -h]\n"
         h += "                  [--version]\n"
-        h += "                  -g | --gpxfile FILE\n"
+        h += "                  -g | --gpxfile FILE [--track-format NAME]\n"
+        h += "                  [--duplicates POLICY]\n"
+        h += "                  [--max-gap SEC]\n"
+        h += "                  [--despike FIELD=WINDOW[:SIGMAS][,...]]\n"
+        h += "                  [--smooth FIELD=WINDOW[:ORDER][,...]]\n"
+        h += "                  [--simplify FIELD=TOL[,...]]\n"
+        h += "                  [--sensor-log FILE] [--sensor-offset SEC]\n"
+        h += "                  [--sensor-tolerance SEC]\n"
+        h += "                  [--sensor-interpolation MODE]\n"
         h += "                  [-o | --outputfolder PATH]\n"
         h += "                  [-f] [-v] [-q]\n"
+        h += "                  [--start TIME] [--end TIME]\n"
+        h += "                  [--sync-video FILE] [--sync-offset SEC]\n"
+        h += "                  [--formats WIDTHxHEIGHT[,...]]\n"
+        h += "                  [--vector-needles] [--workers N]\n"
+        h += "                  [--gauge-jobs N] [--memory-budget MB]\n"
+        h += "                  [--segment-length TIME] [--resume]\n"
+        h += "                  [--metrics FILE] [--profile PREFIX] [--plan]\n"
+        h += "                  [--preview] [--preview-sheet]\n"
+        h += "                  [--preview-scale FACTOR] [--preview-fps FPS]\n"
+        h += "                  [--preview-stride SEC]\n"
+        h += "                  [--batch FOLDER | MANIFEST] [--batch-jobs N]\n"
+        h += "                  [--batch-rebuild]\n"
         h += "                  [--airspeed UNIT]\n"
         h += "                  [--airspeed-size WIDTHxHEIGHT]\n"
         h += "                  [--airspeed-position POSXxPOSY]\n"
@@ -631,8 +1324,41 @@ class VideoGauge(object):
             "Show the version of this program as wellas the versions of each \
             gauge.")
         h += linewrapper("-g | --gpxfile FILE",
-            "Specify the GPX file acting as data source. Provide either \
-            absolute or relative path.")
+            "Specify the track file acting as data source. Provide either \
+            absolute or relative path, or - to read standard input. Known \
+            formats: %s. The format is taken from the file extension or the \
+            content of the file. Files may be compressed with gzip, bzip2 or \
+            xz or packed into a zip archive." %
+            ", ".join(formatNames()))
+        h += linewrapper("--track-format NAME",
+            "Read the track file as format NAME regardless of its extension.")
+        h += linewrapper("--duplicates POLICY",
+            "Trackpoints with the same timestamp are merged into one. Each \
+            field takes the last valid value, the first valid value or the \
+            average of the valid values (%s). DEFAULT: %s" %
+            (", ".join(DUPLICATE_POLICIES), self.params['duplicates']))
+        h += linewrapper("--max-gap SEC",
+            "Trackpoints without speed get the speed derived from their \
+            positions. Gaps of speed and altitude up to SEC seconds are \
+            interpolated, longer gaps hold the last value. DEFAULT: %s" %
+            self.params['maxGap'])
+        h += linewrapper("--despike FIELD=WINDOW[:SIGMAS][,...]",
+            "Replace outliers of FIELD (e.g. altitude, speed) by the median \
+            of the WINDOW trackpoints around them (odd number). A value is \
+            an outlier if it is more than SIGMAS (DEFAULT: 3) standard \
+            deviations off the median, e.g. altitude=7,speed=7:4. Single \
+            bad fixes then don't whip the VSI and G needles.")
+        h += linewrapper("--smooth FIELD=WINDOW[:ORDER][,...]",
+            "Smooth FIELD by fitting polynomials of ORDER (DEFAULT: 2) to \
+            the WINDOW trackpoints around each trackpoint (Savitzky-Golay), \
+            e.g. altitude=9,speed=5:2. Done after --despike and before \
+            vertical speed and G forces are calculated.")
+        h += linewrapper("--simplify FIELD=TOL[,...]",
+            "Leave out trackpoints the gauges don't need. A trackpoint is \
+            removed if the needles move between the remaining trackpoints \
+            by less than TOL off its value in every FIELD, e.g. \
+            speed=0.5,altitude=5. TOL is in the default unit of the field \
+            (kt, ft, deg, hPa, rpm). Fewer trackpoints render faster.")
         h += linewrapper("-o | --outputfolder PATH",
             "Specify the output path for the created video files here. Provide \
             either relative or absolute path. Do not add a filename! \
@@ -644,6 +1370,132 @@ class VideoGauge(object):
         h += linewrapper("-q",
             "Quiet mode. Reduces output to a minimum. Implies -f.")
 
+        h += "\n"
+        h += "Sensor logs:\n"
+        h += linewrapper("--sensor-log FILE",
+            "CSV log of an AHRS, EFIS or engine monitor with a time column \
+            and columns of pitch, roll, QNH, wind direction, wind speed or \
+            RPM. The samples are merged into the trackpoints by time. May be \
+            given several times.")
+        h += linewrapper("--sensor-offset SEC",
+            "Seconds to add to the times of the sensor logs to correct their \
+            clock. DEFAULT: %s" % self.params['sensors']['offset'])
+        h += linewrapper("--sensor-tolerance SEC",
+            "Maximum time between a trackpoint and a sample merged into it. \
+            Trackpoints without sample keep their values. DEFAULT: %s" %
+            self.params['sensors']['tolerance'])
+        h += linewrapper("--sensor-interpolation MODE",
+            "How samples are merged into a trackpoint: %s. DEFAULT: %s" %
+            (", ".join(INTERPOLATIONS),
+             self.params['sensors']['interpolation']))
+
+        h += "\n"
+        h += "Time window:\n"
+        h += linewrapper("--start TIME",
+            "Start rendering at TIME. TIME is either an absolute UTC time like \
+            2017-04-07T10:15:00Z or relative to the start of the track as \
+            [[HH:]MM:]SS. DEFAULT: Start of track.")
+        h += linewrapper("--end TIME",
+            "Stop rendering at TIME. Same format as --start. DEFAULT: End of \
+            track.")
+        h += linewrapper("--sync-video FILE",
+            "Render only the part of the track recorded in the video FILE. \
+            Start and length are read from the creation time and duration of \
+            the video container. --start and --end override the respective \
+            value.")
+        h += linewrapper("--sync-offset SEC",
+            "Seconds to add to the creation time of --sync-video to correct \
+            the clock of the camera. DEFAULT: %s" %
+            self.params['window']['offset'])
+
+        h += "\n"
+        h += "Output:\n"
+        h += linewrapper("--formats WIDTHxHEIGHT[,...]",
+            "Comma separated list of resolutions to encode in one render pass, \
+            e.g. 3840x2160,1920x1080,1280x720. Gauges are rendered once in \
+            the largest resolution and downscaled for the others. Sizes and \
+            positions of the gauges refer to %s. Files are named \
+            <gauge>_<WIDTHxHEIGHT>. DEFAULT: %s only." %
+            (self.VIDEOSETTINGS['format'], self.VIDEOSETTINGS['format']))
+        h += linewrapper("--vector-needles",
+            "Draw the needles from the shapes defined in the gauge scripts \
+            instead of rotating the needle images. Needles stay sharp at any \
+            resolution. Gauges without such shapes use their images.")
+        h += linewrapper("--workers N",
+            "Number of processes rendering frames of a gauge in parallel. The \
+            frames are passed to the encoder through shared memory. \
+            DEFAULT: %s" % self.params['workers'])
+        h += linewrapper("--gauge-jobs N",
+            "Number of gauges rendered at the same time in separate \
+            processes. Encoder threads and render workers are shared between \
+            them. Failures of a gauge are reported without stopping the \
+            others. DEFAULT: %s" % self.params['gaugeJobs'])
+        h += linewrapper("--segment-length TIME",
+            "Render videos in segments of TIME (seconds or HH:MM:SS) which \
+            are joined without encoding again when all are done. Finished \
+            segments are kept in <output>.parts until then.")
+        h += linewrapper("--resume",
+            "Keep the segments of an interrupted render of the same track \
+            with the same settings and only render the missing ones. \
+            Implies --segment-length %s if not given." % self.SEGMENT_LENGTH)
+        h += linewrapper("--memory-budget MB",
+            "Memory for frame buffers and caches of a render. Frames are \
+            rendered just in time, so only the caches of rotated needles and \
+            resized images are sized to fit. Memory of the track comes on \
+            top. Shared by gauges rendered side by side. DEFAULT: no limit, \
+            %d angles per needle." % gauges.Needle.RasterNeedle.CACHE_SIZE)
+
+        h += "\n"
+        h += "Diagnostics:\n"
+        h += linewrapper("--metrics FILE",
+            "Record wall and CPU time of parsing, calculation, preparation, \
+            clip building, rendering and encoding, frames per second and \
+            cache hit rates. Events are appended to FILE as JSON lines, use - \
+            for stdout. A summary table is shown at the end.")
+        h += linewrapper("--profile PREFIX",
+            "Profile the stages and the rendering of frames. Writes a report \
+            sorted by time to PREFIX.txt and sampled stacks for flame graphs \
+            to PREFIX.folded. Render processes write PREFIX.<process>.*.")
+        h += linewrapper("--plan",
+            "Don't render but estimate frames, segments, distinct needle \
+            rotations, render time, peak memory and output size of the \
+            wanted gauges from the track and a short benchmark of a few \
+            frames. With --metrics the estimates are written as plan event.")
+
+        h += "\n"
+        h += "Preview:\n"
+        h += linewrapper("--preview",
+            "Render a fast draft of the gauges with the same layout. Resolution \
+            and frame rate are reduced and the track is shown in time lapse. \
+            Files are saved as *_preview.avi using an intra-only codec.")
+        h += linewrapper("--preview-sheet",
+            "Like --preview but save a contact sheet image (*_preview.png) \
+            showing one frame per stride instead of a video.")
+        h += linewrapper("--preview-scale FACTOR",
+            "Scale of the preview resolution. DEFAULT: %s" %
+            self.params['preview']['scale'])
+        h += linewrapper("--preview-fps FPS",
+            "Frame rate of the preview video. DEFAULT: %s" %
+            self.params['preview']['framerate'])
+        h += linewrapper("--preview-stride SEC",
+            "Seconds of the track between two preview frames. DEFAULT: %s" %
+            self.params['preview']['stride'])
+
+        h += "\n"
+        h += "Batch:\n"
+        h += linewrapper("--batch FOLDER | MANIFEST",
+            "Render all GPX files of a folder or all flights listed in a \
+            manifest file. Each line of a manifest holds a GPX file followed \
+            by options for this flight. Other options apply to all flights. \
+            Each flight is saved to a subfolder of the output folder named \
+            like its GPX file. Failed flights are reported at the end.")
+        h += linewrapper("--batch-jobs N",
+            "Number of flights rendered at the same time. DEFAULT: %s" %
+            self.params['batch']['jobs'])
+        h += linewrapper("--batch-rebuild",
+            "Render flights even if their outputs are newer than their GPX \
+            files.")
+
         h += "\n"
         h += "Airspeed indicator:\n"
         h += linewrapper("--airspeed UNIT",
@@ -805,60 +1657,323 @@ class VideoGauge(object):
 
     def _readGPX(self):
         """
-        Read given GPX file and extract trackpoints.
-        """
-
-        log.info("Reading GPX file. This may take a few seconds...")
-
-        gpxfile = open(self.params['gpxfile'], 'r')
-        gpx = gpxpy.parse(gpxfile, version='1.0')   # Even though that SkyDemon
-                                                    # marks its GPX files as
-                                                    # version 1.1, the
-                                                    # trackpoints do include
-                                                    # <speed></speed> which is
-                                                    # only available in V1.0.
-                                                    # Because GPXPy would parse
-                                                    # the files header, it need
-                                                    # to be forced to read in
-                                                    # 1.0.
-
-        # Parse tracks.
-        oldTime = datetime(1970, 01, 01, 00, 00, 00, 00)
-        for track in gpx.tracks:
-            for segment in track.segments:
-                for point in segment.points:
-
-                    # Compare timestamp to previous track point. If it's the
-                    # same, just change existing trackpoint.
-                    if oldTime == point.time:
-                        index = self._wp.getWP(point.time, ident_type='time')
-                        self._wp.changeWP(
-                            index, \
-                            lat=point.latitude, lat_unit=self._wp.U_DEG, \
-                            lon=point.longitude, lon_unit=self._wp.U_DEG, \
-                            altitude=point.elevation, altitude_unit=self._wp.U_M, \
-                            speed=point.speed, speed_unit=self._wp.U_MS, \
-                            time=point.time
-                        )
-                    else:
-                        self._wp.addWP(
-                            lat=point.latitude, lat_unit=self._wp.U_DEG, \
-                            lon=point.longitude, lon_unit=self._wp.U_DEG, \
-                            altitude=point.elevation, altitude_unit=self._wp.U_M, \
-                            speed=point.speed, speed_unit=self._wp.U_MS, \
-                            time=point.time
-                        )
-                    oldTime = point.time
-
-        self._wp.calculator()
+        Read given track file and extract trackpoints.
+        """
+
+        log.info("Reading track file. This may take a few seconds...")
+
+        with METRICS.stage("parse"), PROFILER.scope("parse"):
+            try:
+                stats = readTrack(self.params['gpxfile'], self._wp,
+                    self.params['trackFormat'] or None,
+                    self.params['duplicates'])
+            except (IOError, ValueError), e:
+                self.__exit(e, True)
+
+        log.info("Read %d trackpoints (%s, %d merged duplicates)." %
+            (stats['points'], stats['reader'], stats['duplicates']))
+        METRICS.count("ingest_points", stats['points'])
+        METRICS.count("ingest_duplicates", stats['duplicates'])
+        METRICS.count("ingest_dropped", stats['dropped'])
+
+        if self.params['sensors']['logs']:
+            with METRICS.stage("sensors"), PROFILER.scope("sensors"):
+                self._mergeSensors()
+
+        with METRICS.stage("gaps"), PROFILER.scope("gaps"):
+            self._closeGaps()
+
+        if self.params['despike'] or self.params['smooth']:
+            with METRICS.stage("filter"), PROFILER.scope("filter"):
+                self._filterTrack()
+
+        if self.params['simplify']:
+            with METRICS.stage("simplify"), PROFILER.scope("simplify"):
+                self._simplifyTrack()
+
+        with METRICS.stage("calculation"), PROFILER.scope("calculation"):
+            self._wp.calculator()
+
         self._wp.showWPtable()
 
 
+    def _mergeSensors(self):
+        """
+        Merge the sensor logs into the trackpoints.
+        """
+
+        sensors = self.params['sensors']
+        try:
+            offset = float(sensors['offset'])
+            tolerance = float(sensors['tolerance'])
+        except ValueError:
+            self.__exit("Sensor offset and tolerance must be numbers!", True)
+
+        track = self._wp.getTimestamps()
+
+        for path in sensors['logs']:
+            try:
+                columns, units = readSensorLog(path)
+                aligned = alignColumns(track, columns, tolerance, offset,
+                    sensors['interpolation'])
+            except (IOError, ValueError), e:
+                self.__exit(e, True)
+
+            self._wp.setColumns(aligned, units)
+
+            matched = max(int(np.isfinite(v).sum()) for v in aligned.values())
+            log.info("Merged %d samples of %s (%s) into %d of %d trackpoints."
+                % (len(columns['timestamp']), os.path.basename(path),
+                   ", ".join(sorted(aligned)), matched, len(track)))
+            METRICS.count("sensor_samples", len(columns['timestamp']))
+            METRICS.count("sensor_matched", matched)
+
+
+    def _simplifyTrack(self):
+        """
+        Remove the trackpoints within the tolerances of --simplify.
+        """
+
+        tolerances = self.__fieldArgs("simplify", "FIELD=TOL[,...]",
+            (float,))
+        tolerances = dict((k, v[0]) for k, v in tolerances.items())
+
+        try:
+            before, after = self._wp.simplify(tolerances)
+        except ValueError, e:
+            self.__exit(e, True)
+
+        log.info("Simplified track from %d to %d trackpoints (%.1f %%)." %
+            (before, after, 100.0 * after / before))
+        METRICS.count("simplify_points", before)
+        METRICS.count("simplify_kept", after)
+
+
+    def _closeGaps(self):
+        """
+        Derive missing speeds and fill the gaps of speed and altitude.
+        """
+
+        try:
+            maxGap = float(self.params['maxGap'])
+        except ValueError:
+            self.__exit("Maximum gap must be a number of seconds!", True)
+
+        stats = self._wp.closeGaps(maxGap)
+
+        if stats['derived']:
+            log.info("Derived %d speeds from the positions." %
+                stats['derived'])
+        for field in ("speed", "altitude"):
+            if stats[field]['interpolated'] or stats[field]['held']:
+                log.info("Interpolated %d and held %d missing values of %s."
+                    % (stats[field]['interpolated'], stats[field]['held'],
+                       field))
+        METRICS.count("gaps_derived", stats['derived'])
+        METRICS.count("gaps_interpolated", stats['speed']['interpolated'] +
+            stats['altitude']['interpolated'])
+        METRICS.count("gaps_held", stats['speed']['held'] +
+            stats['altitude']['held'])
+
+
+    def _filterTrack(self):
+        """
+        Replace outliers and smooth the fields given by --despike and
+        --smooth.
+        """
+
+        despike = self.__fieldArgs("despike", "FIELD=WINDOW[:SIGMAS][,...]",
+            (int, float), ("3",))
+        smooth = self.__fieldArgs("smooth", "FIELD=WINDOW[:ORDER][,...]",
+            (int, int), ("2",))
+
+        try:
+            outliers = self._wp.filterFields(despike, smooth)
+        except ValueError, e:
+            self.__exit(e, True)
+
+        for field, count in sorted(outliers.items()):
+            log.info("Replaced %d outliers of %s." % (count, field))
+        METRICS.count("filter_outliers", sum(outliers.values()))
+
+
+    def __fieldArgs(self, option, syntax, types, defaults=()):
+        """
+        Parse the per field argument of option, e.g. altitude=7:3,speed=5,
+        into a dict of fields to tuples of values converted by types. Values
+        left out are taken from defaults of all values but the first.
+        """
+
+        arg = self.params[option]
+        parsed = {}
+        if not arg:
+            return parsed
+
+        try:
+            for item in arg.split(","):
+                field, values = item.split("=")
+                values = values.split(":")
+                if len(values) > len(types):
+                    raise ValueError
+                values += list(defaults[len(values) - 1:])
+                parsed[field.strip()] = tuple(t(v) for t, v in
+                                              zip(types, values))
+        except ValueError:
+            self.__exit("--%s expects %s, got '%s'!" % (option, syntax, arg),
+                True)
+
+        return parsed
+
+
+    # -------------------------------------------------------------------------
+    # - Time window                                                           -
+    # -------------------------------------------------------------------------
+
+
+    def _parseTime(self, string):
+        """
+        Convert a point in time given on the command line into seconds of the
+        video. Absolute UTC times are converted by the reference timestamp of
+        the track, everything else is taken as relative to its start.
+        """
+
+        dt = parseTimestamp(string)
+        if dt is not None:
+            return datetime2unix(dt) - self._wp.getRefTimestamp()
+
+        return hms2sec(string)
+
+
+    def _setWindow(self):
+        """
+        Restrict rendering to the time window given by --start/--end or by the
+        video passed in --sync-video.
+        """
+
+        params = self.params['window']
+        start = None
+        end = None
+
+        try:
+            if params['video']:
+                info = getVideoInfo(params['video'])
+                if info['creation_time'] is None:
+                    raise ValueError(
+                        "Video '%s' does not contain a creation time!" %
+                        params['video']
+                    )
+
+                start = datetime2unix(info['creation_time']) \
+                    - self._wp.getRefTimestamp() + hms2sec(params['offset'])
+                end = start + info['duration']
+
+                log.info("Video '%s' starts at %s of track and lasts %s." %
+                    (params['video'], sec2hms(start),
+                    sec2hms(info['duration'])))
+
+            if params['start']:
+                start = self._parseTime(params['start'])
+            if params['end']:
+                end = self._parseTime(params['end'])
+
+            if start is not None or end is not None:
+                self._wp.setWindow(start, end)
+
+        except (IOError, ValueError) as e:
+            self.__exit(str(e), True)
+
+        if self._wp.hasWindow():
+            log.info("Rendering %s of %s of the track." % (
+                sec2hms(self._wp.getWindowLength()),
+                sec2hms(self._wp.getTimestamps()[-1])
+            ))
+
+
     # -------------------------------------------------------------------------
     # - Call of gauge classes                                                 -
     # -------------------------------------------------------------------------
 
 
+    def _renderGauge(self, gauge, params, name):
+        """
+        Set layout of a gauge, compose it and save the result to disk. Raises
+        IOError if the output can't be written.
+        """
+
+        scale = self.VIDEOSETTINGS['scale']
+        gauge.setSize(*scaleXY(params['size'], scale))
+        gauge.setPosition(*scaleXY(params['position'], scale))
+
+        with METRICS.stage("build", name), PROFILER.scope("build"):
+            clip = gauge.make()
+
+        outputs = self._outputFiles(name)
+
+        if self.params['plan']:
+            with METRICS.stage("plan", name):
+                self._Plans.append(
+                    Planner(self.VIDEOSETTINGS).plan(gauge, clip, outputs))
+            return
+
+        with METRICS.stage("save", name), PROFILER.scope("save"):
+            if self.VIDEOSETTINGS.get('sheet'):
+                gauge.saveContactSheet(clip, outputs[0][0],
+                    force=self.params['force'])
+            elif self.VIDEOSETTINGS.get('formats'):
+                gauge.saveMulti(clip, outputs, force=self.params['force'])
+            else:
+                gauge.save(clip, outputs[0][0], force=self.params['force'])
+
+
+    def _outputFiles(self, name):
+        """
+        Get list of tuples (path, (width, height)) of the files written for
+        the gauge called name.
+        """
+
+        filename  = self.params['outputfolder']
+        filename += name
+
+        size = splitXY(self.VIDEOSETTINGS['format'])
+
+        if self.VIDEOSETTINGS.get('sheet'):
+            return [(filename + "_preview.png", size)]
+
+        if self.VIDEOSETTINGS.get('formats'):
+            return [("%s_%s%s" % (filename, joinXY(*f),
+                self.VIDEOSETTINGS['filetype']), f)
+                for f in self.VIDEOSETTINGS['formats']]
+
+        if self.params['preview']['display']:
+            filename += "_preview"
+        return [(filename + self.VIDEOSETTINGS['filetype'], size)]
+
+
+    def upToDate(self):
+        """
+        Check if all output files of the wanted gauges exist and are newer
+        than the GPX file.
+        """
+
+        try:
+            source = os.path.getmtime(self.params['gpxfile'])
+        except OSError:
+            return False
+
+        names = [n for n in ("airspeed", "altitude")
+                 if self.params[n]['display']]
+        if not names:
+            return False
+
+        for name in names:
+            for path, size in self._outputFiles(name):
+                if not os.path.isfile(path) or \
+                    os.path.getmtime(path) < source:
+                    return False
+
+        return True
+
+
     def _airspeed(self):
         """
         Handle class operation for airspeed indicator.
@@ -866,27 +1981,14 @@ class VideoGauge(object):
 
         params = self.params['airspeed']
         gauge = gauges.Airspeed.Airspeed(
-            wpInst=self._wp,
+            wpInst=self._wp.getView(),
             unit=params['unit'],
             digSpeed=False,
             autorun=False,
             settings=self.VIDEOSETTINGS
         )
 
-        gauge.setSize(xy=params['size'])
-        gauge.setPosition(xy=params['position'])
-
-
-        clip = gauge.make()
-
-        filename  = self.params['outputfolder']
-        filename += "airspeed"
-        filename += self.VIDEOSETTINGS['filetype']
-
-        try:
-            gauge.save(clip, filename, force=self.params['force'])
-        except IOError, e:
-            self.__exit(e, True)
+        self._renderGauge(gauge, params, "airspeed")
 
 
     def _altitude(self):
@@ -896,27 +1998,14 @@ class VideoGauge(object):
 
         params = self.params['altitude']
         gauge = gauges.Altitude.Altitude(
-            wpInst=self._wp,
+            wpInst=self._wp.getView(),
             unit=params['unit'],
             digSpeed=False,
             autorun=False,
             settings=self.VIDEOSETTINGS
         )
 
-        gauge.setSize(xy=params['size'])
-        gauge.setPosition(xy=params['position'])
-
-
-        clip = gauge.make()
-
-        filename  = self.params['outputfolder']
-        filename += "altitude"
-        filename += self.VIDEOSETTINGS['filetype']
-
-        try:
-            gauge.save(clip, filename, force=self.params['force'])
-        except IOError, e:
-            self.__exit(e, True)
+        self._renderGauge(gauge, params, "altitude")
 
 
     def _attitude(self):
@@ -985,6 +2074,30 @@ class VideoGauge(object):
 
 
 
+# *****************************************************************************
+# * Batch job                                                                 *
+# *****************************************************************************
+
+def runFlight(argv, skipUpToDate=True):
+    """
+    Render the gauges of one flight of a batch. Returns a tuple (status,
+    message) for the batch report.
+    """
+
+    try:
+        app = VideoGauge(argv, run=False)
+        if skipUpToDate and app.upToDate():
+            return (Batch.SKIPPED, "")
+        app.run()
+    except FatalError, e:
+        return (Batch.FAILED, e.msg)
+    except SystemExit, e:
+        if e.code:
+            return (Batch.FAILED, "Exit code %s" % e.code)
+
+    return (Batch.DONE, "")
+
+
 # *****************************************************************************
 # * Run app                                                                   *
 # *****************************************************************************